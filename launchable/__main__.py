@@ -1,26 +1,33 @@
-import importlib
 import importlib.util
 import logging
 import os
 from glob import glob
-from os.path import basename, dirname, join
+from os.path import basename, join
 
 import click
 
 from launchable.app import Application
 
-from .commands.compare import compare
-from .commands.inspect import inspect
-from .commands.record import record
-from .commands.split_subset import split_subset
-from .commands.stats import stats
-from .commands.subset import subset
-from .commands.verify import verify
 from .utils import logger
+from .utils.agent import ForwardingGroup
+from .utils.compression import CODECS, DEFAULT_CODEC, get_codec
+from .utils.env_keys import COMPRESSION_KEY, COMPRESSION_LEVEL_KEY, COMPRESSION_THREADS_KEY
+from .utils.profiler import profiler
 from .version import __version__
 
 
-@click.group()
+# commands are imported only when they're run, and so are test runners (see launchable.test_runners).
+# With $LAUNCHABLE_AGENT_SOCKET, they run in the agent instead (see launchable.utils.agent)
+@click.group(cls=ForwardingGroup, lazy_commands={
+    'record': 'launchable.commands.record:record',
+    'subset': 'launchable.commands.subset:subset',
+    'split-subset': 'launchable.commands.split_subset:split_subset',
+    'verify': 'launchable.commands.verify:verify',
+    'inspect': 'launchable.commands.inspect:inspect',
+    'stats': 'launchable.commands.stats:stats',
+    'compare': 'launchable.commands.compare:compare',
+    'agent': 'launchable.commands.agent:agent',
+})
 @click.version_option(version=__version__, prog_name='launchable-cli')
 @click.option(
     '--log-level',
@@ -53,8 +60,56 @@ from .version import __version__
          'a possible man-in-the-middle attack. Use it as an escape hatch, but with caution.',
     is_flag=True,
 )
+@click.option(
+    '--compression',
+    'compression',
+    help='Compression of the data sent to the server. zstd is faster but needs the zstandard package. '
+         'Defaults to the LAUNCHABLE_COMPRESSION environment variable, or gzip.',
+    type=click.Choice(list(CODECS.keys())),
+)
+@click.option(
+    '--compression-level',
+    'compression_level',
+    help='Compression level. Higher levels make the data smaller at the expense of CPU time. '
+         'Defaults to the LAUNCHABLE_COMPRESSION_LEVEL environment variable, or the default of the compression.',
+    type=int,
+)
+@click.option(
+    '--compression-threads',
+    'compression_threads',
+    help='Number of threads to compress large data with, 0 for the number of CPUs. '
+         'Defaults to the LAUNCHABLE_COMPRESSION_THREADS environment variable, or 1.',
+    type=click.IntRange(min=0),
+)
+@click.option(
+    '--profile',
+    'profile',
+    help='Measure the time, CPU, traffic and memory that each phase of the command takes, '
+         'and print them at the end.',
+    is_flag=True,
+)
+@click.option(
+    '--profile-output',
+    'profile_output',
+    help='Write the measurements of --profile to a file: JSON if the name ends with .json, '
+         'otherwise cProfile stats for `python -m pstats` and the likes. Implies --profile.',
+    type=click.Path(dir_okay=False, writable=True),
+)
 @click.pass_context
-def main(ctx, log_level, plugin_dir, dry_run, skip_cert_verification):
+def main(ctx, log_level, plugin_dir, dry_run, skip_cert_verification, compression, compression_level,
+         compression_threads, profile, profile_output):
+    if profile or profile_output:
+        profiler.start(cprofile=bool(profile_output) and not profile_output.endswith(".json"))
+
+        def report_profile():
+            profiler.stop()
+            profiler.report()
+            if profile_output:
+                profiler.write(profile_output)
+
+        # called once the command finishes, including when it exits early
+        ctx.call_on_close(report_profile)
+
     level = logger.get_log_level(log_level)
     # In the case of dry-run, it is forced to set the level below the AUDIT.
     # This is because the dry-run log will be output along with the audit log.
@@ -66,12 +121,18 @@ def main(ctx, log_level, plugin_dir, dry_run, skip_cert_verification):
 
     logging.basicConfig(level=level)
 
-    # load all test runners
-    for f in glob(join(dirname(__file__), 'test_runners', "*.py")):
-        f = basename(f)[:-3]
-        if f == '__init__':
-            continue
-        importlib.import_module('launchable.test_runners.%s' % f)
+    compression = compression or os.environ.get(COMPRESSION_KEY) or DEFAULT_CODEC
+    try:
+        if compression_level is None and os.environ.get(COMPRESSION_LEVEL_KEY):
+            compression_level = int(os.environ[COMPRESSION_LEVEL_KEY])
+        if compression_threads is None:
+            compression_threads = int(os.environ.get(COMPRESSION_THREADS_KEY) or 1)
+        get_codec(compression, compression_level)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    except ImportError:
+        # falls back to gzip with a warning when it's used
+        pass
 
     # load all plugins
     if plugin_dir:
@@ -81,16 +142,9 @@ def main(ctx, log_level, plugin_dir, dry_run, skip_cert_verification):
             plugin = importlib.util.module_from_spec(spec)
             spec.loader.exec_module(plugin)
 
-    ctx.obj = Application(dry_run=dry_run, skip_cert_verification=skip_cert_verification)
-
+    ctx.obj = Application(dry_run=dry_run, skip_cert_verification=skip_cert_verification, compression=compression,
+                          compression_level=compression_level, compression_threads=compression_threads)
 
-main.add_command(record)
-main.add_command(subset)
-main.add_command(split_subset)
-main.add_command(verify)
-main.add_command(inspect)
-main.add_command(stats)
-main.add_command(compare)
 
 if __name__ == '__main__':
     main()
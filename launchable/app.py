@@ -1,11 +1,26 @@
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+
 # Object representing the most global state possible, which represents a single invocation of CLI
 # Currently it's used to keep global configurations.
 #
 # From command implementations, this is available from Click 'context.obj'
 class Application(object):
-    def __init__(self, dry_run: bool = False, skip_cert_verification: bool = False):
+    def __init__(self, dry_run: bool = False, skip_cert_verification: bool = False, compression: str = "gzip",
+                 compression_level: Optional[int] = None, compression_threads: int = 1):
         # Dry run mode. This command is used by customers to inspect data we'd send to our server,
         # but without actually doing so.
         self.dry_run = dry_run
         # Skip SSL certificate validation
         self.skip_cert_verification = skip_cert_verification
+        # Content-Encoding to compress request bodies with, and its level (None for the default of the codec)
+        self.compression = compression
+        self.compression_level = compression_level
+        # number of threads to compress with, 0 for the number of CPUs
+        self.compression_threads = compression_threads
+        # responses of GET requests shared by the commands run in this invocation, keyed by the path.
+        # See LaunchableClient.prefetch()
+        self.prefetched: Dict[str, 'Future'] = {}
@@ -0,0 +1,89 @@
+import subprocess
+import sys
+import time
+
+import click
+
+from ..utils import agent as agent_process
+from ..utils.env_keys import AGENT_SOCKET_KEY
+
+# seconds to wait for a new agent to start listening
+START_TIMEOUT = 10
+
+socket_option = click.option(
+    '--socket',
+    'socket_path',
+    help='Unix domain socket of the agent. Defaults to the {} environment variable, '
+         'which also tells the other commands to run in the agent'.format(AGENT_SOCKET_KEY),
+    envvar=AGENT_SOCKET_KEY,
+    required=True,
+    type=click.Path(dir_okay=False),
+)
+
+idle_timeout_option = click.option(
+    '--idle-timeout',
+    'idle_timeout',
+    help='Stop the agent after this many seconds without commands, 0 to keep it running until stopped',
+    type=click.IntRange(min=0),
+    default=agent_process.DEFAULT_IDLE_TIMEOUT,
+    show_default=True,
+)
+
+
+@click.group(help="Run the commands of a CI job in a background agent, so that each command doesn't have to start "
+                  "from scratch. While ${} is set and the agent is running, the other commands run in the agent, "
+                  "one at a time".format(AGENT_SOCKET_KEY))
+def agent():
+    if not agent_process.is_supported():
+        raise click.UsageError("The agent needs Unix domain sockets, which aren't available on this platform")
+
+
+@agent.command(help="Start the agent in the background")
+@socket_option
+@idle_timeout_option
+def start(socket_path: str, idle_timeout: int):
+    if agent_process.ping(socket_path):
+        click.echo("The agent is already running at {}".format(socket_path))
+        return
+
+    subprocess.Popen([sys.executable, "-m", "launchable", "agent", "serve", "--socket", socket_path,
+                      "--idle-timeout", str(idle_timeout)],
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     start_new_session=True)
+
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        status = agent_process.ping(socket_path)
+        if status:
+            click.echo("Started the agent at {} (pid {})".format(socket_path, status["pid"]))
+            return
+        time.sleep(0.1)
+    raise click.ClickException("The agent didn't start listening at {} in {} seconds".format(socket_path, START_TIMEOUT))
+
+
+@agent.command(help="Run the agent in the foreground")
+@socket_option
+@idle_timeout_option
+@click.pass_context
+def serve(ctx: click.Context, socket_path: str, idle_timeout: int):
+    # the commands run in the CLI that runs this one
+    agent_process.serve(socket_path, ctx.find_root().command, idle_timeout)
+
+
+@agent.command(help="Stop the agent")
+@socket_option
+def stop(socket_path: str):
+    if agent_process.stop(socket_path):
+        click.echo("Stopped the agent at {}".format(socket_path))
+    else:
+        click.echo("No agent is running at {}".format(socket_path))
+
+
+@agent.command(help="Tell whether the agent is running. Exits with 1 if it isn't")
+@socket_option
+def status(socket_path: str):
+    status = agent_process.ping(socket_path)
+    if status is None:
+        click.echo("No agent is running at {}".format(socket_path))
+        sys.exit(1)
+    click.echo("The agent is running at {} (pid {}, version {})".format(socket_path, status["pid"], status["version"]))
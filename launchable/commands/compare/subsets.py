@@ -1,7 +1,6 @@
 from typing import List, Tuple, Union
 
 import click
-from tabulate import tabulate
 
 
 @click.command()
@@ -47,4 +46,5 @@ def subsets(file_before, file_after):
         (before, after, f"{diff:+}" if isinstance(diff, int) else diff, test)
         for before, after, diff, test in rows
     ]
+    from tabulate import tabulate
     click.echo(tabulate(tabular_data, headers=headers, tablefmt="github"))
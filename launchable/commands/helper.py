@@ -9,7 +9,7 @@ from launchable.utils.tracking import TrackingClient
 
 from ..app import Application
 from ..utils.launchable_client import LaunchableClient
-from ..utils.session import read_build, read_session, validate_session_format
+from ..utils.session import parse_session, read_build, read_session, validate_session_format
 
 
 def require_session(
@@ -142,6 +142,48 @@ def find_or_create_session(
     return read_session(saved_build_name)
 
 
+def prefetch_startup_requests(
+    client: LaunchableClient,
+    session: Optional[str],
+    build_name: Optional[str],
+    session_name: Optional[str] = None,
+    fetch_build: bool = False,
+    fetch_session: bool = False,
+):
+    """Start the requests a command sends before getting to work all at once, so that they take one round trip
+    rather than one each. find_or_create_session() and the rest pick up the responses through
+    LaunchableClient.get_shared().
+
+    Args:
+        session: The --session option value
+        build_name: The --build option value
+        session_name: The --session-name option value
+        fetch_build: Fetch the build of the session, which `record tests` needs for its timestamp
+        fetch_session: Fetch the test session, which `subset` needs to check the observation mode
+    """
+    client.prefetch_unless_cached("state")
+
+    try:
+        if session:
+            build_name, _ = parse_session(session)
+        elif session_name:
+            if not build_name:
+                return
+            client.prefetch_unless_cached("builds/{}/test_session_names/{}".format(build_name, session_name))
+        else:
+            # find_or_create_session() goes with the build recorded on this machine
+            build_name = read_build()
+            session = read_session(build_name) if build_name else None
+    except Exception:
+        # the command runs into the same error and reports it
+        return
+
+    if fetch_build and build_name:
+        client.prefetch_unless_cached("builds/{}".format(build_name))
+    if fetch_session and session:
+        client.prefetch(session)
+
+
 def time_ns():
     # time.time_ns() method is new in Python version 3.7
     # As a workaround, we convert time.time() to nanoseconds.
@@ -154,7 +196,7 @@ def _check_observation_mode_status(session: str, is_observation: bool,
         return
 
     client = LaunchableClient(tracking_client=tracking_client, app=app)
-    res = client.request("get", session)
+    res = client.get_shared(session)
 
     # only check when the status code is 200 not to stop the command
     if res.status_code == 200:
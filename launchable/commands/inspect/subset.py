@@ -5,7 +5,6 @@ from http import HTTPStatus
 from typing import List
 
 import click
-from tabulate import tabulate
 
 from ...utils.launchable_client import LaunchableClient
 
@@ -65,6 +64,7 @@ class SubsetResultTableDisplay(SubsetResultAbstractDisplay):
                     result._estimated_duration_sec,
                 ]
             )
+        from tabulate import tabulate
         click.echo(tabulate(rows, header, tablefmt="github", floatfmt=".2f"))
 
 
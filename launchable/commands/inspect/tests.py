@@ -5,7 +5,6 @@ from http import HTTPStatus
 from typing import List
 
 import click
-from tabulate import tabulate
 
 from ...utils.authentication import ensure_org_workspace
 from ...utils.launchable_client import LaunchableClient
@@ -112,6 +111,7 @@ class TestResultTableDisplay(TestResultAbstractDisplay):
                     result._created_at,
                 ]
             )
+        from tabulate import tabulate
         click.echo(tabulate(rows, header, tablefmt="github", floatfmt=".2f"))
 
         summary_header = ["Summary", "Report Count", "Total Duration (min)"]
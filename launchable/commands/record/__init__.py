@@ -1,23 +1,18 @@
 import click
 
-from launchable.utils.click import GroupWithAlias
+from launchable.utils.click import LazyGroup
 
-from .attachment import attachment
-from .build import build
-from .commit import commit
-from .session import session
-from .tests import tests
 
-
-@click.group(cls=GroupWithAlias)
+@click.group(cls=LazyGroup, lazy_commands={
+    'build': 'launchable.commands.record.build:build',
+    'commit': 'launchable.commands.record.commit:commit',
+    'tests': 'launchable.commands.record.tests:tests',
+    'session': 'launchable.commands.record.session:session',
+    'attachment': 'launchable.commands.record.attachment:attachment',
+})
 def record():
     pass
 
 
-record.add_command(build)
-record.add_command(commit)
-record.add_command(tests)
 # for backward compatibility
-record.add_alias('test', tests)  # type: ignore
-record.add_command(session)
-record.add_command(attachment)
+record.add_alias('test', 'tests')  # type: ignore
@@ -1,10 +1,20 @@
-from typing import Optional
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import List, Optional, Tuple
 
 import click
 
+from ...utils.cache import read_cache, write_cache
+from ...utils.http_client import READ_CHUNK_SIZE
 from ...utils.launchable_client import LaunchableClient
 from ..helper import require_session
 
+# The names and the content hashes of the attachments sent to a test session are remembered for a while, so that
+# attaching the same file again, such as on a retried CI step, is skipped
+SENT_ATTACHMENTS_CACHE_TTL = 24 * 60 * 60
+
 
 @click.command()
 @click.option(
@@ -13,23 +23,112 @@ from ..helper import require_session
     help='In the format builds/<build-name>/test_sessions/<test-session-id>',
     type=str,
 )
+@click.option(
+    '--concurrency',
+    'concurrency',
+    help='Number of attachments to upload concurrently',
+    default=4,
+    type=click.IntRange(min=1),
+    metavar='N',
+)
 @click.argument('attachments', nargs=-1)  # type=click.Path(exists=True)
 @click.pass_context
 def attachment(
         context: click.core.Context,
         attachments,
-        session: Optional[str] = None
+        session: Optional[str] = None,
+        concurrency: int = 4,
 ):
     client = LaunchableClient(app=context.obj)
     try:
         session = require_session(session)
+        cache_key = client.cache_key("{}/attachments".format(session))
+        sent = read_cache(cache_key)
+        sent_files = {(e[0], e[1]) for e in sent if isinstance(e, list) and len(e) == 2} if isinstance(sent, list) else set()
+
+        def upload(a: str) -> Tuple[float, Optional[Exception]]:
+            start = perf_counter()
+            try:
+                with open(a, mode='rb') as f:
+                    res = client.request(
+                        "post", "{}/attachment".format(session), compress=True, payload=f,
+                        additional_headers={"Content-Disposition": "attachment;filename=\"{}\"".format(a)})
+                    res.raise_for_status()
+            except Exception as e:
+                return perf_counter() - start, e
+            return perf_counter() - start, None
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            hashes = list(executor.map(_try_hash_file, attachments))
+
+            # the server tells attachments apart by their names, so the same content under another name is sent
+            to_send: List[str] = []
+            for a, h in zip(attachments, hashes):
+                if h is None:
+                    continue
+                if (a, h) in sent_files or a in to_send:
+                    click.echo("Skipping {} as it's already sent".format(a))
+                else:
+                    click.echo("Sending {}".format(a))
+                    to_send.append(a)
+
+            results = dict(zip(to_send, executor.map(upload, to_send)))
+
+        rows = []
+        errors = []
+        for a, h in zip(attachments, hashes):
+            if h is None:
+                rows.append([a, None, None, None, "failed"])
+                continue
+
+            size = os.path.getsize(a) / 1024 / 1024
+            if a not in results:
+                rows.append([a, size, None, None, "skipped"])
+                continue
 
-        for a in attachments:
-            click.echo("Sending {}".format(a))
-            with open(a, mode='rb') as f:
-                res = client.request(
-                    "post", "{}/attachment".format(session), compress=True, payload=f,
-                    additional_headers={"Content-Disposition": "attachment;filename=\"{}\"".format(a)})
-                res.raise_for_status()
+            elapsed, error = results.pop(a)
+            if error is None:
+                rows.append([a, size, elapsed, size / elapsed if elapsed > 0 else None, "sent"])
+                sent_files.add((a, h))
+            else:
+                rows.append([a, size, elapsed, None, "failed"])
+                errors.append(error)
+
+        click.echo("")
+        from tabulate import tabulate
+        click.echo(tabulate(rows, ["File", "Size (MB)", "Time (s)", "Throughput (MB/s)", "Status"],
+                            tablefmt="github", floatfmt=".2f", missingval="-"))
+
+        # nothing is sent in dry-run mode, so there's nothing to skip next time
+        if not (context.obj and context.obj.dry_run):
+            write_cache(cache_key, sorted([a, h] for a, h in sent_files), SENT_ATTACHMENTS_CACHE_TTL)
+
+        for e in errors:
+            client.print_exception_and_recover(e)
     except Exception as e:
         client.print_exception_and_recover(e)
+
+
+def _try_hash_file(path: str) -> Optional[str]:
+    """
+    Hash of the file, or None with a warning if it can't be read, so that the other files are sent all the same
+    """
+    try:
+        return _hash_file(path)
+    except OSError as e:
+        click.echo(click.style("Can't read {}: {}".format(path, e), fg='yellow'), err=True)
+        return None
+
+
+def _hash_file(path: str) -> str:
+    h = hashlib.sha256()
+    # read into one large buffer over and over, rather than allocating small chunks
+    buf = bytearray(READ_CHUNK_SIZE)
+    view = memoryview(buf)
+    with open(path, mode='rb') as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(view[:n])
+    return h.hexdigest()
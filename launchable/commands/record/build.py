@@ -5,17 +5,17 @@ import sys
 from typing import List, Optional, Sequence, Tuple
 
 import click
-from tabulate import tabulate
 
 from launchable.utils.link import CIRCLECI_KEY, GITHUB_ACTIONS_KEY, JENKINS_URL_KEY, LinkKind, capture_link
 from launchable.utils.tracking import Tracking, TrackingClient
 
 from ...utils import subprocess
 from ...utils.authentication import get_org_workspace
+from ...utils.cache import invalidate_cache, write_cache
 from ...utils.click import DATETIME_WITH_TZ, KEY_VALUE, validate_past_datetime
 from ...utils.commands import Command
 from ...utils.fail_fast_mode import set_fail_fast_mode, warn_and_exit_if_fail_fast_mode
-from ...utils.launchable_client import LaunchableClient
+from ...utils.launchable_client import BUILD_CACHE_TTL, LaunchableClient
 from ...utils.session import clean_session_files, write_build
 from .commit import commit
 
@@ -117,6 +117,9 @@ def build(
 
     tracking_client = TrackingClient(Command.RECORD_BUILD, app=ctx.obj)
     client = LaunchableClient(app=ctx.obj, tracking_client=tracking_client)
+    # a new build starts off a CI job, whose invocations reuse what this one fetches
+    invalidate_cache(client.cache_key("state"))
+    invalidate_cache(client.cache_key("builds/{}".format(build_name)))
     set_fail_fast_mode(client.is_fail_fast_mode())
 
     if "/" in build_name or "%2f" in build_name.lower():
@@ -344,7 +347,12 @@ def build(
             # at this point we've successfully send the data, so it's OK to record this build
             write_build(build_name)
 
-            return res.json().get("id", None)
+            build = res.json()
+            if isinstance(build.get("createdAt"), str) and not client.is_dry_run():
+                # for `record tests` to tell which reports are new
+                write_cache(client.cache_key("builds/{}".format(build_name)), build["createdAt"], BUILD_CACHE_TTL)
+
+            return build.get("id", None)
         except Exception as e:
             tracking_client.send_error_event(
                 event_name=Tracking.ErrorEvent.INTERNAL_CLI_ERROR,
@@ -368,6 +376,7 @@ def build(
 
         header = ["Name", "Path", "HEAD Commit"]
         rows = [[w.name, w.dir, w.commit_hash] for w in ws]
+        from tabulate import tabulate
         click.echo(tabulate(rows, header, tablefmt="github"))
         click.echo(
             "\nVisit https://app.launchableinc.com/organizations/{organization}/workspaces/"
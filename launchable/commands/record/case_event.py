@@ -1,16 +1,12 @@
 import datetime
 import sys
-from typing import Any, Callable, Dict, Optional
-
-import dateutil.parser
-from dateutil.tz import tzlocal
-from junitparser import Error, Failure, IntAttr, Skipped, TestCase, TestSuite
-
-from launchable.utils.common_tz import COMMON_TIMEZONES  # type: ignore
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
 
 from ...testpath import FilePathNormalizer, TestPath
 
-POSSIBLE_RESULTS = (Failure, Error, Skipped)
+if TYPE_CHECKING:
+    # junitparser is imported only by the test runners that read JUnit XML reports, when they do
+    from junitparser import TestCase, TestSuite  # noqa: F401
 
 CaseEventType = Dict[str, str]
 
@@ -27,11 +23,13 @@ class CaseEvent:
         'TEST_FAILED': TEST_FAILED,
     }
 
+    TRUNCATION_MARKER = "\n...(truncated {} bytes)...\n"
+
     # function that computes TestPath from a test case
     # The 3rd argument is the report file path
-    TestPathBuilder = Callable[[TestCase, TestSuite, str], TestPath]
+    TestPathBuilder = Callable[['TestCase', 'TestSuite', str], TestPath]
 
-    DataBuilder = Callable[[TestCase], Optional[Dict[str, Any]]]
+    DataBuilder = Callable[['TestCase'], Optional[Dict[str, Any]]]
 
     @staticmethod
     def default_path_builder(
@@ -40,7 +38,7 @@ class CaseEvent:
         Obtains a default TestPathBuilder that uses a base directory to relativize the file name
         """
 
-        def f(case: TestCase, suite: TestSuite, report_file: str) -> TestPath:
+        def f(case: 'TestCase', suite: 'TestSuite', report_file: str) -> TestPath:
             classname = case._elem.attrib.get("classname") or suite._elem.attrib.get("classname")
             filepath = case._elem.attrib.get("file") or suite._elem.attrib.get("filepath")
             if filepath:
@@ -59,7 +57,7 @@ class CaseEvent:
 
     @staticmethod
     def default_data_builder() -> DataBuilder:
-        def f(case: TestCase):
+        def f(case: 'TestCase'):
             """
             case for:
                 <testcase ... file="tests/commands/inspect/test_tests.py" line="133">
@@ -78,12 +76,13 @@ class CaseEvent:
     def from_case_and_suite(
         cls,
         path_builder: TestPathBuilder,
-        case: TestCase,
-        suite: TestSuite,
+        case: 'TestCase',
+        suite: 'TestSuite',
         report_file: str,
         data_builder: DataBuilder
     ) -> Dict:
         "Builds a JSON representation of CaseEvent from JUnitPaser objects"
+        from junitparser import Error, Failure, Skipped
 
         # TODO: reconsider the initial value of the status.
         status = CaseEvent.TEST_PASSED
@@ -101,7 +100,7 @@ class CaseEvent:
 
             return test_path
 
-        def stdout(case: TestCase) -> str:
+        def stdout(case: 'TestCase') -> str:
             """
             case for:
                 <testcase>
@@ -113,7 +112,7 @@ class CaseEvent:
 
             return ""
 
-        def stderr(case: TestCase) -> str:
+        def stderr(case: 'TestCase') -> str:
             """
             case for:
                 <testcase>
@@ -131,7 +130,7 @@ class CaseEvent:
             """
             stderr = ""
             for result in case.result:
-                if type(result) in POSSIBLE_RESULTS:
+                if type(result) in (Failure, Error, Skipped):
                     # Since the `message` property is a summary of the `text` property,
                     # we should attempt to retrieve the `text` property first in order to obtain a detailed log.
                     if result.text:
@@ -158,6 +157,11 @@ class CaseEvent:
         def _timestamp(ts: Optional[str] = None):
             if ts is None:
                 return datetime.datetime.now(datetime.timezone.utc).isoformat()
+            import dateutil.parser
+            from dateutil.tz import tzlocal
+
+            from launchable.utils.common_tz import COMMON_TIMEZONES  # type: ignore
+
             try:
                 date = dateutil.parser.parse(timestr=ts, tzinfos=COMMON_TIMEZONES)
                 if date.tzinfo is None:
@@ -184,6 +188,76 @@ class CaseEvent:
             "data": data
         }
 
+    @classmethod
+    def truncate_log(cls, log: str, max_size: int) -> Tuple[str, bool]:
+        """
+        Cut the log down to max_size bytes by keeping its head and tail, and returns the log and
+        whether it was truncated. The truncation marker comes on top of max_size.
+        """
+        # a character takes up to 4 bytes in UTF-8, so most logs can skip the encoding below
+        if max_size <= 0 or len(log) * 4 <= max_size:
+            return log, False
+
+        b = log.encode("utf-8", errors="replace")
+        if len(b) <= max_size:
+            return log, False
+
+        head_size = max_size // 2
+        tail_size = max_size - head_size
+        # 'ignore' drops a multi-byte character split at the cut
+        head = b[:head_size].decode("utf-8", errors="ignore")
+        tail = b[len(b) - tail_size:].decode("utf-8", errors="ignore")
+        return head + cls.TRUNCATION_MARKER.format(len(b) - head_size - tail_size) + tail, True
+
+
+class LogTruncation:
+    """
+    Upper limits of stdout/stderr of a test case in bytes (UTF-8 encoded), 0 meaning unlimited, and the number of
+    test cases whose logs got truncated by them. A longer log is cut in the middle, keeping its head and tail, which
+    is where the useful part of a log usually is. Configured by `record tests --max-stdout-size/--max-stderr-size`
+    for each invocation.
+    """
+
+    def __init__(self, max_stdout_size: int = 0, max_stderr_size: int = 0):
+        self.max_stdout_size = max_stdout_size
+        self.max_stderr_size = max_stderr_size
+        self.truncated_stdout_count = 0
+        self.truncated_stderr_count = 0
+
+    def apply(self, event: CaseEventType) -> CaseEventType:
+        """
+        Truncates the logs of the test case event in place, and returns it
+        """
+        stdout, truncated = CaseEvent.truncate_log(event.get("stdout") or "", self.max_stdout_size)
+        if truncated:
+            event["stdout"] = stdout
+            self.truncated_stdout_count += 1
+        stderr, truncated = CaseEvent.truncate_log(event.get("stderr") or "", self.max_stderr_size)
+        if truncated:
+            event["stderr"] = stderr
+            self.truncated_stderr_count += 1
+        return event
+
+    def add_counts(self, other: 'LogTruncation'):
+        self.truncated_stdout_count += other.truncated_stdout_count
+        self.truncated_stderr_count += other.truncated_stderr_count
+
+
+class MetadataTestCase:
+    """
+    Attributes of a <testcase> that junitparser doesn't read, such as the line number that pytest writes
+    """
+
+    def __init__(self, elem):
+        self._elem = elem
+
+    @classmethod
+    def fromelem(cls, case: Optional['TestCase']) -> Optional['MetadataTestCase']:
+        if case is None:
+            return None
+        return cls(case._elem)
 
-class MetadataTestCase(TestCase):
-    line = IntAttr()
+    @property
+    def line(self) -> Optional[int]:
+        value = self._elem.attrib.get("line")
+        return int(value) if value else None
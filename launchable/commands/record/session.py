@@ -11,10 +11,11 @@ from launchable.utils.click import DATETIME_WITH_TZ, validate_past_datetime
 from launchable.utils.link import LinkKind, capture_link
 from launchable.utils.tracking import Tracking, TrackingClient
 
+from ...utils.cache import invalidate_cache, write_cache
 from ...utils.click import KEY_VALUE
 from ...utils.commands import Command
 from ...utils.fail_fast_mode import FailFastModeValidateParams, fail_fast_mode_validate, set_fail_fast_mode
-from ...utils.launchable_client import LaunchableClient
+from ...utils.launchable_client import BUILD_CACHE_TTL, LaunchableClient
 from ...utils.no_build import NO_BUILD_BUILD_NAME
 from ...utils.session import _session_file_path, read_build, write_session
 
@@ -136,6 +137,10 @@ def session(
 
     tracking_client = TrackingClient(Command.RECORD_SESSION, app=ctx.obj)
     client = LaunchableClient(app=ctx.obj, tracking_client=tracking_client)
+    # the later invocations of a CI job go with what this one fetches
+    invalidate_cache(client.cache_key("state"))
+    if session_name:
+        invalidate_cache(client.cache_key("builds/{}/test_session_names/{}".format(build_name, session_name)))
     set_fail_fast_mode(client.is_fail_fast_mode())
 
     fail_fast_mode_validate(FailFastModeValidateParams(
@@ -286,3 +291,8 @@ def add_session_name(
         sys.exit(1)
 
     res.raise_for_status()
+
+    # for `subset` and `record tests` to find the session by the name
+    if not client.is_dry_run():
+        write_cache(client.cache_key("builds/{}/test_session_names/{}".format(build_name, session_name)), session_id,
+                    BUILD_CACHE_TTL)
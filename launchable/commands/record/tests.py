@@ -1,32 +1,43 @@
 import datetime
 import glob
+import hashlib
+import json
+import multiprocessing
+import multiprocessing.pool
 import os
 import re
 import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from http import HTTPStatus
-from typing import Callable, Dict, Generator, List, Optional, Sequence, Tuple, Union
+from itertools import islice
+from typing import Any, Callable, Deque, Dict, Generator, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
 
 import click
-from dateutil.parser import parse
-from junitparser import JUnitXml, JUnitXmlError, TestCase, TestSuite  # type: ignore  # noqa: F401
-from more_itertools import ichunked
-from tabulate import tabulate
 
 from launchable.utils.authentication import ensure_org_workspace
-from launchable.utils.tracking import Tracking, TrackingClient
+from launchable.utils.tracking import Tracking, TrackingClient, stop_tracking_thread
 
+from ...test_runners import RECORD_TESTS
 from ...testpath import FilePathNormalizer, TestPathComponent, unparse_test_path
-from ...utils.click import DATETIME_WITH_TZ, KEY_VALUE, validate_past_datetime
+from ...utils import jsongen
+from ...utils.cache import read_cache, write_cache
+from ...utils.click import DATETIME_WITH_TZ, KEY_VALUE, LazyGroup, run_in_context, validate_past_datetime
 from ...utils.commands import Command
+from ...utils.compression import Codec, get_codec
 from ...utils.exceptions import InvalidJUnitXMLException
 from ...utils.fail_fast_mode import (FailFastModeValidateParams, fail_fast_mode_validate,
                                      set_fail_fast_mode, warn_and_exit_if_fail_fast_mode)
-from ...utils.launchable_client import LaunchableClient
+from ...utils.launchable_client import BUILD_CACHE_TTL, LaunchableClient, stop_prefetching
 from ...utils.logger import Logger
 from ...utils.no_build import NO_BUILD_BUILD_NAME, NO_BUILD_TEST_SESSION_ID
+from ...utils.profiler import COMPRESS, DISCOVERY, OUTPUT, PARSE, SERIALIZE, profiler
 from ...utils.session import parse_session, read_build
-from ..helper import find_or_create_session, time_ns
-from .case_event import CaseEvent, CaseEventType
+from ...utils.spool import ChunkSpool
+from ..helper import find_or_create_session, prefetch_startup_requests, time_ns
+from .case_event import CaseEvent, CaseEventType, LogTruncation
+
+T = TypeVar('T')
 
 GROUP_NAME_RULE = re.compile("^[a-zA-Z0-9][a-zA-Z0-9_-]*$")
 RESERVED_GROUP_NAMES = ["group", "groups", "nogroup", "nogroups"]
@@ -45,7 +56,7 @@ def _validate_group(ctx, param, value):
         raise click.BadParameter("group option supports only alphabet(a-z, A-Z), number(0-9), '-', and '_'")
 
 
-@click.group()
+@click.group(cls=LazyGroup, lazy_commands=RECORD_TESTS)
 @click.option(
     '--base',
     'base_path',
@@ -79,6 +90,23 @@ def _validate_group(ctx, param, value):
     default=1000,
     type=int
 )
+@click.option(
+    '--post-chunk-bytes',
+    'post_chunk_bytes',
+    help='Target size of a compressed POST request in bytes. When set, the number of test cases per POST starts from '
+         '--post-chunk and is adjusted on the fly, based on the compressed size of the requests sent so far.',
+    default=0,
+    type=click.IntRange(min=0),
+    metavar='BYTES',
+)
+@click.option(
+    '--post-concurrency',
+    'post_concurrency',
+    help='Number of chunks to POST concurrently. The next chunks are parsed while these requests are in flight.',
+    default=1,
+    type=click.IntRange(min=1),
+    metavar='N',
+)
 @click.option(
     "--flavor",
     "flavor",
@@ -170,6 +198,32 @@ def _validate_group(ctx, param, value):
     default=None,
     callback=validate_past_datetime,
 )
+@click.option(
+    '--parallel',
+    'parallel',
+    help='Parse report files with N worker processes. Useful when there are many report files to record.',
+    default=1,
+    type=click.IntRange(min=1),
+    metavar='N',
+)
+@click.option(
+    '--max-stdout-size',
+    'max_stdout_size',
+    help='Maximum size of stdout of a test case to record, in bytes. Longer stdout is truncated in the middle, '
+         'keeping its head and tail. 0 means unlimited.',
+    default=0,
+    type=click.IntRange(min=0),
+    metavar='BYTES',
+)
+@click.option(
+    '--max-stderr-size',
+    'max_stderr_size',
+    help='Maximum size of stderr (including failure messages) of a test case to record, in bytes. '
+         'Longer stderr is truncated in the middle, keeping its head and tail. 0 means unlimited.',
+    default=0,
+    type=click.IntRange(min=0),
+    metavar='BYTES',
+)
 @click.pass_context
 def tests(
     context: click.core.Context,
@@ -189,6 +243,11 @@ def tests(
     lineage: Optional[str] = None,
     test_suite: Optional[str] = None,
     timestamp: Optional[datetime.datetime] = None,
+    parallel: int = 1,
+    post_concurrency: int = 1,
+    max_stdout_size: int = 0,
+    max_stderr_size: int = 0,
+    post_chunk_bytes: int = 0,
 ):
     logger = Logger()
 
@@ -198,6 +257,10 @@ def tests(
 
     tracking_client = TrackingClient(Command.RECORD_TESTS, app=context.obj)
     client = LaunchableClient(test_runner=test_runner, app=context.obj, tracking_client=tracking_client)
+    if not report_paths:
+        client.prefetch_slack_notification_keys()
+    prefetch_startup_requests(client, session, build_name, session_name,
+                              fetch_build=not (is_no_build or subsetting_id))
     set_fail_fast_mode(client.is_fail_fast_mode())
 
     fail_fast_mode_validate(FailFastModeValidateParams(
@@ -242,11 +305,8 @@ def tests(
                 raise click.UsageError(
                     '--build option is required when you uses a --session-name option ')
 
-            sub_path = "builds/{}/test_session_names/{}".format(build_name, session_name)
-            res = client.request("get", sub_path)
-            res.raise_for_status()
-
-            session_id = "builds/{}/test_sessions/{}".format(build_name, res.json().get("id"))
+            session_id = "builds/{}/test_sessions/{}".format(
+                build_name, client.get_test_session_id(build_name, session_name))
             record_start_at = get_record_start_at(session_id, client)
         else:
             # The session_id must be back, so cast to str
@@ -358,10 +418,36 @@ def tests(
             Parse XML report file with the JUnit report file, possibly with the custom parser function 'f'
             that can be used to build JUnit ET.Element tree from scratch or do some patch up.
 
-            If f=None, the default parse code from JUnitParser module is used.
+            If f=None, the report file is parsed in a streaming manner, so that even huge report files can be
+            processed in a constant memory. Otherwise, the whole tree is built in memory by the JUnitParser module.
+
+            The two differ in how a truncated or otherwise malformed report is handled. The streaming parser has
+            already emitted the test cases before the error by the time it finds the error, so those are recorded
+            and only the rest of the file is skipped with a warning, whereas the whole file is skipped otherwise.
+            Holding back the test cases until the end of the file would defeat parsing in a constant memory.
             """
 
+            def parse_stream(report: str) -> Generator[CaseEventType, None, None]:
+                # junitparser is imported only by the test runners that read JUnit XML reports
+                from ...utils.sax import JUnitXmlSaxParser
+
+                parsed = False
+                try:
+                    with open(report, 'rb') as source:
+                        for case, suite in JUnitXmlSaxParser().iterparse(source):
+                            parsed = True
+                            yield CaseEvent.from_case_and_suite(self.path_builder, case, suite, report, self.metadata_builder)
+                except Exception as e:
+                    # keep the same warnings as the non-streaming parser below, where errors in reading the file
+                    # are reported before any test case is processed
+                    warn_and_exit_if_fail_fast_mode(
+                        "Warning: error {action} JUnitXml file {filename}: {error}{note}".format(
+                            action="parsing" if parsed else "reading", filename=report, error=e,
+                            note="\nThe test cases before the error are recorded." if parsed else ""))
+
             def parse(report: str) -> Generator[CaseEventType, None, None]:
+                from junitparser import JUnitXml, TestSuite  # type: ignore
+
                 # To understand JUnit XML format, https://llg.cubic.org/docs/junit/ is helpful
                 # TODO: robustness: what's the best way to deal with broken XML
                 # file, if any?
@@ -391,7 +477,7 @@ def tests(
                         "Warning: error parsing JUnitXml file {filename}: {error}".format(
                             filename=report, error=e))
 
-            self.parse_func = parse
+            self.parse_func = parse_stream if f is None else parse
 
         junitxml_parse_func = property(None, set_junitxml_parse_func)
 
@@ -418,6 +504,10 @@ def tests(
             self.session = session_id
             self.is_no_build = is_no_build
             self.metadata_builder = CaseEvent.default_data_builder()
+            self.parallel = parallel
+            self.recorded_result = RecordedResult()
+            # of the events of every test runner, as they come out of parse_func
+            self.log_truncation = LogTruncation(max_stdout_size, max_stderr_size)
 
         def make_file_path_component(self, filepath) -> TestPathComponent:
             """Create a single TestPathComponent from the given file path"""
@@ -426,6 +516,10 @@ def tests(
             return {"type": "file", "name": filepath}
 
         def report(self, junit_report_file: str):
+            with profiler.phase(DISCOVERY):
+                self._report(junit_report_file)
+
+        def _report(self, junit_report_file: str):
             ctime = datetime.datetime.fromtimestamp(
                 os.path.getctime(junit_report_file))
 
@@ -451,18 +545,30 @@ def tests(
 
             scan('build/test-reports', '**/*.xml')
             """
-            for t in glob.iglob(os.path.join(base, pattern), recursive=True):
+            for t in profiler.wrap(DISCOVERY, glob.iglob(os.path.join(base, pattern), recursive=True)):
                 self.report(t)
 
         def run(self):
-            count = 0  # count number of test cases sent
             is_observation = False
 
+            def parsed_reports(reports: List[str]) -> Generator[Tuple[str, Iterable[CaseEventType]], None, None]:
+                if self.parallel > 1:
+                    if can_parse_in_parallel():
+                        for report, events, error in parse_reports_in_parallel(self.parse_func, reports, self.parallel,
+                                                                               self.log_truncation):
+                            yield report, replay_parse_result(events, error)
+                        return
+
+                    logger.warning("--parallel is not supported on this platform. Parsing report files sequentially.")
+
+                for report in reports:
+                    yield report, (self.log_truncation.apply(tc) for tc in self.parse_func(report))
+
             def testcases(reports: List[str]) -> Generator[CaseEventType, None, None]:
                 exceptions = []
-                for report in reports:
+                for report, events in parsed_reports(reports):
                     try:
-                        for tc in self.parse_func(report):
+                        for tc in events:
                             # trim empty test path
                             if len(tc.get('testPath', [])) == 0:
                                 continue
@@ -483,11 +589,10 @@ def tests(
 
             # generator that creates the payload incrementally
             def payload(
-                    cases: Generator[TestCase, None, None],
+                    cases: Iterator[CaseEventType],
                     test_runner, group: str,
                     test_suite_name: str,
-                    flavors: Dict[str, str]) -> Tuple[Dict[str, Union[str, List, dict, bool]], List[Exception]]:
-                nonlocal count
+                    flavors: Dict[str, str]) -> Tuple[Dict[str, Any], List[Exception]]:
                 cs = []
                 exs = []
 
@@ -499,7 +604,8 @@ def tests(
                     except Exception as ex:
                         exs.append(ex)
 
-                count += len(cs)
+                for c in cs:
+                    self.recorded_result.add(c)
                 return {
                     "events": cs,
                     "testRunner": test_runner,
@@ -512,9 +618,10 @@ def tests(
                     "flavors": flavors,
                 }, exs
 
-            def send(payload: Dict[str, Union[str, List]]) -> None:
+            def send(payload: bytes, codec: Codec, key: str) -> None:
                 res = client.request(
-                    "post", "{}/events".format(self.session), payload=payload, compress=True)
+                    "post", "{}/events".format(self.session), payload=payload, compress=True, codec=codec,
+                    idempotency_key=key, bulk=True)
 
                 if res.status_code == HTTPStatus.NOT_FOUND:
                     if session:
@@ -538,62 +645,146 @@ def tests(
                     self.session = "builds/{}/test_sessions/{}".format(self.build_name, self.test_session_id)
                     self.is_no_build = False
 
-            def recorded_result() -> Tuple[int, int, int, float]:
-                test_count = 0
-                success_count = 0
-                fail_count = 0
-                duration = float(0)
-
-                for tc in testcases(self.reports):
-                    test_count += 1
-                    status = tc.get("status")
-                    if status == 0:
-                        fail_count += 1
-                    elif status == 1:
-                        success_count += 1
-                    duration += float(tc.get("duration") or 0)  # sec
-
-                return test_count, success_count, fail_count, duration / 60   # sec to min
-
-            try:
-                start = time_ns()
-                tc = testcases(self.reports)
-                end = time_ns()
+            def resume(spool: ChunkSpool):
+                pending = spool.pending()
+                click.echo("Resuming {} chunk(s) of test results that couldn't be sent last time".format(len(pending)),
+                           err=True)
+                codec = get_codec(spool.content_encoding())
+                # the summary covers the chunks sent by the previous attempt as well
+                summary = spool.summary()
+                if summary is not None:
+                    self.recorded_result = RecordedResult.from_dict(summary)
+                for index in pending:
+                    data = spool.read(index)
+                    raw = codec.decompress(data)
+                    send(data, codec, idempotency_key(self.session, index, hashlib.sha256(raw).hexdigest()))
+                    spool.ack(index)
+                    if summary is None:
+                        for c in json.loads(raw.decode())["events"]:
+                            self.recorded_result.add(c)
+                spool.clear()
+
+            # report files are parsed lazily as test cases are consumed, so the time is added up as they are
+            parse_time = [0]
+
+            def send_parse_time():
                 tracking_client.send_event(
                     event_name=Tracking.Event.PERFORMANCE,
                     metadata={
-                        "elapsedTime": end - start,
+                        "elapsedTime": parse_time[0],
                         "measurementTarget": "testcases method(parsing report file)"
                     }
                 )
 
+            try:
+                tc = profiler.wrap(PARSE, _timed(testcases(self.reports), parse_time))
+
                 if report_paths:
                     # diagnostics mode to just report test paths
                     for t in tc:
-                        print(unparse_test_path(t['testPath']))
+                        with profiler.phase(OUTPUT):
+                            print(unparse_test_path(t['testPath']))
+                    send_parse_time()
                     return
 
+                # chunks that fail to be sent are spooled, so that retrying the same command sends only those.
+                # With --no-build, the session is only known after sending the first chunk, so there's nothing to resume.
+                spool = None
+                if not self.is_no_build:
+                    spool = ChunkSpool(spool_key(self.session, self.reports))
+                    if spool.is_complete():
+                        resume(spool)
+                        tc = iter([])
+                    elif spool.exists():
+                        logger.warning("Discarding incompletely spooled test results of the previous attempt")
+                        spool.clear()
+
                 start = time_ns()
                 exceptions = []
-                for chunk in ichunked(tc, post_chunk):
-                    p, es = payload(
-                        cases=chunk,
-                        test_runner=test_runner,
-                        group=group,
-                        test_suite_name=test_suite if test_suite else "",
-                        flavors=dict(flavor),
-                    )
-
-                    send(p)
-                    exceptions.extend(es)
+                failure: Optional[Exception] = None
+                chunk_count = 0
+
+                def check_response(index: int, data: bytes, future: Future):
+                    nonlocal failure
+                    try:
+                        future.result()
+                    except Exception as e:
+                        if spool is None:
+                            raise
+                        spool.write(index, data)
+                        if failure is None:
+                            failure = e
+
+                # chunks are sent from worker threads, so that the next chunk can be parsed and compressed while
+                # up to `post_concurrency` requests are in flight. Responses are checked in the order chunks were
+                # created, so errors are reported in that order as well.
+                chunk_sizer = ChunkSizer(post_chunk, post_chunk_bytes)
+                codec = client.codec()
+                # the User-Agent header tells the command, which is looked up from the click context of the thread
+                ctx = click.get_current_context(silent=True)
+                with ThreadPoolExecutor(max_workers=post_concurrency) as executor:
+                    in_flight: Deque[Tuple[int, bytes, Future]] = deque()
+                    while True:
+                        p, es = payload(
+                            cases=islice(tc, chunk_sizer.size),
+                            test_runner=test_runner,
+                            group=group,
+                            test_suite_name=test_suite if test_suite else "",
+                            flavors=dict(flavor),
+                        )
+                        exceptions.extend(es)
+                        if len(p["events"]) == 0:
+                            break
+
+                        # compress here rather than in send(), so that the size of the request is known
+                        # before deciding the size of the next chunk
+                        content_hash = hashlib.sha256()
+                        data = b"".join(profiler.wrap(COMPRESS, codec.compress(
+                            profiler.wrap(SERIALIZE, _updating_hash(jsongen.encode(p), content_hash)))))
+                        chunk_sizer.update(len(p["events"]), len(data))
+                        index = chunk_count
+                        chunk_count += 1
+
+                        if failure is not None and spool is not None:
+                            # stop sending once a chunk failed, and spool the rest for the next attempt
+                            spool.write(index, data)
+                            continue
+
+                        key = idempotency_key(self.session, index, content_hash.hexdigest())
+                        in_flight.append((index, data, executor.submit(run_in_context, ctx, send, data, codec, key)))
+
+                        # with --no-build, the response to the first chunk determines the build and the session
+                        # that the rest of the chunks are sent to
+                        if self.is_no_build or len(in_flight) > post_concurrency:
+                            check_response(*in_flight.popleft())
+
+                    while in_flight:
+                        check_response(*in_flight.popleft())
                 end = time_ns()
+                send_parse_time()
+                rate_controller = client.rate_controller()
                 tracking_client.send_event(
                     event_name=Tracking.Event.PERFORMANCE,
                     metadata={
                         "elapsedTime": end - start,
-                        "measurementTarget": "events API"
+                        "measurementTarget": "events API",
+                        "throttledCount": rate_controller.throttled_count,
+                        "delayedCount": rate_controller.delayed_count,
                     }
                 )
+                if rate_controller.throttled_count > 0:
+                    click.echo(click.style(
+                        "The server asked to slow down {} time(s), and {} request(s) were held back for {:.1f}s "
+                        "in total".format(rate_controller.throttled_count, rate_controller.delayed_count,
+                                          rate_controller.delayed_secs), 'yellow'), err=True)
+
+                if failure is not None and spool is not None:
+                    spool.complete(codec.name, self.recorded_result.to_dict())
+                    click.echo(click.style(
+                        "{} of {} chunk(s) of test results couldn't be sent, and were saved to {}.\n"
+                        "Run the same command again to send only those chunks.".format(
+                            len(spool.pending()), chunk_count, spool.dir), 'yellow'), err=True)
+                    raise failure
 
                 if len(exceptions) > 0:
                     raise Exception(exceptions)
@@ -606,7 +797,7 @@ def tests(
                 client.print_exception_and_recover(e)
                 return
 
-            if count == 0:
+            if self.recorded_result.test_count == 0:
                 if len(self.skipped_reports) != 0:
                     warn_and_exit_if_fail_fast_mode(
                         "{} test report(s) were skipped because they were created before this build was recorded.\n"
@@ -619,43 +810,167 @@ def tests(
                         "Looks like tests didn't run? If not, make sure the right files/directories were passed into `launchable record tests`")  # noqa: E501
                     return
 
-            file_count = len(self.reports)
-            test_count, success_count, fail_count, duration = recorded_result()
+            with profiler.phase(OUTPUT):
+                file_count = len(self.reports)
+                recorded_result = self.recorded_result
+
+                click.echo(
+                    "Launchable recorded tests for build {} (test session {}) to workspace {}/{} from {} files:".format(
+                        self.build_name,
+                        self.test_session_id,
+                        org,
+                        workspace,
+                        file_count,
+                    ))
+
+                if is_observation:
+                    click.echo("(This test session is under observation mode)")
+
+                click.echo("")
+
+                header = ["Files found", "Tests found", "Tests passed", "Tests failed", "Total duration (min)"]
+
+                rows = [[file_count, recorded_result.test_count, recorded_result.success_count, recorded_result.fail_count,
+                         recorded_result.duration_min]]
+                from tabulate import tabulate
+                click.echo(tabulate(rows, header, tablefmt="github", floatfmt=".2f"))
+
+                truncation = self.log_truncation
+                if truncation.truncated_stdout_count > 0 or truncation.truncated_stderr_count > 0:
+                    click.echo(click.style(
+                        "\nTruncated logs of tests exceeding the size limit: stdout of {} test(s), stderr of {} test(s)".format(
+                            truncation.truncated_stdout_count, truncation.truncated_stderr_count), "yellow"))
+
+                if recorded_result.duration_secs == 0:
+                    click.echo(click.style("\nTotal test duration is 0."
+                                           "\nPlease check whether the test duration times in report files are correct.",
+                                           "yellow"))
+
+                click.echo(
+                    "\nVisit https://app.launchableinc.com/organizations/{organization}/workspaces/"
+                    "{workspace}/test-sessions/{test_session_id} to view uploaded test results "
+                    "(or run `launchable inspect tests --test-session-id {test_session_id}`)"
+                    .format(
+                        organization=org,
+                        workspace=workspace,
+                        test_session_id=self.test_session_id,
+                    ))
 
-            click.echo(
-                "Launchable recorded tests for build {} (test session {}) to workspace {}/{} from {} files:".format(
-                    self.build_name,
-                    self.test_session_id,
-                    org,
-                    workspace,
-                    file_count,
-                ))
+    context.obj = RecordTests(dry_run=context.obj.dry_run)
 
-            if is_observation:
-                click.echo("(This test session is under observation mode)")
 
-            click.echo("")
+class RecordedResult:
+    """
+    Tally of the test cases sent by `record tests`. This is accumulated while test cases are uploaded,
+    so that the summary can be shown without parsing report files for the second time.
+    """
 
-            header = ["Files found", "Tests found", "Tests passed", "Tests failed", "Total duration (min)"]
+    def __init__(self):
+        self.test_count = 0
+        self.success_count = 0
+        self.fail_count = 0
+        self.duration_secs = 0.0
+
+    def add(self, tc: CaseEventType):
+        self.test_count += 1
+        status = tc.get("status")
+        if status == CaseEvent.TEST_FAILED:
+            self.fail_count += 1
+        elif status == CaseEvent.TEST_PASSED:
+            self.success_count += 1
+        self.duration_secs += float(tc.get("duration") or 0)
+
+    @property
+    def duration_min(self) -> float:
+        return self.duration_secs / 60
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "testCount": self.test_count,
+            "successCount": self.success_count,
+            "failCount": self.fail_count,
+            "durationSecs": self.duration_secs,
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> 'RecordedResult':
+        r = cls()
+        r.test_count = int(d.get("testCount", 0))
+        r.success_count = int(d.get("successCount", 0))
+        r.fail_count = int(d.get("failCount", 0))
+        r.duration_secs = float(d.get("durationSecs", 0))
+        return r
+
+
+def spool_key(session: str, reports: List[str]) -> str:
+    """
+    Identifies an upload, so that the spool of a failed attempt is only resumed by retrying the same command
+    with the same report files
+    """
+    key = [session]
+    for report in reports:
+        try:
+            stat = os.stat(report)
+            key.append("{}:{}:{}".format(os.path.abspath(report), stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            key.append(os.path.abspath(report))
+    return "\n".join(key)
 
-            rows = [[file_count, test_count, success_count, fail_count, duration]]
-            click.echo(tabulate(rows, header, tablefmt="github", floatfmt=".2f"))
 
-            if duration == 0:
-                click.echo(click.style("\nTotal test duration is 0."
-                                       "\nPlease check whether the test duration times in report files are correct.", "yellow"))
+def idempotency_key(session: str, index: int, content_hash: str) -> str:
+    """
+    Identifies a chunk of test results, so that the server can tell a retried POST of the chunk from a new one.
+    The hash is of the uncompressed content, as compressed data has a timestamp in it.
+    """
+    return hashlib.sha256("{}\n{}\n{}".format(session, index, content_hash).encode()).hexdigest()
 
-            click.echo(
-                "\nVisit https://app.launchableinc.com/organizations/{organization}/workspaces/"
-                "{workspace}/test-sessions/{test_session_id} to view uploaded test results "
-                "(or run `launchable inspect tests --test-session-id {test_session_id}`)"
-                .format(
-                    organization=org,
-                    workspace=workspace,
-                    test_session_id=self.test_session_id,
-                ))
 
-    context.obj = RecordTests(dry_run=context.obj.dry_run)
+def _timed(items: Iterable[T], elapsed: List[int]) -> Iterator[T]:
+    """
+    Adds the nanoseconds it takes to produce each item of a lazy iterable to elapsed[0]
+    """
+    it = iter(items)
+    while True:
+        start = time_ns()
+        try:
+            item = next(it)
+        except StopIteration:
+            return
+        finally:
+            elapsed[0] += time_ns() - start
+        yield item
+
+
+def _updating_hash(chunks: Iterable[bytes], h: Any) -> Iterator[bytes]:
+    for chunk in chunks:
+        h.update(chunk)
+        yield chunk
+
+
+class ChunkSizer:
+    """
+    Decides the number of test cases to send in the next POST of the events API.
+
+    Without a byte budget, this is simply the --post-chunk value. With it, the size is estimated from the
+    compressed size per test case of the last chunk, so that a chunk of test cases with huge logs doesn't
+    turn into a huge request, and a chunk of tiny test cases doesn't waste a round trip.
+    """
+    MIN_SIZE = 10
+    MAX_SIZE = 10000
+
+    def __init__(self, initial_size: int, byte_budget: int = 0):
+        self.size = initial_size
+        self.byte_budget = byte_budget
+        self.min_size = min(self.MIN_SIZE, initial_size)
+        self.max_size = max(self.MAX_SIZE, initial_size)
+
+    def update(self, count: int, compressed_size: int):
+        if self.byte_budget <= 0 or count == 0 or compressed_size == 0:
+            return
+
+        estimate = self.byte_budget * count // compressed_size
+        # shrink right away, but grow gradually, since logs of the following test cases might be larger
+        self.size = max(self.min_size, min(self.max_size, estimate, self.size * 2))
 
 
 # if we fail to determine the timestamp of the build, we err on the side of collecting more test reports
@@ -679,22 +994,26 @@ def get_record_start_at(session: Optional[str], client: LaunchableClient):
 
     sub_path = "builds/{}".format(build_name)
 
-    res = client.request("get", sub_path)
-    if res.status_code != 200:
-        if res.status_code == 404:
-            msg = "Build {} was not found. " \
-                  "Make sure to run `launchable record build --name {}` before `launchable record tests`".format(
-                      build_name, build_name)
-        else:
-            msg = "Unable to determine the timestamp of the build {}. HTTP response code was {}".format(
-                build_name,
-                res.status_code)
-        click.echo(click.style(msg, 'yellow'), err=True)
-
-        # to avoid stop report command
-        return INVALID_TIMESTAMP
-
-    created_at = res.json()["createdAt"]
+    # cached by earlier invocations in this CI job, including `record build`
+    created_at = read_cache(client.cache_key(sub_path))
+    if not isinstance(created_at, str):
+        res = client.get_shared(sub_path)
+        if res.status_code != 200:
+            if res.status_code == 404:
+                msg = "Build {} was not found. " \
+                      "Make sure to run `launchable record build --name {}` before `launchable record tests`".format(
+                          build_name, build_name)
+            else:
+                msg = "Unable to determine the timestamp of the build {}. HTTP response code was {}".format(
+                    build_name,
+                    res.status_code)
+            click.echo(click.style(msg, 'yellow'), err=True)
+
+            # to avoid stop report command
+            return INVALID_TIMESTAMP
+
+        created_at = res.json()["createdAt"]
+        write_cache(client.cache_key(sub_path), created_at, BUILD_CACHE_TTL)
     Logger().debug("Build {} timestamp = {}".format(build_name, created_at))
     t = parse_launchable_timeformat(created_at)
     return t
@@ -702,8 +1021,10 @@ def get_record_start_at(session: Optional[str], client: LaunchableClient):
 
 def parse_launchable_timeformat(t: str) -> datetime.datetime:
     # e.g) "2021-04-01T09:35:47.934+00:00"
+    import dateutil.parser
+
     try:
-        return parse(t)
+        return dateutil.parser.parse(t)
     except Exception as e:
         Logger().error("parse time error {}. time: {}".format(str(e), t))
         return INVALID_TIMESTAMP
@@ -731,16 +1052,103 @@ def get_session_and_record_start_at_from_subsetting_id(subsetting_id: str, clien
     }
 
 
-def get_env_values(client: LaunchableClient) -> Dict[str, str]:
-    sub_path = "slack/notification/key/list"
-    res = client.request("get", sub_path=sub_path)
+# The report parser used by the worker processes of `--parallel`.
+# Parse functions are typically closures over the RecordTests object that can't be pickled,
+# so instead of sending them to workers, we let workers inherit it through fork()
+_worker_parse_func: Optional[Callable[[str], Iterable[CaseEventType]]] = None
 
-    metadata: Dict[str, str] = {}
-    if res.status_code != 200:
-        return metadata
 
-    keys = res.json().get("keys", [])
-    for key in keys:
+def can_parse_in_parallel() -> bool:
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+def _stop_background_threads():
+    """
+    fork() copies the locks that the other threads happen to hold, but not the threads that would release them,
+    so a worker could hang on a lock of logging or of a connection pool. The threads that send requests in the
+    background are stopped before forking, and start again when there's something to send
+    """
+    stop_prefetching()
+    if not stop_tracking_thread():
+        Logger().debug("The thread sending tracking events is still running while forking the workers")
+
+
+def _parse_report_in_worker(report: str, max_stdout_size: int,
+                            max_stderr_size: int) -> Tuple[List[CaseEventType], Optional[BaseException], LogTruncation]:
+    events: List[CaseEventType] = []
+    error: Optional[BaseException] = None
+    # truncated in the worker, so that long logs aren't sent back to the parent process only to be cut there.
+    # The counts are of this report, and the parent process adds them up
+    truncation = LogTruncation(max_stdout_size, max_stderr_size)
+    try:
+        assert _worker_parse_func is not None
+        for tc in _worker_parse_func(report):
+            events.append(truncation.apply(tc))
+    except (Exception, SystemExit) as e:
+        # SystemExit comes from warn_and_exit_if_fail_fast_mode(). Hand it back to the parent process
+        # instead of killing the worker, which would leave the pending result waiting forever.
+        error = e
+    return events, error, truncation
+
+
+def parse_reports_in_parallel(
+        parse_func: Callable[[str], Iterable[CaseEventType]],
+        reports: List[str],
+        parallel: int,
+        log_truncation: LogTruncation,
+) -> Generator[Tuple[str, List[CaseEventType], Optional[BaseException]], None, None]:
+    """
+    Parse report files with a pool of `parallel` worker processes, and yield (report, events, error)
+    in the same order as the given reports.
+
+    Only a limited number of reports are dispatched ahead of the consumer, so that the number of
+    parsed events held in memory stays bounded no matter how many reports there are. The logs of the events
+    are truncated to the limits of 'log_truncation', which counts the truncated ones.
+    """
+    global _worker_parse_func
+    _worker_parse_func = parse_func
+
+    reports_iter = iter(reports)
+    pending: Deque[Tuple[str, multiprocessing.pool.AsyncResult]] = deque()
+
+    _stop_background_threads()
+    with multiprocessing.get_context("fork").Pool(parallel) as pool:
+        def dispatch(n: int):
+            for _ in range(n):
+                report = next(reports_iter, None)
+                if report is None:
+                    return
+                pending.append((report, pool.apply_async(
+                    _parse_report_in_worker,
+                    (report, log_truncation.max_stdout_size, log_truncation.max_stderr_size))))
+
+        dispatch(parallel * 2)
+        while pending:
+            report, result = pending.popleft()
+            dispatch(1)
+            try:
+                events, error, truncation = result.get()
+                log_truncation.add_counts(truncation)
+            except Exception as e:
+                # e.g. the parse result couldn't be sent back from the worker
+                events, error = [], e
+            yield report, events, error
+
+
+def replay_parse_result(events: List[CaseEventType],
+                        error: Optional[BaseException]) -> Generator[CaseEventType, None, None]:
+    """
+    Turn the result of parse_reports_in_parallel() back into a generator that behaves like ParseFunc,
+    including raising the error after the events that were parsed successfully
+    """
+    yield from events
+    if error is not None:
+        raise error
+
+
+def get_env_values(client: LaunchableClient) -> Dict[str, str]:
+    metadata: Dict[str, str] = {}
+    for key in client.get_slack_notification_keys():
         val = os.getenv(key, "")
         metadata[key] = val
 
@@ -6,8 +6,12 @@ import click
 from launchable.testpath import TestPath
 
 from ..app import Application
-from ..utils.click import FRACTION, FractionType
+from ..test_runners import SPLIT_SUBSET
+from ..utils.click import FRACTION, FractionType, LazyGroup
+from ..utils.http_client import RESPONSE_CHUNK_SIZE
+from ..utils.jsonstream import iter_object
 from ..utils.launchable_client import LaunchableClient
+from ..utils.profiler import NETWORK, OUTPUT, PARSE, profiler
 from .test_path_writer import TestPathWriter
 
 SPLIT_BY_GROUPS_NO_GROUP_NAME = "nogroup"
@@ -15,7 +19,7 @@ SPLIT_BY_GROUP_SUBSET_GROUPS_FILE_NAME = "subset-groups.txt"
 SPLIT_BY_GROUP_REST_GROUPS_FILE_NAME = "rest-groups.txt"
 
 
-@click.group(help="Split subsetting tests")
+@click.group(cls=LazyGroup, lazy_commands=SPLIT_SUBSET, help="Split subsetting tests")
 @click.option(
     '--subset-id',
     'subset_id',
@@ -162,9 +166,13 @@ def split_subset(
                     )
                     return
 
-            output_subset = []
-            output_rests = []
+            output_subset: List[TestPath] = []
+            output_rests: List[TestPath] = []
             is_observation = False
+            # the bin is printed as it arrives, unless the test runner or the options need it as a whole
+            printer = None
+            if self.output_handler == self._default_output_handler and not is_output_exclusion_rules:
+                printer = self.printer()
 
             try:
                 payload = {
@@ -241,28 +249,48 @@ def split_subset(
 
                     payload["sameBins"] = same_bins
 
-                res = client.request("POST", "{}/slice".format(subset_id), payload=payload)
+                res = client.request("POST", "{}/slice".format(subset_id), payload=payload, stream=True)
                 res.raise_for_status()
 
-                output_subset = res.json().get("testPaths", [])
-                output_rests = res.json().get("rest", [])
-                is_observation = res.json().get("isObservation", False)
+                # decode the response as it arrives, without holding the whole body in memory
+                chunks = profiler.wrap(NETWORK, profiler.count_bytes_in(res.iter_content(chunk_size=RESPONSE_CHUNK_SIZE)))
+                with profiler.phase(PARSE):
+                    response = dict(iter_object(chunks, {
+                        "testPaths": printer.add if printer else output_subset.append,
+                        "rest": output_rests.append,
+                    }))
+                is_observation = response.get("isObservation", False)
 
-                if len(output_subset) == 0:
+                if (printer.count if printer else len(output_subset)) == 0:
                     click.echo(click.style(
                         "Error: no tests found for this subset id.", 'yellow'), err=True)
                     return
 
+                if printer:
+                    with profiler.phase(OUTPUT):
+                        if is_observation:
+                            for t in output_rests:
+                                printer.add(t)
+                            output_rests = []
+                        if rest:
+                            self.write_file(rest, output_rests)
+                        printer.close()
+                    return
+
                 if is_observation:
                     output_subset = output_subset + output_rests
                     output_rests = []
 
-                if is_output_exclusion_rules:
-                    self.exclusion_output_handler(output_subset, output_rests)
-                else:
-                    self.output_handler(output_subset, output_rests)
+                with profiler.phase(OUTPUT):
+                    if is_output_exclusion_rules:
+                        self.exclusion_output_handler(output_subset, output_rests)
+                    else:
+                        self.output_handler(output_subset, output_rests)
 
             except Exception as e:
+                if printer and printer.count > 0:
+                    # end the part of the bin printed already
+                    printer.close()
                 client.print_exception_and_recover(
                     e, "Warning: the service failed to split subset. Falling back to running all tests")
                 return
@@ -305,12 +333,13 @@ def split_subset(
                     elif group_name != SPLIT_BY_GROUPS_NO_GROUP_NAME:
                         rest_group_names.append(group_name)
 
-                    if is_output_exclusion_rules:
-                        self.split_by_groups_exclusion_output_handler(group_name, subset, rests)
-                    else:
-                        self.split_by_groups_output_handler(group_name, subset, rests)
+                    with profiler.phase(OUTPUT):
+                        if is_output_exclusion_rules:
+                            self.split_by_groups_exclusion_output_handler(group_name, subset, rests)
+                        else:
+                            self.split_by_groups_output_handler(group_name, subset, rests)
 
-                    self._write_split_by_groups_group_names(subset_group_names, rest_group_names)
+                        self._write_split_by_groups_group_names(subset_group_names, rest_group_names)
 
             except Exception as e:
                 client.print_exception_and_recover(e, "Error: the service failed to split subset.", 'red')
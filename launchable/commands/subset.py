@@ -7,30 +7,33 @@ import subprocess
 import sys
 from multiprocessing import Process
 from os.path import join
-from typing import Any, Callable, Dict, List, Optional, Sequence, TextIO, Tuple, Union
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, TextIO, Tuple, Union
 
 import click
-from tabulate import tabulate
 
 from launchable.utils.authentication import get_org_workspace
 from launchable.utils.session import parse_session
 from launchable.utils.tracking import Tracking, TrackingClient
 
 from ..app import Application
+from ..test_runners import SUBSET
 from ..testpath import FilePathNormalizer, TestPath
-from ..utils.click import DURATION, KEY_VALUE, PERCENTAGE, DurationType, PercentageType, ignorable_error
+from ..utils.click import DURATION, KEY_VALUE, PERCENTAGE, DurationType, LazyGroup, PercentageType, ignorable_error
 from ..utils.commands import Command
 from ..utils.env_keys import REPORT_ERROR_KEY
 from ..utils.fail_fast_mode import (FailFastModeValidateParams, fail_fast_mode_validate,
                                     set_fail_fast_mode, warn_and_exit_if_fail_fast_mode)
+from ..utils.http_client import RESPONSE_CHUNK_SIZE
+from ..utils.jsonstream import iter_object
 from ..utils.launchable_client import LaunchableClient
-from .helper import find_or_create_session
-from .test_path_writer import TestPathWriter
+from ..utils.profiler import DISCOVERY, NETWORK, OUTPUT, PARSE, profiler
+from .helper import find_or_create_session, prefetch_startup_requests
+from .test_path_writer import TestPathPrinter, TestPathWriter
 
 # TODO: rename files and function accordingly once the PR landscape
 
 
-@click.group(help="Subsetting tests")
+@click.group(cls=LazyGroup, lazy_commands=SUBSET, help="Subsetting tests")
 @click.option(
     '--target',
     'target',
@@ -243,6 +246,8 @@ def subset(
         app=app,
         tracking_client=tracking_client)
 
+    prefetch_startup_requests(client, session, build_name, session_name,
+                              fetch_session=not is_no_build and (is_observation or is_non_blocking))
     set_fail_fast_mode(client.is_fail_fast_mode())
     fail_fast_mode_validate(FailFastModeValidateParams(
         command=Command.SUBSET,
@@ -295,11 +300,8 @@ def subset(
             if not build_name:
                 raise click.UsageError(
                     '--build option is required when you use a --session-name option ')
-            sub_path = "builds/{}/test_session_names/{}".format(build_name, session_name)
-            client = LaunchableClient(test_runner=context.invoked_subcommand, app=context.obj, tracking_client=tracking_client)
-            res = client.request("get", sub_path)
-            res.raise_for_status()
-            session_id = "builds/{}/test_sessions/{}".format(build_name, res.json().get("id"))
+            session_id = "builds/{}/test_sessions/{}".format(
+                build_name, client.get_test_session_id(build_name, session_name))
         else:
             session_id = find_or_create_session(
                 context=context,
@@ -332,7 +334,7 @@ def subset(
                 client = LaunchableClient(
                     app=app,
                     tracking_client=tracking_client)
-                res = client.request("get", session_id)
+                res = client.get_shared(session_id)
                 is_observation_in_recorded_session = res.json().get("isObservation", False)
                 if not is_observation_in_recorded_session:
                     print_error_and_die(
@@ -385,6 +387,13 @@ def subset(
         def _default_exclusion_output_handler(self, subset: List[TestPath], rest: List[TestPath]):
             self.output_handler(rest, subset)
 
+        def _streams_output(self) -> bool:
+            """
+            Whether the subset is printed as it arrives. Test runners that set their own output handler get
+            the subset as a whole, and so do the options that print something other than the subset
+            """
+            return self.output_handler == self._default_output_handler and not split and not is_output_exclusion_rules
+
         def test_path(self, path: TestPathLike):
             """register one test"""
 
@@ -396,9 +405,10 @@ def subset(
 
             self.input_given = True
             if isinstance(path, str) and any(s in path for s in ('*', "?")):
-                for i in glob.iglob(path, recursive=True):
-                    if os.path.isfile(i):
-                        self.test_paths.append(self.to_test_path(rel_base_path(i)))
+                with profiler.phase(DISCOVERY):
+                    for i in glob.iglob(path, recursive=True):
+                        if os.path.isfile(i):
+                            self.test_paths.append(self.to_test_path(rel_base_path(i)))
             else:
                 self.test_paths.append(self.to_test_path(rel_base_path(path)))
 
@@ -456,12 +466,13 @@ def subset(
 
                 path_builder = default_path_builder
 
-            for b in glob.iglob(base):
-                for t in glob.iglob(join(b, pattern), recursive=True):
-                    if path_builder:
-                        path = path_builder(os.path.relpath(t, b))
-                    if path:
-                        self.test_paths.append(self.to_test_path(path))
+            with profiler.phase(DISCOVERY):
+                for b in glob.iglob(base):
+                    for t in glob.iglob(join(b, pattern), recursive=True):
+                        if path_builder:
+                            path = path_builder(os.path.relpath(t, b))
+                        if path:
+                            self.test_paths.append(self.to_test_path(path))
 
         def get_payload(
             self,
@@ -538,7 +549,7 @@ def subset(
             if not found:
                 warn_and_exit_if_fail_fast_mode("Nothing that looks like a test file in the current git repository.")
 
-        def request_subset(self) -> SubsetResult:
+        def request_subset(self, printer: Optional[TestPathPrinter] = None) -> SubsetResult:
             test_runner = context.invoked_subcommand
             # temporarily extend the timeout because subset API response has become slow
             # TODO: remove this line when API response return response
@@ -556,12 +567,14 @@ def subset(
                 sys.exit(0)
 
             try:
-                res = subset_request(client=client, timeout=timeout, payload=payload)
+                res = subset_request(client=client, timeout=timeout, payload=payload, stream=True)
                 # The status code 422 is returned when validation error of the test mapping file occurs.
                 if res.status_code == 422:
                     print_error_and_die("Error: {}".format(res.reason), Tracking.ErrorEvent.USER_ERROR)
 
-                return SubsetResult.from_response(res.json())
+                chunks = profiler.wrap(NETWORK, profiler.count_bytes_in(res.iter_content(chunk_size=RESPONSE_CHUNK_SIZE)))
+                with profiler.phase(PARSE):
+                    return SubsetResult.from_stream(chunks, printer.add if printer else None)
             except Exception as e:
                 tracking_client.send_error_event(
                     event_name=Tracking.ErrorEvent.INTERNAL_CLI_ERROR,
@@ -569,13 +582,20 @@ def subset(
                 )
                 client.print_exception_and_recover(
                     e, "Warning: the service failed to subset. Falling back to running all tests")
+                if printer:
+                    # the first part of the subset may have been printed already. All the tests follow it, so some
+                    # can be listed twice, as what's printed isn't kept to stay clear of holding the whole output
+                    for t in self.test_paths:
+                        printer.add(t)
+                    return SubsetResult(subset_count=printer.count)
                 return SubsetResult.from_test_paths(self.test_paths)
 
         def run(self):
             """called after tests are scanned to compute the optimized order"""
 
             if self.is_get_tests_from_guess:
-                self._collect_potential_test_files()
+                with profiler.phase(DISCOVERY):
+                    self._collect_potential_test_files()
 
             if not self.is_get_tests_from_previous_sessions and len(self.test_paths) == 0:
                 if self.input_given:
@@ -586,95 +606,110 @@ def subset(
                         Tracking.ErrorEvent.USER_ERROR)
 
             # When Error occurs, return the test name as it is passed.
+            printer = None
             if not session_id:
                 # Session ID in --session is missing. It might be caused by
                 # Launchable API errors.
                 subset_result = SubsetResult.from_test_paths(self.test_paths)
             else:
-                subset_result = self.request_subset()
+                if self._streams_output():
+                    printer = self.printer()
+                subset_result = self.request_subset(printer)
 
-            if len(subset_result.subset) == 0:
+            if subset_result.subset_count == 0:
                 warn_and_exit_if_fail_fast_mode("Error: no tests found matching the path.")
                 return
 
-            if split:
-                click.echo("subset/{}".format(subset_result.subset_id))
-            else:
-                output_subset, output_rests = subset_result.subset, subset_result.rest
+            with profiler.phase(OUTPUT):
+                if split:
+                    click.echo("subset/{}".format(subset_result.subset_id))
+                elif printer:
+                    # the subset is printed already, which the rest follows in the observation mode
+                    output_rests = subset_result.rest
+                    if subset_result.is_observation:
+                        for t in output_rests:
+                            printer.add(t)
+                        output_rests = []
+                    if rest:
+                        self.write_file(rest, output_rests)
+                    printer.close()
+                else:
+                    output_subset, output_rests = subset_result.subset, subset_result.rest
+
+                    if subset_result.is_observation:
+                        output_subset = output_subset + output_rests
+                        output_rests = []
+
+                    if is_output_exclusion_rules:
+                        self.exclusion_output_handler(output_subset, output_rests)
+                    else:
+                        self.output_handler(output_subset, output_rests)
+
+                # When Launchable returns an error, the cli skips showing summary
+                # report
+                original_rest = subset_result.rest
+                summary = subset_result.summary
+                if "subset" not in summary.keys() or "rest" not in summary.keys():
+                    return
+
+                build_name, test_session_id = parse_session(session_id)
+                org, workspace = get_org_workspace()
+
+                header = ["", "Candidates",
+                          "Estimated duration (%)", "Estimated duration (min)"]
+                rows = [
+                    [
+                        "Subset",
+                        subset_result.subset_count,
+                        summary["subset"].get("rate", 0.0),
+                        summary["subset"].get("duration", 0.0),
+                    ],
+                    [
+                        "Remainder",
+                        len(original_rest),
+                        summary["rest"].get("rate", 0.0),
+                        summary["rest"].get("duration", 0.0),
+                    ],
+                    [],
+                    [
+                        "Total",
+                        subset_result.subset_count + len(original_rest),
+                        summary["subset"].get("rate", 0.0) + summary["rest"].get("rate", 0.0),
+                        summary["subset"].get("duration", 0.0) + summary["rest"].get("duration", 0.0),
+                    ],
+                ]
+
+                if subset_result.is_brainless:
+                    click.echo(
+                        "Your model is currently in training", err=True)
 
+                click.echo(
+                    "Launchable created subset {} for build {} (test session {}) in workspace {}/{}".format(
+                        subset_result.subset_id,
+                        build_name,
+                        test_session_id,
+                        org, workspace,
+                    ), err=True,
+                )
                 if subset_result.is_observation:
-                    output_subset = output_subset + output_rests
-                    output_rests = []
+                    click.echo(
+                        "(This test session is under observation mode)",
+                        err=True)
 
-                if is_output_exclusion_rules:
-                    self.exclusion_output_handler(output_subset, output_rests)
-                else:
-                    self.output_handler(output_subset, output_rests)
-
-            # When Launchable returns an error, the cli skips showing summary
-            # report
-            original_subset = subset_result.subset
-            original_rest = subset_result.rest
-            summary = subset_result.summary
-            if "subset" not in summary.keys() or "rest" not in summary.keys():
-                return
+                click.echo("", err=True)
+                from tabulate import tabulate
+                click.echo(tabulate(rows, header, tablefmt="github", floatfmt=".2f"), err=True)
 
-            build_name, test_session_id = parse_session(session_id)
-            org, workspace = get_org_workspace()
-
-            header = ["", "Candidates",
-                      "Estimated duration (%)", "Estimated duration (min)"]
-            rows = [
-                [
-                    "Subset",
-                    len(original_subset),
-                    summary["subset"].get("rate", 0.0),
-                    summary["subset"].get("duration", 0.0),
-                ],
-                [
-                    "Remainder",
-                    len(original_rest),
-                    summary["rest"].get("rate", 0.0),
-                    summary["rest"].get("duration", 0.0),
-                ],
-                [],
-                [
-                    "Total",
-                    len(original_subset) + len(original_rest),
-                    summary["subset"].get("rate", 0.0) + summary["rest"].get("rate", 0.0),
-                    summary["subset"].get("duration", 0.0) + summary["rest"].get("duration", 0.0),
-                ],
-            ]
-
-            if subset_result.is_brainless:
                 click.echo(
-                    "Your model is currently in training", err=True)
-
-            click.echo(
-                "Launchable created subset {} for build {} (test session {}) in workspace {}/{}".format(
-                    subset_result.subset_id,
-                    build_name,
-                    test_session_id,
-                    org, workspace,
-                ), err=True,
-            )
-            if subset_result.is_observation:
-                click.echo(
-                    "(This test session is under observation mode)",
+                    "\nRun `launchable inspect subset --subset-id {}` to view full subset details".format(
+                        subset_result.subset_id),
                     err=True)
 
-            click.echo("", err=True)
-            click.echo(tabulate(rows, header, tablefmt="github", floatfmt=".2f"), err=True)
-
-            click.echo(
-                "\nRun `launchable inspect subset --subset-id {}` to view full subset details".format(subset_result.subset_id),
-                err=True)
-
     context.obj = Optimize(app=context.obj)
 
 
-def subset_request(client: LaunchableClient, timeout: Tuple[int, int], payload: Dict[str, Any]):
-    return client.request("post", "subset", timeout=timeout, payload=payload, compress=True)
+def subset_request(client: LaunchableClient, timeout: Tuple[int, int], payload: Dict[str, Any], stream: bool = False):
+    return client.request("post", "subset", timeout=timeout, payload=payload, compress=True, stream=stream)
 
 
 class SubsetResult:
@@ -685,8 +720,11 @@ class SubsetResult:
             subset_id: str = "",
             summary: Dict[str, Any] = {},
             is_brainless: bool = False,
-            is_observation: bool = False):
+            is_observation: bool = False,
+            subset_count: Optional[int] = None):
         self.subset = subset
+        # the subset isn't kept when it's handed over as it arrives
+        self.subset_count = len(subset) if subset_count is None else subset_count
         self.rest = rest
         self.subset_id = subset_id
         self.summary = summary
@@ -704,6 +742,39 @@ class SubsetResult:
             is_observation=response.get("isObservation", False)
         )
 
+    @classmethod
+    def from_stream(cls, chunks: Iterable[bytes],
+                    on_subset: Optional[Callable[[TestPath], None]] = None) -> 'SubsetResult':
+        """
+        Same as from_response(), but decodes the response body as it arrives, so that the body doesn't need to be
+        held in memory as a whole, on top of the test paths decoded from it.
+
+        If 'on_subset' is given, each test path of the subset is passed to it as soon as it's decoded, instead of
+        being kept in the result.
+        """
+        subset: List[TestPath] = []
+        rest: List[TestPath] = []
+        subset_count = 0
+
+        def add_to_subset(t: TestPath):
+            nonlocal subset_count
+            subset_count += 1
+            if on_subset:
+                on_subset(t)
+            else:
+                subset.append(t)
+
+        response = dict(iter_object(chunks, {"testPaths": add_to_subset, "rest": rest.append}))
+        return cls(
+            subset_count=subset_count,
+            subset=response.get("testPaths", subset),
+            rest=response.get("rest", rest),
+            subset_id=response.get("subsettingId", ""),
+            summary=response.get("summary", {}),
+            is_brainless=response.get("isBrainless", False),
+            is_observation=response.get("isObservation", False)
+        )
+
     @classmethod
     def from_test_paths(cls, test_paths: List[TestPath]) -> 'SubsetResult':
         return cls(
@@ -1,11 +1,15 @@
+from itertools import islice
 from os.path import join
-from typing import Callable, Dict, List, Optional
+from typing import Callable, Dict, Iterator, List, Optional
 
 import click
 
 from ..app import Application
 from ..testpath import TestPath
 
+# number of test paths formatted at a time when writing them out
+WRITE_BATCH_SIZE = 1000
+
 
 class TestPathWriter(object):
     base_path: Optional[str] = None
@@ -46,13 +50,33 @@ class TestPathWriter(object):
     def separator(self, s: str):
         self._separator = s
 
+    def _format_in_batches(self, test_paths: List[TestPath]) -> Iterator[str]:
+        """
+        Formats test paths into separated strings of at most WRITE_BATCH_SIZE test paths each,
+        so that a large number of test paths can be written out without building one huge string
+        """
+        it = iter(test_paths)
+        first = True
+        while True:
+            batch = list(islice(it, WRITE_BATCH_SIZE))
+            if not batch:
+                return
+            s = self.separator.join(self.formatter(t) for t in batch)
+            yield s if first else self.separator + s
+            first = False
+
     def write_file(self, file: str, test_paths: List[TestPath]):
-        open(file, "w+", encoding="utf-8").write(
-            self.separator.join(self.formatter(t) for t in test_paths))
+        with open(file, "w+", encoding="utf-8") as f:
+            for s in self._format_in_batches(test_paths):
+                f.write(s)
 
     def print(self, test_paths: List[TestPath]):
-        click.echo(self.separator.join(self.formatter(t)
-                                       for t in test_paths))
+        for s in self._format_in_batches(test_paths):
+            click.echo(s, nl=False)
+        click.echo("")
+
+    def printer(self) -> 'TestPathPrinter':
+        return TestPathPrinter(self)
 
     @property
     def same_bin_formatter(self) -> Optional[Callable[[str], Dict[str, str]]]:
@@ -61,3 +85,34 @@ class TestPathWriter(object):
     @same_bin_formatter.setter
     def same_bin_formatter(self, v: Callable[[str], Dict[str, str]]):
         self._same_bin_formatter = v
+
+
+class TestPathPrinter(object):
+    """
+    Prints test paths as they are added, in batches of WRITE_BATCH_SIZE, so that the output can start before all
+    the test paths are known. The output is the same as TestPathWriter.print() once closed
+    """
+
+    def __init__(self, writer: TestPathWriter):
+        self.writer = writer
+        self.count = 0
+        self._batch: List[str] = []
+        self._started = False
+
+    def add(self, test_path: TestPath):
+        self._batch.append(self.writer.formatter(test_path))
+        self.count += 1
+        if len(self._batch) >= WRITE_BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if not self._batch:
+            return
+        s = self.writer.separator.join(self._batch)
+        click.echo(self.writer.separator + s if self._started else s, nl=False)
+        self._started = True
+        self._batch = []
+
+    def close(self):
+        self._flush()
+        click.echo("")
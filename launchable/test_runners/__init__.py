@@ -0,0 +1,43 @@
+from typing import Dict
+
+# Modules of the built-in test runners. Each adds the subcommands of 'record tests', 'subset' and 'split-subset'
+# named after it (see launchable.test_runners.launchable.cmdname) when it's imported, which happens only when one of
+# them is run (see launchable.utils.click.LazyGroup). Add new test runners here.
+_RUNNERS = [
+    "adb",
+    "ant",
+    "bazel",
+    "behave",
+    "ctest",
+    "cts",
+    "cucumber",
+    "cypress",
+    "dotnet",
+    "file",
+    "flutter",
+    "go_test",
+    "googletest",
+    "gradle",
+    "jest",
+    "maven",
+    "minitest",
+    "nunit",
+    "playwright",
+    "prove",
+    "pytest",
+    "raw",
+    "robot",
+    "rspec",
+    "vitest",
+    "xctest",
+]
+
+
+def _commands(*excludes: str) -> Dict[str, str]:
+    return {m.replace('_', '-'): "{}.{}".format(__name__, m) for m in _RUNNERS if m not in excludes}
+
+
+# subcommand name -> module of the test runner, for each command
+RECORD_TESTS = _commands()
+SUBSET = _commands()
+SPLIT_SUBSET = _commands("cts", "vitest", "xctest")
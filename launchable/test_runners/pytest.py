@@ -3,7 +3,7 @@ import json
 import os
 import pathlib
 import subprocess
-from typing import Generator, List
+from typing import Any, Dict, Generator, List
 
 import click
 from junitparser import Properties, TestCase  # type: ignore
@@ -133,7 +133,7 @@ def record_tests(client, json_report, source_roots):
 
     def data_builder(case: TestCase):
         props = case.child(Properties)
-        result = {}
+        result: Dict[str, Any] = {}
         if props is not None:
             """
                 Here is an example of an XML file with markers.
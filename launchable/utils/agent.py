@@ -0,0 +1,399 @@
+import io
+import json
+import locale
+import logging
+import os
+import socket
+import struct
+import sys
+import threading
+import traceback
+from typing import IO, Any, Dict, List, Optional, Tuple
+
+import click
+
+from ..version import __version__
+from .click import LazyGroup
+from .env_keys import AGENT_SOCKET_KEY
+
+# The agent is a background process that runs the commands of a CI job in itself, so that they share the imports,
+# the connection pools and what's fetched from the server, instead of each invocation starting from scratch.
+# Invocations of the CLI forward their command to the agent over a Unix domain socket when $LAUNCHABLE_AGENT_SOCKET
+# is set, and run the command themselves when no agent is listening there.
+#
+# Messages are frames of a 1-byte type and a 4-byte length, followed by the data.
+_HEADER = struct.Struct(">cI")
+_REQUEST = b"q"  # client -> agent: JSON of what to do
+_STDIN = b"i"  # client -> agent: bytes of stdin that the agent asked for, empty at the end of stdin
+_STDIN_REQUEST = b"r"  # agent -> client: the maximum number of bytes of stdin to send
+_STDOUT = b"o"  # agent -> client
+_STDERR = b"e"  # agent -> client
+_EXIT = b"x"  # agent -> client: JSON of the exit code, the last frame
+_FALLBACK = b"f"  # agent -> client: run the command yourself, as the agent can't
+
+# seconds to wait for the agent to accept the connection
+CONNECT_TIMEOUT = 1
+
+# the agent quits after this many seconds without commands, in case the job never stops it
+DEFAULT_IDLE_TIMEOUT = 60 * 60
+
+# True in the agent, so that the commands it runs don't forward themselves back to it
+_serving = False
+
+
+def is_serving() -> bool:
+    return _serving
+
+
+def is_supported() -> bool:
+    # Unix domain sockets aren't available on Windows
+    return hasattr(socket, "AF_UNIX")
+
+
+class _Connection:
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        # the command and its background threads can write at the same time
+        self.lock = threading.Lock()
+
+    def send(self, kind: bytes, data: bytes = b""):
+        with self.lock:
+            self.sock.sendall(_HEADER.pack(kind, len(data)) + data)
+
+    def send_json(self, kind: bytes, value: Any):
+        self.send(kind, json.dumps(value).encode())
+
+    def recv(self) -> Tuple[bytes, bytes]:
+        kind, size = _HEADER.unpack(self._recv_exactly(_HEADER.size))
+        return kind, self._recv_exactly(size)
+
+    def _recv_exactly(self, size: int) -> bytes:
+        buf = bytearray(size)
+        view = memoryview(buf)
+        received = 0
+        while received < size:
+            n = self.sock.recv_into(view[received:])
+            if n == 0:
+                raise ConnectionError("the connection was closed")
+            received += n
+        return bytes(buf)
+
+
+def _connect(socket_path: str) -> _Connection:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT)
+        sock.connect(socket_path)
+        # commands take as long as they take
+        sock.settimeout(None)
+    except Exception:
+        sock.close()
+        raise
+    return _Connection(sock)
+
+
+def _call(socket_path: str, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Sends a request that doesn't run a command, and returns the response, or None if no agent is listening
+    """
+    try:
+        conn = _connect(socket_path)
+    except OSError:
+        return None
+    with conn.sock:
+        try:
+            conn.send_json(_REQUEST, request)
+            kind, data = conn.recv()
+        except OSError:
+            return None
+    return json.loads(data.decode()) if kind == _EXIT else None
+
+
+def ping(socket_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns the process ID and the version of the agent listening on the socket, or None if there is none
+    """
+    return _call(socket_path, {"op": "ping"})
+
+
+def stop(socket_path: str) -> bool:
+    """
+    Asks the agent to quit. Returns False if there is no agent to stop
+    """
+    return _call(socket_path, {"op": "stop"}) is not None
+
+
+def forward(args: List[str], prog_name: str = "launchable", stdin: Optional[IO[bytes]] = None,
+            stdout: Optional[IO[bytes]] = None, stderr: Optional[IO[bytes]] = None) -> Optional[int]:
+    """
+    Runs the command in the agent at $LAUNCHABLE_AGENT_SOCKET, as if it ran in this process, and returns
+    its exit code. Returns None if the command is to run in this process instead, as there's no agent to run it.
+    """
+    socket_path = os.environ.get(AGENT_SOCKET_KEY)
+    if not socket_path or not is_supported():
+        return None
+
+    try:
+        conn = _connect(socket_path)
+    except OSError:
+        return None
+
+    stdin = stdin or sys.stdin.buffer
+    stdout = stdout or sys.stdout.buffer
+    stderr = stderr or sys.stderr.buffer
+    with conn.sock:
+        try:
+            conn.send_json(_REQUEST, {
+                "op": "run",
+                "version": __version__,
+                "args": args,
+                "progName": prog_name,
+                "env": dict(os.environ),
+                "cwd": os.getcwd(),
+                "encoding": locale.getpreferredencoding(False),
+                "tty": [_isatty(stdin), _isatty(stdout), _isatty(stderr)],
+            })
+            kind, data = conn.recv()
+        except OSError:
+            # the agent went away before it started the command
+            return None
+        if kind == _FALLBACK:
+            return None
+
+        try:
+            while kind != _EXIT:
+                if kind == _STDOUT:
+                    stdout.write(data)
+                    stdout.flush()
+                elif kind == _STDERR:
+                    stderr.write(data)
+                    stderr.flush()
+                elif kind == _STDIN_REQUEST:
+                    conn.send(_STDIN, _read_stdin(stdin, struct.unpack(">I", data)[0]))
+                kind, data = conn.recv()
+        except OSError as e:
+            # the command might have done some of its work, so running it again here could do it twice
+            click.echo("The Launchable agent at {} stopped in the middle of the command: {}".format(socket_path, e),
+                       err=True)
+            return 1
+
+    return int(json.loads(data.decode())["code"])
+
+
+def _isatty(stream: IO) -> bool:
+    try:
+        return stream.isatty()
+    except Exception:
+        return False
+
+
+def _read_stdin(stdin: IO[bytes], size: int) -> bytes:
+    try:
+        read1 = getattr(stdin, "read1", None)
+        return read1(size) if read1 else stdin.read(size)
+    except (OSError, ValueError):
+        # closed
+        return b""
+
+
+class _FrameWriter(io.RawIOBase):
+    """
+    stdout or stderr of a command that the agent runs, sent to the client
+    """
+
+    def __init__(self, conn: _Connection, kind: bytes, tty: bool):
+        self.conn = conn
+        self.kind = kind
+        self.tty = tty
+
+    def writable(self) -> bool:
+        return True
+
+    def isatty(self) -> bool:
+        return self.tty
+
+    def write(self, b) -> int:
+        try:
+            self.conn.send(self.kind, bytes(b))
+        except OSError:
+            # the client is gone, or a background thread of the command writes after the command ended
+            pass
+        return len(b)
+
+
+class _FrameReader(io.RawIOBase):
+    """
+    stdin of a command that the agent runs, read from the client only when the command reads it,
+    as the client can't tell whether the command needs it
+    """
+
+    def __init__(self, conn: _Connection, tty: bool):
+        self.conn = conn
+        self.tty = tty
+
+    def readable(self) -> bool:
+        return True
+
+    def isatty(self) -> bool:
+        return self.tty
+
+    def readinto(self, b) -> int:
+        self.conn.send(_STDIN_REQUEST, struct.pack(">I", len(b)))
+        kind, data = self.conn.recv()
+        if kind != _STDIN:
+            raise OSError("unexpected message from the client")
+        b[:len(data)] = data
+        return len(data)
+
+
+def serve(socket_path: str, command: click.Command, idle_timeout: int = DEFAULT_IDLE_TIMEOUT):
+    """
+    Runs the commands that clients forward to the socket, one at a time, until stopped or idle for 'idle_timeout'
+    seconds (0 to never time out).
+    """
+    global _serving
+
+    if os.path.exists(socket_path):
+        if ping(socket_path):
+            raise click.ClickException("A Launchable agent is already running at {}".format(socket_path))
+        # left behind by an agent that didn't exit cleanly
+        os.unlink(socket_path)
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # commands run with the environment variables of the client, including the API token,
+    # so no other user may connect
+    umask = os.umask(0o177)
+    try:
+        sock.bind(socket_path)
+    finally:
+        os.umask(umask)
+    sock.listen(16)
+    sock.settimeout(idle_timeout or None)
+
+    _serving = True
+    try:
+        while True:
+            try:
+                s, _ = sock.accept()
+            except socket.timeout:
+                break
+            with s:
+                s.settimeout(None)
+                try:
+                    if not _handle(_Connection(s), command):
+                        break
+                except (OSError, ValueError):
+                    # the client went away, or didn't speak the protocol
+                    pass
+    finally:
+        _serving = False
+        sock.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def _handle(conn: _Connection, command: click.Command) -> bool:
+    """
+    Handles a request. Returns False to stop the agent
+    """
+    kind, data = conn.recv()
+    if kind != _REQUEST:
+        return True
+    request = json.loads(data.decode())
+    op = request.get("op")
+    if op == "stop":
+        conn.send_json(_EXIT, {"code": 0})
+        return False
+    if op == "ping":
+        conn.send_json(_EXIT, {"code": 0, "pid": os.getpid(), "version": __version__})
+        return True
+    if op != "run" or request.get("version") != __version__:
+        # a client of another version, whose commands may be different
+        conn.send(_FALLBACK)
+        return True
+
+    conn.send_json(_EXIT, {"code": _run(conn, command, request)})
+    return True
+
+
+def _run(conn: _Connection, command: click.Command, request: Dict[str, Any]) -> int:
+    """
+    Runs the command as if the client process ran it, with its arguments, environment variables, working directory
+    and standard streams. Returns the exit code
+    """
+    from .fail_fast_mode import set_fail_fast_mode
+
+    encoding = request.get("encoding") or "utf-8"
+    stdin_tty, stdout_tty, stderr_tty = request.get("tty") or [False, False, False]
+    stdin = io.TextIOWrapper(io.BufferedReader(_FrameReader(conn, stdin_tty)), encoding=encoding)
+    stdout = io.TextIOWrapper(io.BufferedWriter(_FrameWriter(conn, _STDOUT, stdout_tty)), encoding=encoding,
+                              errors="replace", line_buffering=True)
+    stderr = io.TextIOWrapper(io.BufferedWriter(_FrameWriter(conn, _STDERR, stderr_tty)), encoding=encoding,
+                              errors="backslashreplace", write_through=True)
+
+    saved_env = dict(os.environ)
+    saved_cwd = os.getcwd()
+    saved_streams = sys.stdin, sys.stdout, sys.stderr
+    sys.stdin, sys.stdout, sys.stderr = stdin, stdout, stderr
+    # so that logging.basicConfig() of the command sets the level it was asked for, and logs to its stderr
+    _reset_logging()
+    # the state of the previous command
+    set_fail_fast_mode(False)
+    try:
+        os.environ.clear()
+        os.environ.update(request["env"])
+        os.chdir(request["cwd"])
+        command.main(request["args"], prog_name=request.get("progName") or "launchable")
+        code = 0
+    except SystemExit as e:
+        code = _exit_code(e)
+    except Exception:
+        traceback.print_exc()
+        code = 1
+    finally:
+        for s in (stdout, stderr):
+            try:
+                s.flush()
+            except Exception:
+                pass
+        sys.stdin, sys.stdout, sys.stderr = saved_streams
+        _reset_logging()
+        os.environ.clear()
+        os.environ.update(saved_env)
+        os.chdir(saved_cwd)
+    return code
+
+
+def _exit_code(e: SystemExit) -> int:
+    if e.code is None:
+        return 0
+    if isinstance(e.code, int):
+        return e.code
+    # sys.exit("message") prints the message, like the interpreter does
+    print(e.code, file=sys.stderr)
+    return 1
+
+
+def _reset_logging():
+    root = logging.getLogger()
+    for h in root.handlers[:]:
+        root.removeHandler(h)
+
+
+class ForwardingGroup(LazyGroup):
+    """
+    Group of the CLI that forwards the subcommand to the agent, if there is one. The options of the group itself
+    are parsed before forwarding, so that errors in them are reported the same either way.
+    """
+
+    def main(self, args=None, prog_name=None, **extra):
+        self.forward_args = list(sys.argv[1:] if args is None else args)
+        return super().main(args, prog_name, **extra)
+
+    def invoke(self, ctx: click.Context):
+        # the agent's own commands are for this process to run, and so are the ones that the agent runs
+        if ctx.protected_args and ctx.protected_args[0] != "agent" and not _serving:
+            code = forward(getattr(self, "forward_args", []), ctx.info_name or "launchable")
+            if code is not None:
+                ctx.exit(code)
+        return super().invoke(ctx)
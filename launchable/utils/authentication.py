@@ -2,7 +2,6 @@ import os
 from typing import Tuple
 
 import click
-import requests
 
 from .env_keys import ORGANIZATION_KEY, TOKEN_KEY, WORKSPACE_KEY
 
@@ -47,6 +46,8 @@ def authentication_headers():
                     "Confirm that you have added necessary permissions following "
                     "https://docs.github.com/en/actions/deployment/security-hardening-your-deployments/configuring-openid-connect-in-cloud-providers#adding-permissions-settings",  # noqa: E501
                     fg="red"))
+        import requests
+
         r = requests.get(req_url,
                          headers={
                              'Authorization': 'Bearer {}'.format(rt_token),
@@ -0,0 +1,102 @@
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .env_keys import DISABLE_CACHE_KEY
+from .session import _session_file_dir
+
+# Values fetched from the server that are worth reusing across CLI invocations in the same CI job.
+# The file sits next to the session file, so it shares the lifecycle of the session file.
+
+
+def _cache_file_path() -> Path:
+    return _session_file_dir() / ".launchable-cache"
+
+
+def _is_cache_disabled() -> bool:
+    return bool(os.environ.get(DISABLE_CACHE_KEY))
+
+
+def _read_entries() -> Dict[str, Dict[str, Any]]:
+    f = _cache_file_path()
+    try:
+        if not f.exists():
+            return {}
+
+        with open(str(f)) as cache_file:
+            entries = json.load(cache_file)
+            return entries if isinstance(entries, dict) else {}
+    except Exception:
+        # the cache is just an optimization. A broken file is as good as no file
+        return {}
+
+
+def _write_entries(entries: Dict[str, Dict[str, Any]]) -> None:
+    d = _session_file_dir()
+    try:
+        if not d.exists():
+            d.mkdir(parents=True, exist_ok=True)
+
+        # write to a temporary file then rename it, so that concurrent CLI invocations never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=str(d), prefix=".launchable-cache.")
+        try:
+            with os.fdopen(fd, 'w') as cache_file:
+                json.dump(entries, cache_file)
+            os.replace(tmp, str(_cache_file_path()))
+        except Exception:
+            os.unlink(tmp)
+            raise
+    except Exception:
+        pass
+
+
+def read_cache(key: str) -> Optional[Any]:
+    """
+    Returns the cached value of the given key, or None if it's not cached or already expired
+    """
+    if _is_cache_disabled():
+        return None
+
+    entry = _read_entries().get(key)
+    if not isinstance(entry, dict) or entry.get("expiresAt", 0) < time.time():
+        return None
+    return entry.get("value")
+
+
+def write_cache(key: str, value: Any, ttl: int) -> None:
+    """
+    Caches the JSON-serializable value for 'ttl' seconds
+    """
+    if _is_cache_disabled():
+        return
+
+    now = time.time()
+    # drop expired entries while we are at it, so that the file doesn't keep growing
+    entries = {k: e for k, e in _read_entries().items() if isinstance(e, dict) and e.get("expiresAt", 0) >= now}
+    entries[key] = {
+        "value": value,
+        "expiresAt": now + ttl,
+    }
+    _write_entries(entries)
+
+
+def invalidate_cache(key: str) -> None:
+    """
+    Drops the cached value of the given key, and the ones under it, such as 'foo/bar' of 'foo'
+    """
+    if _is_cache_disabled():
+        return
+
+    entries = _read_entries()
+    kept = {k: e for k, e in entries.items() if k != key and not k.startswith(key + "/")}
+    if len(kept) != len(entries):
+        _write_entries(kept)
+
+
+def clear_cache() -> None:
+    f = _cache_file_path()
+    if f.exists():
+        f.unlink()
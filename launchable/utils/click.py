@@ -1,12 +1,12 @@
 import datetime
+import importlib
 import re
 import sys
-from typing import Dict, Optional, Tuple
+from typing import Any, Callable, Dict, Optional, Tuple, Union
 
 import click
-import dateutil.parser
 from click import ParamType
-from dateutil.tz import tzlocal
+from click.globals import pop_context, push_context
 
 # click.Group has the notion of hidden commands but it doesn't allow us to easily add
 # the same command under multiple names and hide all but one.
@@ -15,15 +15,46 @@ from dateutil.tz import tzlocal
 class GroupWithAlias(click.Group):
     def __init__(self, name: Optional[str] = None, commands: Optional[Dict[str, click.Command]] = None, **attrs):
         super().__init__(name, commands, **attrs)
-        self.aliases: Dict[str, str] = {}
+        self.aliases: Dict[str, Union[str, click.Command]] = {}
 
     def get_command(self, ctx: click.core.Context, cmd_name: str):
-        return super().get_command(ctx, cmd_name) or self.aliases.get(cmd_name)
-
-    def add_alias(self, name: str, cmd: str):
+        cmd = super().get_command(ctx, cmd_name)
+        if cmd is None and cmd_name in self.aliases:
+            alias = self.aliases[cmd_name]
+            # an alias is either a command, or the name of one that is yet to be loaded
+            cmd = self.get_command(ctx, alias) if isinstance(alias, str) else alias
+        return cmd
+
+    def add_alias(self, name: str, cmd: Union[str, click.Command]):
         self.aliases[name] = cmd
 
 
+class LazyGroup(GroupWithAlias):
+    """
+    Group whose subcommands are only imported when they're run, so that a command doesn't pay for
+    importing all the others and their dependencies.
+
+    'lazy_commands' maps the name of each subcommand to 'module:attribute' of the command, or to a module
+    that adds the command to this group when it's imported, like a test runner does.
+    """
+
+    def __init__(self, name: Optional[str] = None, commands: Optional[Dict[str, click.Command]] = None,
+                 lazy_commands: Optional[Dict[str, str]] = None, **attrs):
+        super().__init__(name, commands, **attrs)
+        self.lazy_commands = dict(lazy_commands or {})
+
+    def get_command(self, ctx: click.core.Context, cmd_name: str):
+        if cmd_name not in self.commands and cmd_name in self.lazy_commands:
+            module, _, attr = self.lazy_commands[cmd_name].partition(":")
+            m = importlib.import_module(module)
+            if attr:
+                self.add_command(getattr(m, attr), cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def list_commands(self, ctx: click.core.Context):
+        return sorted(set(self.commands) | set(self.lazy_commands))
+
+
 class PercentageType(ParamType):
     name = "percentage"
 
@@ -107,6 +138,10 @@ class DateTimeWithTimezoneType(ParamType):
     name = "datetime"
 
     def convert(self, value: str, param: Optional[click.core.Parameter], ctx: Optional[click.core.Context]):
+        # dateutil takes a while to import, and only a few options need it
+        import dateutil.parser
+        from dateutil.tz import tzlocal
+
         try:
             dt = dateutil.parser.parse(value)
             if dt.tzinfo is None:
@@ -179,8 +214,24 @@ def validate_past_datetime(ctx, param, value):
     if not isinstance(value, datetime.datetime):
         raise click.BadParameter("Expected a datetime object.")
 
+    from dateutil.tz import tzlocal
+
     now = datetime.datetime.now(tz=tzlocal())
     if value >= now:
         raise click.BadParameter("The provided datetime must be in the past. But the value is {}".format(value))
 
     return value
+
+
+def run_in_context(ctx: Optional[click.Context], f: Callable[..., Any], *args) -> Any:
+    """
+    Calls the function with the click context pushed, as the context is per thread.
+    Use this to run a function that looks up the current context, such as the HTTP client, in another thread.
+    """
+    if ctx is None:
+        return f(*args)
+    push_context(ctx)
+    try:
+        return f(*args)
+    finally:
+        pop_context()
@@ -1,4 +1,5 @@
 import hashlib
+import json
 from datetime import tzinfo
 from typing import Dict, List, Optional
 
@@ -55,5 +56,7 @@ def upload_commits(commits: List[GitCommit], app: Application):
     }
 
     client = LaunchableClient(app=app)
-    res = client.request("post", "commits/collect", payload=payload)
+    # the same commits are the same request, so it's safe to retry
+    key = _sha256(json.dumps(payload, sort_keys=True))
+    res = client.request("post", "commits/collect", payload=payload, idempotency_key=key, bulk=True)
     res.raise_for_status()
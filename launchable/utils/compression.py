@@ -0,0 +1,134 @@
+import gzip
+import os
+from abc import ABCMeta, abstractmethod
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, Optional, Type
+
+from .gzipgen import compress as gzipgen_compress
+from .gzipgen import compress_parallel as gzipgen_compress_parallel
+from .logger import Logger
+
+DEFAULT_CODEC = "gzip"
+
+# magic numbers of file formats that are compressed already, and don't get any smaller by compressing them again:
+# gzip, zstd, zip (and jar, docx, ...), bzip2, xz, 7z, png and jpeg
+COMPRESSED_MAGIC_NUMBERS = [
+    b"\x1f\x8b",
+    b"\x28\xb5\x2f\xfd",
+    b"PK\x03\x04",
+    b"BZh",
+    b"\xfd7zXZ\x00",
+    b"7z\xbc\xaf\x27\x1c",
+    b"\x89PNG",
+    b"\xff\xd8\xff",
+]
+MAGIC_NUMBER_SIZE = max(len(m) for m in COMPRESSED_MAGIC_NUMBERS)
+
+
+class Codec(metaclass=ABCMeta):
+    """
+    Compression of request bodies. The name is the value of the Content-Encoding header.
+    'threads' is the number of threads to compress with, or 0 for the number of CPUs.
+    """
+    name = ""
+    default_level = 0
+    min_level = 0
+    max_level = 0
+
+    def __init__(self, level: Optional[int] = None, threads: int = 1):
+        if level is not None and not (self.min_level <= level <= self.max_level):
+            raise ValueError("Compression level of {} must be between {} and {}".format(
+                self.name, self.min_level, self.max_level))
+        self.level = self.default_level if level is None else level
+        self.threads = threads or os.cpu_count() or 1
+
+    @abstractmethod
+    def compress(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Takes a stream of data, then returns a generator that yields the compressed stream
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def decompress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+
+class GzipCodec(Codec):
+    name = "gzip"
+    default_level = 6
+    min_level = 0
+    max_level = 9
+
+    def compress(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        if self.threads > 1:
+            return gzipgen_compress_parallel(chunks, self.level, self.threads)
+        return gzipgen_compress(chunks, self.level)
+
+    def decompress(self, data: bytes) -> bytes:
+        return gzip.decompress(data)
+
+
+class ZstdCodec(Codec):
+    """
+    Compresses several times faster than gzip at a similar ratio. Requires the optional 'zstandard' package.
+    """
+    name = "zstd"
+    default_level = 3
+    min_level = 1
+    max_level = 22
+
+    def __init__(self, level: Optional[int] = None, threads: int = 1):
+        super().__init__(level, threads)
+        import zstandard  # type: ignore
+        self.zstd = zstandard
+
+    def compress(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        # zstd has its own multi-threaded mode, where 1 means a worker thread besides the caller
+        c = self.zstd.ZstdCompressor(level=self.level, threads=self.threads if self.threads > 1 else 0).compressobj()
+        for data in chunks:
+            compressed = c.compress(data)
+            if len(compressed) > 0:
+                yield compressed
+        yield c.flush()
+
+    def decompress(self, data: bytes) -> bytes:
+        # ZstdDecompressor.decompress() needs the content size in the frame header, which a stream doesn't have
+        return self.zstd.ZstdDecompressor().decompressobj().decompress(data)
+
+
+CODECS: Dict[str, Type[Codec]] = {
+    GzipCodec.name: GzipCodec,
+    ZstdCodec.name: ZstdCodec,
+}
+
+
+def get_codec(name: str = DEFAULT_CODEC, level: Optional[int] = None, threads: int = 1) -> Codec:
+    """
+    Raises ValueError for an unknown codec or level, and ImportError if the package the codec needs isn't installed
+    """
+    codec = CODECS.get(name)
+    if codec is None:
+        raise ValueError("Unknown compression: {}. Choose from {}".format(name, ", ".join(CODECS.keys())))
+    return codec(level, threads)
+
+
+@lru_cache(maxsize=None)
+def configured_codec(name: Optional[str] = None, level: Optional[int] = None, threads: int = 1) -> Codec:
+    """
+    Codec selected by the user, falling back to gzip if it's not available here.
+    Cached, so that the warning is shown only once per process.
+    """
+    try:
+        return get_codec(name or DEFAULT_CODEC, level, threads)
+    except ImportError as e:
+        Logger().warning("{} compression isn't available ({}). Using {} instead".format(name, e, DEFAULT_CODEC))
+        # the level is meant for the other codec
+        return get_codec(DEFAULT_CODEC, threads=threads)
+
+
+def is_compressed(head: bytes) -> bool:
+    """
+    Tells if data starting with the given bytes is in a compressed format already
+    """
+    return any(head.startswith(m) for m in COMPRESSED_MAGIC_NUMBERS)
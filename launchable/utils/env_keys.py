@@ -5,3 +5,12 @@ WORKSPACE_KEY = "LAUNCHABLE_WORKSPACE"
 BASE_URL_KEY = "LAUNCHABLE_BASE_URL"
 SKIP_TIMEOUT_RETRY = "LAUNCHABLE_SKIP_TIMEOUT_RETRY"
 COMMIT_TIMEOUT = "LAUNCHABLE_COMMIT_TIMEOUT"
+DISABLE_CACHE_KEY = "LAUNCHABLE_DISABLE_CACHE"
+HTTP_POOL_SIZE_KEY = "LAUNCHABLE_HTTP_POOL_SIZE"
+HTTP_KEEP_ALIVE_KEY = "LAUNCHABLE_HTTP_KEEP_ALIVE"
+TRACKING_FLUSH_TIMEOUT_KEY = "LAUNCHABLE_TRACKING_FLUSH_TIMEOUT"
+AUDIT_PAYLOAD_DIR_KEY = "LAUNCHABLE_AUDIT_PAYLOAD_DIR"
+COMPRESSION_KEY = "LAUNCHABLE_COMPRESSION"
+COMPRESSION_LEVEL_KEY = "LAUNCHABLE_COMPRESSION_LEVEL"
+COMPRESSION_THREADS_KEY = "LAUNCHABLE_COMPRESSION_THREADS"
+AGENT_SOCKET_KEY = "LAUNCHABLE_AGENT_SOCKET"
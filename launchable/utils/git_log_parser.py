@@ -2,8 +2,6 @@ import json
 from collections import namedtuple
 from typing import Any, Dict, List, TextIO
 
-import dateutil.parser
-
 ChangedFile = namedtuple('ChangedFile', ['path', 'added', 'deleted'])
 
 GitCommit = namedtuple('GitCommit', [
@@ -19,6 +17,8 @@ def parse_git_log(fp: TextIO) -> List[GitCommit]:
     "parents": "%P", "authorEmail": "%ae", "authorTime": "%aI",
     "committerEmail": "%ce", "committerTime": "%cI"}' --numstat`
     """
+    import dateutil.parser
+
     ret = []
     meta: Dict[str, Any] = {}
     files: List[ChangedFile] = []
@@ -1,8 +1,20 @@
 # MIT License, from https://github.com/leetreveil/gengzip
+import os
 import struct
 import time
 import zlib
 from builtins import int
+from collections import deque
+from typing import TYPE_CHECKING, Deque, Iterable, Iterator
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+# size of the blocks that compress_parallel() compresses independently of each other. Same as pigz
+PARALLEL_BLOCK_SIZE = 128 * 1024
+# each block is compressed with the tail of the previous block as the preset dictionary, so that the ratio is
+# almost as good as compressing the whole stream at once. This is the window size of deflate
+DICTIONARY_SIZE = 32 * 1024
 
 
 def write32u(value):
@@ -44,3 +56,55 @@ def compress(d, compresslevel=6):
         if len(compressed) > 0:
             yield compressed
     yield compress.flush() + write_gzip_footer(crc, size)
+
+
+def _blocks(d: Iterable[bytes], block_size: int) -> Iterator[bytes]:
+    """
+    Regroups a stream of data into blocks of 'block_size' bytes, except the last one
+    """
+    buf = bytearray()
+    for data in d:
+        buf += data
+        if len(buf) >= block_size:
+            n = len(buf) - len(buf) % block_size
+            for i in range(0, n, block_size):
+                yield bytes(buf[i:i + block_size])
+            del buf[:n]
+    if buf:
+        yield bytes(buf)
+
+
+def _compress_block(block: bytes, dictionary: bytes, compresslevel: int) -> bytes:
+    compress = zlib.compressobj(
+        compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS, zlib.DEF_MEM_LEVEL, 0, dictionary)
+    # a sync flush ends the block at a byte boundary without marking it as the last one,
+    # so that the compressed blocks can be concatenated into one deflate stream
+    return compress.compress(block) + compress.flush(zlib.Z_SYNC_FLUSH)
+
+
+def compress_parallel(d, compresslevel=6, threads=None, block_size=PARALLEL_BLOCK_SIZE):
+    """
+    Same as compress(), but compresses blocks of the stream on 'threads' threads (the number of CPUs by default),
+    as zlib releases the GIL while compressing. Like pigz, the result is a single gzip stream.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    threads = threads or os.cpu_count() or 1
+    crc = zlib.crc32(b'') & 0xffffffff
+    size = 0
+    yield write_gzip_header()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        pending: Deque['Future'] = deque()
+        dictionary = b''
+        for block in _blocks(d, block_size):
+            crc = zlib.crc32(block, crc) & 0xffffffff
+            size += len(block)
+            pending.append(executor.submit(_compress_block, block, dictionary, compresslevel))
+            dictionary = block[-DICTIONARY_SIZE:]
+            # keep the threads busy, without reading ahead the whole stream
+            while len(pending) > threads * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    # an empty block marked as the last one terminates the deflate stream
+    yield zlib.compressobj(compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS).flush() + write_gzip_footer(crc, size)
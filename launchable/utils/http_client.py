@@ -1,22 +1,32 @@
-import gzip
 import json
+import logging
 import os
 import platform
-from typing import IO, BinaryIO, Dict, Optional, Tuple, Union
+import random
+import socket
+import threading
+import time
+from typing import IO, TYPE_CHECKING, BinaryIO, Dict, List, Optional, Tuple, Union
 
 import click
 from click import Context
-from requests import Session
-from requests.adapters import HTTPAdapter
-from requests.packages.urllib3.util.retry import Retry  # type: ignore
 
 from launchable.version import __version__
 
 from ..app import Application
+from . import jsongen
 from .authentication import authentication_headers
-from .env_keys import BASE_URL_KEY, SKIP_TIMEOUT_RETRY
-from .gzipgen import compress as gzipgen_compress
-from .logger import AUDIT_LOG_FORMAT, Logger
+from .compression import MAGIC_NUMBER_SIZE, Codec, configured_codec, is_compressed
+from .env_keys import BASE_URL_KEY, HTTP_KEEP_ALIVE_KEY, HTTP_POOL_SIZE_KEY, SKIP_TIMEOUT_RETRY
+from .logger import Logger
+from .profiler import COMPRESS, NETWORK, SERIALIZE, profiler
+from .rate_controller import RateController, parse_retry_after
+
+if TYPE_CHECKING:
+    # requests is imported once a request is about to be sent, as it takes longer to import than
+    # some commands take to run
+    from requests import Session
+    from requests.adapters import HTTPAdapter
 
 DEFAULT_BASE_URL = "https://api.mercury.launchableinc.com"
 
@@ -25,6 +35,23 @@ DEFAULT_TIMEOUT: Tuple[int, int] = (5, 60)
 DEFAULT_GET_TIMEOUT: Tuple[int, int] = (5, 15)
 
 MAX_RETRIES = 3
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+# POSTs with an idempotency key are retried in the client, as the Retry of urllib3 can't tell them from other POSTs.
+# The wait before the Nth retry is random up to BACKOFF_FACTOR * 2^N seconds ("full jitter"), so that clients
+# that failed at the same time don't retry at the same time either.
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+POST_RETRY_BACKOFF_FACTOR = 2
+
+# chunk size to read a streamed response body with
+RESPONSE_CHUNK_SIZE = 64 * 1024
+
+# chunk size to read a file to be compressed with. Compressors run much faster on large inputs than on many small ones
+READ_CHUNK_SIZE = 1024 * 1024
+
+# same as the default of requests. Should be at least the number of threads that send requests concurrently,
+# or connections beyond this are thrown away after use instead of being reused
+DEFAULT_POOL_SIZE = 10
 
 
 def get_base_url():
@@ -42,33 +69,117 @@ class DryRunResponse:
     def json(self):
         return self.payload
 
+    def iter_content(self, chunk_size=1):
+        yield json.dumps(self.payload).encode()
 
-class _HttpClient:
-    def __init__(self, base_url: str = "", session: Optional[Session] = None,
-                 test_runner: Optional[str] = "", app: Optional[Application] = None):
-        self.base_url = base_url or get_base_url()
-        self.dry_run = bool(app and app.dry_run)
-        self.skip_cert_verification = bool(app and app.skip_cert_verification)
 
-        if session is None:
-            read = MAX_RETRIES
-            if os.getenv(SKIP_TIMEOUT_RETRY):
-                read = 0
+def _keep_alive_adapter(keep_alive: int, **kwargs) -> 'HTTPAdapter':
+    """
+    HTTPAdapter that turns on TCP keep-alive, so that pooled connections idling between requests
+    aren't silently dropped by proxies and NAT in between
+    """
+    from requests.adapters import HTTPAdapter
+
+    class _KeepAliveHTTPAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            options: List[Tuple[int, int, int]] = [(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+                                                   (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+            # the idle time before sending keep-alive probes is only tunable on some platforms
+            if hasattr(socket, "TCP_KEEPIDLE"):
+                options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, keep_alive))  # type: ignore
+            kwargs["socket_options"] = options
+            super().init_poolmanager(*args, **kwargs)
+
+    return _KeepAliveHTTPAdapter(**kwargs)
+
+
+# Sessions are shared by all the clients in the process, such as LaunchableClient, TrackingClient and
+# the ones of nested commands, so that they all reuse the same connections instead of doing TLS handshakes
+# on their own.
+_sessions: Dict[Tuple[str, int], 'Session'] = {}
+_sessions_lock = threading.Lock()
+
+# Likewise, the pressure on the server is tracked across all the clients in the process
+_rate_controllers: Dict[str, RateController] = {}
+
+
+def _get_session(base_url: str) -> 'Session':
+    from requests import Session
+    from requests.adapters import HTTPAdapter
+    from requests.packages.urllib3.util.retry import Retry  # type: ignore
+
+    read = MAX_RETRIES
+    if os.getenv(SKIP_TIMEOUT_RETRY):
+        read = 0
+
+    with _sessions_lock:
+        key = (base_url, read)
+        s = _sessions.get(key)
+        if s is None:
             strategy = Retry(
                 total=MAX_RETRIES,
                 read=read,
                 allowed_methods=["GET", "PUT", "PATCH", "DELETE"],
-                status_forcelist=[429, 500, 502, 503, 504],
+                status_forcelist=RETRY_STATUSES,
                 backoff_factor=2
             )
 
-            adapter = HTTPAdapter(max_retries=strategy)
+            pool_size = int(os.getenv(HTTP_POOL_SIZE_KEY) or DEFAULT_POOL_SIZE)
+            keep_alive = int(os.getenv(HTTP_KEEP_ALIVE_KEY) or 0)
+            adapter: HTTPAdapter
+            if keep_alive > 0:
+                adapter = _keep_alive_adapter(keep_alive, max_retries=strategy, pool_maxsize=pool_size)
+            else:
+                adapter = HTTPAdapter(max_retries=strategy, pool_maxsize=pool_size)
             s = Session()
             s.mount("http://", adapter)
             s.mount("https://", adapter)
-            self.session = s
+            _sessions[key] = s
+        return s
+
+
+def _get_rate_controller(base_url: str) -> RateController:
+    with _sessions_lock:
+        c = _rate_controllers.get(base_url)
+        if c is None:
+            # more requests in flight than pooled connections wouldn't make it any faster
+            c = RateController(int(os.getenv(HTTP_POOL_SIZE_KEY) or DEFAULT_POOL_SIZE))
+            _rate_controllers[base_url] = c
+        return c
+
+
+def _connection_stats(session: 'Session', url: str) -> str:
+    """
+    Describes how well connections to the host of the given URL are reused
+    """
+    from requests.adapters import HTTPAdapter
+
+    adapter = session.get_adapter(url)
+    if not isinstance(adapter, HTTPAdapter):
+        return ""
+    try:
+        pool = adapter.poolmanager.connection_from_url(url)
+    except Exception:
+        return ""
+    # num_requests includes retries
+    return "connection pool {}: {} request(s) over {} connection(s)".format(
+        pool.host, pool.num_requests, pool.num_connections)
+
+
+class _HttpClient:
+    def __init__(self, base_url: str = "", session: Optional['Session'] = None,
+                 test_runner: Optional[str] = "", app: Optional[Application] = None):
+        self.base_url = base_url or get_base_url()
+        self.dry_run = bool(app and app.dry_run)
+        self.skip_cert_verification = bool(app and app.skip_cert_verification)
+        self.codec = configured_codec(app.compression, app.compression_level,
+                                      app.compression_threads) if app else configured_codec()
+
+        if session is None:
+            self.session = _get_session(self.base_url)
         else:
             self.session = session  # type: ignore
+        self.rate_controller = _get_rate_controller(self.base_url)
 
         self.test_runner = test_runner
 
@@ -76,22 +187,43 @@ class _HttpClient:
         self,
         method: str,
         path: str,
-        payload: Optional[Union[Dict, BinaryIO]] = None,
+        payload: Optional[Union[Dict, BinaryIO, bytes]] = None,
         params: Optional[Dict] = None,
         timeout: Tuple[int, int] = DEFAULT_TIMEOUT,
         compress: bool = False,
         additional_headers: Optional[Dict] = None,
+        stream: bool = False,
+        codec: Optional[Codec] = None,
+        idempotency_key: Optional[str] = None,
+        bulk: bool = False,
     ):
+        """
+        When 'compress' is set, the payload is compressed with 'codec', or the one the user selected if not given.
+        A payload of bytes is expected to be compressed by the caller already.
+
+        'idempotency_key' tells the server that requests with the same key are the same request, which makes it safe
+        to retry a POST on errors. It has to be unique to the content of the request.
+
+        'bulk' is for requests that upload a lot of data, such as test results. They go through the rate controller,
+        so that they slow down together when the server is under pressure.
+        """
         url = _join_paths(self.base_url, path)
 
         if (timeout == DEFAULT_TIMEOUT and method.upper() == "GET"):
             timeout = DEFAULT_GET_TIMEOUT
 
-        headers = self._headers(compress)
+        content_codec: Optional[Codec] = None
+        if compress and not _is_compressed_file(payload):
+            content_codec = codec or self.codec
+
+        headers = self._headers(content_codec)
+        if idempotency_key:
+            headers[IDEMPOTENCY_KEY_HEADER] = idempotency_key
         if additional_headers:
             headers = {**headers, **additional_headers}
 
-        Logger().audit(AUDIT_LOG_FORMAT.format("(DRY RUN) " if self.dry_run else "", method, url, headers, payload))
+        Logger().audit_request(self.dry_run, method, url, headers,
+                               lambda: _payload_for_audit(payload, content_codec))
 
         if self.dry_run and method.upper() not in ["HEAD", "GET"]:
             return DryRunResponse(status_code=200, payload={
@@ -100,16 +232,67 @@ class _HttpClient:
                 "rest": [],  # `split_subset` use this
             })
 
-        data = _build_data(payload, compress)
+        data = _build_data(payload, content_codec)
+
+        # a generator or a file can't be sent again
+        retries = 0
+        if idempotency_key and method.upper() == "POST" and (data is None or isinstance(data, bytes)):
+            retries = MAX_RETRIES
+
+        from requests import ConnectionError, Timeout
+
+        controller = self.rate_controller if bulk else None
+        attempt = 0
+        with profiler.phase(NETWORK):
+            while True:
+                sent_at = controller.acquire() if controller else 0.0
+                response = None
+                profiler.add_traffic(bytes_out=_body_size(data), requests=1)
+                try:
+                    # the 'data' argument accepts generator. whenever we can potentially send a large amount of data,
+                    # we want to use generator to stream data
+                    response = self.session.request(method, url, headers=headers, timeout=timeout, data=data,
+                                                    params=params, verify=(not self.skip_cert_verification),
+                                                    stream=stream)
+                except (ConnectionError, Timeout) as e:
+                    if attempt >= retries:
+                        raise
+                    error = str(e)
+                finally:
+                    if controller and response is None:
+                        controller.release(sent_at)
+                    elif controller and response is not None:
+                        controller.release(sent_at, response.status_code,
+                                           parse_retry_after(response.headers.get("Retry-After")))
+
+                retry_after = None
+                if response is not None:
+                    if attempt >= retries or response.status_code not in RETRY_STATUSES:
+                        break
+                    error = "status {}".format(response.status_code)
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    # give the connection back to the pool
+                    response.close()
+
+                attempt += 1
+                wait = random.uniform(0, POST_RETRY_BACKOFF_FACTOR * 2 ** attempt)
+                # the rate controller holds off bulk requests until Retry-After by itself
+                if retry_after and controller is None:
+                    wait = max(wait, retry_after)
+                Logger().warning("{} {} failed ({}). Retrying in {:.1f}s ({}/{})".format(
+                    method.upper(), url, error, wait, attempt, retries))
+                time.sleep(wait)
+
+        # a streamed body is counted as the caller reads it
+        if not stream:
+            profiler.add_traffic(bytes_in=len(response.content))
 
-        # the 'data' argument accepts generator. whenever we can potentially send a large amount of data,
-        # we want to use generator to stream data
-        response = self.session.request(method, url, headers=headers, timeout=timeout, data=data,
-                                        params=params, verify=(not self.skip_cert_verification))
         Logger().debug(
             "received response status:{} message:{} headers:{}".format(response.status_code, response.reason,
                                                                        response.headers)
         )
+        if Logger().logger.isEnabledFor(logging.DEBUG):
+            Logger().debug(_connection_stats(self.session, url))
 
         # because (I believe, though I could be wrong) HTTP/2 got rid of status message, our server side HTTP stack
         # doesn't let us forward the status message (=response.reason), which would have been otherwise a very handy
@@ -124,7 +307,7 @@ class _HttpClient:
 
         return response
 
-    def _headers(self, compress):
+    def _headers(self, codec: Optional[Codec]):
         h = {
             "User-Agent": "Launchable/{} (Python {}, {})".format(
                 __version__,
@@ -134,8 +317,8 @@ class _HttpClient:
             "Content-Type": "application/json"
         }
 
-        if compress:
-            h["Content-Encoding"] = "gzip"
+        if codec:
+            h["Content-Encoding"] = codec.name
 
         if self.test_runner != "":
             h["User-Agent"] = h["User-Agent"] + " TestRunner/{}".format(self.test_runner)
@@ -165,12 +348,12 @@ def format_context(ctx: click.Context) -> str:
     """
     _ctx: Optional[Context] = ctx
     while _ctx:
-        cmds.append(ctx.command.name)
+        cmds.append(_ctx.command.name)
         _ctx = _ctx.parent
     return '%s(%s)' % ('>'.join(cmds), os.getpid())
 
 
-def _file_to_generator(f: IO, chunk_size=4096):
+def _file_to_generator(f: IO, chunk_size=READ_CHUNK_SIZE):
     """
     Returns a generator that reads from a given file-like object
     """
@@ -181,23 +364,66 @@ def _file_to_generator(f: IO, chunk_size=4096):
         yield data
 
 
-def _build_data(payload: Optional[Union[BinaryIO, Dict]], compress: bool):
+def _is_compressed_file(payload: Optional[Union[BinaryIO, Dict, bytes]]) -> bool:
+    """
+    Tells if the payload is a file in a compressed format already, such as a .gz or a .zip file,
+    which isn't worth spending CPU time compressing again
+    """
+    if payload is None or isinstance(payload, (bytes, dict)):
+        return False
+    try:
+        if not payload.seekable():
+            return False
+        pos = payload.tell()
+        head = payload.read(MAGIC_NUMBER_SIZE)
+        payload.seek(pos)
+    except (AttributeError, OSError):
+        return False
+    return is_compressed(head)
+
+
+def _payload_for_audit(payload: Optional[Union[BinaryIO, Dict, bytes]], codec: Optional[Codec]):
+    if isinstance(payload, bytes):
+        # show what's in a pre-encoded payload rather than its compressed bytes
+        return (codec.decompress(payload) if codec else payload).decode(errors="replace")
+    return payload
+
+
+def _build_data(payload: Optional[Union[BinaryIO, Dict, bytes]], codec: Optional[Codec]):
     if payload is None:
         return None
+    if isinstance(payload, bytes):
+        # already encoded by the caller, and already compressed as well if 'codec' is set
+        return payload
     if isinstance(payload, dict):
-        encoded = json.dumps(payload).encode()
-        if compress:
-            return gzip.compress(encoded)
+        if codec:
+            # compress JSON as it's encoded, so that only the compressed body, which is typically several times
+            # smaller, is held in memory. The body is not sent as a stream, so that it has Content-Length,
+            # and can be sent again on retries.
+            return b"".join(profiler.wrap(COMPRESS, codec.compress(profiler.wrap(SERIALIZE, jsongen.encode(payload)))))
         else:
-            return encoded
+            with profiler.phase(SERIALIZE):
+                return json.dumps(payload).encode()
     else:
         # payload is BinaryIO
-        if compress:
+        if codec:
             # this produces a generator
-            return gzipgen_compress(_file_to_generator(payload))
+            return profiler.count_bytes_out(profiler.wrap(COMPRESS, codec.compress(_file_to_generator(payload))))
         else:
             return payload
 
 
+def _body_size(data) -> int:
+    """
+    Size of a request body, other than a stream that is counted as it's sent
+    """
+    if isinstance(data, bytes):
+        return len(data)
+    try:
+        return os.fstat(data.fileno()).st_size - data.tell()
+    except (AttributeError, OSError, ValueError):
+        return 0
+
+
 def _join_paths(*components):
     return '/'.join([c.strip('/') for c in components])
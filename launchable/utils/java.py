@@ -2,11 +2,13 @@ import os
 import shutil
 import subprocess
 import sys
-from typing import Callable
-from unittest import TestCase, TestSuite
+from typing import TYPE_CHECKING, Callable
 
 from launchable.testpath import TestPath
 
+if TYPE_CHECKING:
+    from junitparser import TestCase, TestSuite  # noqa: F401
+
 
 def get_java_command():
     if shutil.which("java"):
@@ -34,7 +36,8 @@ def cygpath(p):
 
 
 def junit5_nested_class_path_builder(
-        default_path_builder: Callable[[TestCase, TestSuite, str], TestPath]) -> Callable[[TestCase, TestSuite, str], TestPath]:
+        default_path_builder: Callable[['TestCase', 'TestSuite', str], TestPath]
+) -> Callable[['TestCase', 'TestSuite', str], TestPath]:
     """
     Creates a path builder function that handles JUnit 5 nested class names.
 
@@ -51,7 +54,7 @@ def junit5_nested_class_path_builder(
     Returns:
         A function that wraps the default path builder and handles nested class names
     """
-    def path_builder(case: TestCase, suite: TestSuite, report_file: str) -> TestPath:
+    def path_builder(case: 'TestCase', suite: 'TestSuite', report_file: str) -> TestPath:
         test_path = default_path_builder(case, suite, report_file)
         return [{**item, "name": item["name"].split("$")[0]} if item["type"] == "class" else item for item in test_path]
 
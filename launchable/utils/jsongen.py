@@ -0,0 +1,49 @@
+import json
+from typing import Any, Generator, Iterator
+
+# The incremental encoder of the json module is written in pure Python, and is several times slower than
+# json.dumps. So instead, only dicts up to this depth are walked through, and lists, which are what make payloads
+# large (e.g. test paths and events), are encoded by json.dumps in slices of this many elements.
+MAX_WALK_DEPTH = 2
+LIST_SLICE_SIZE = 1000
+
+
+def _walk(o: Any, depth: int) -> Iterator[str]:
+    if isinstance(o, dict) and depth < MAX_WALK_DEPTH and all(isinstance(k, str) for k in o.keys()):
+        yield "{"
+        for i, (k, v) in enumerate(o.items()):
+            if i > 0:
+                yield ", "
+            yield json.dumps(k)
+            yield ": "
+            yield from _walk(v, depth + 1)
+        yield "}"
+    elif isinstance(o, (list, tuple)):
+        yield "["
+        for i in range(0, len(o), LIST_SLICE_SIZE):
+            if i > 0:
+                yield ", "
+            # strip the brackets of the slice
+            yield json.dumps(o[i:i + LIST_SLICE_SIZE])[1:-1]
+        yield "]"
+    else:
+        yield json.dumps(o)
+
+
+def encode(o: Any, chunk_size=64 * 1024) -> Generator[bytes, None, None]:
+    """
+    Takes a JSON serializable object, then returns a generator that yields its JSON encoding in chunks of
+    about 'chunk_size' bytes, so that the whole JSON document never needs to be in memory at once.
+    The result is the same as json.dumps(o).encode()
+    """
+    buf = []
+    size = 0
+    for s in _walk(o, 0):
+        buf.append(s)
+        size += len(s)
+        if size >= chunk_size:
+            yield "".join(buf).encode()
+            buf = []
+            size = 0
+    if buf:
+        yield "".join(buf).encode()
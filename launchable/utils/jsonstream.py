@@ -0,0 +1,153 @@
+import codecs
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+_WHITESPACE = " \t\n\r"
+# characters that can follow a value. Anything else might be the rest of a number split across chunks
+_DELIMITERS = _WHITESPACE + ",:]}"
+_ARRAY_SEPARATOR = re.compile(r"[ \t\n\r]*([,\]])[ \t\n\r]*")
+
+# consumed part of the buffer is dropped once it grows beyond this many characters
+_COMPACT_THRESHOLD = 64 * 1024
+
+
+class _Reader:
+    """
+    Buffer over a stream of byte chunks, that decodes JSON values one by one as enough data arrives
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.json_decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        """
+        Reads the next chunk into the buffer. Returns False at the end of the stream
+        """
+        if self.eof:
+            return False
+
+        if self.pos > _COMPACT_THRESHOLD:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.eof = True
+            self.buf += self.decoder.decode(b"", final=True)
+        else:
+            self.buf += self.decoder.decode(chunk)
+        return True
+
+    def peek(self) -> str:
+        """
+        Skips whitespaces, then returns the next character without consuming it
+        """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON")
+
+    def expect(self, c: str):
+        if self.peek() != c:
+            raise ValueError("Expecting '{}' at {}".format(c, self.buf[self.pos:self.pos + 20]))
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        # Reading until the value can be decoded would be quadratic for a value spanning many chunks,
+        # so retry only after the buffer doubles
+        retry_size = 0
+        while True:
+            if len(self.buf) - self.pos >= retry_size or self.eof:
+                try:
+                    v, end = self.json_decoder.raw_decode(self.buf, self.pos)
+                    # a number at the end of the buffer (e.g. "-7." of "-7.5") might continue in the next chunk.
+                    # Any value is followed by a delimiter unless it's at the end of the stream.
+                    if self.eof or (end < len(self.buf) and self.buf[end] in _DELIMITERS):
+                        self.pos = end
+                        return v
+                except json.JSONDecodeError:
+                    if self.eof:
+                        raise
+                retry_size = (len(self.buf) - self.pos) * 2
+            self._fill()
+
+    def array(self, handler: Callable[[Any], None]):
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+
+        decode = self.json_decoder.raw_decode
+        while True:
+            # fast path: decode the elements that are complete in the buffer, without going through value()
+            buf = self.buf
+            pos = self.pos
+            while True:
+                try:
+                    v, end = decode(buf, pos)
+                except json.JSONDecodeError:
+                    break
+                # no separator means the element (or the separator) might continue in the next chunk
+                m = _ARRAY_SEPARATOR.match(buf, end)
+                if m is None:
+                    break
+                handler(v)
+                pos = m.end()
+                if m.group(1) == "]":
+                    self.pos = pos
+                    return
+            self.pos = pos
+
+            # slow path: read more data until the element is complete
+            handler(self.value())
+            if self.peek() == ",":
+                self.pos += 1
+                # the fast path expects the next element right at the position
+                self.peek()
+            else:
+                self.expect("]")
+                return
+
+
+def iter_object(chunks: Iterable[bytes],
+                array_item_handlers: Optional[Dict[str, Callable[[Any], None]]] = None) -> Iterator[Tuple[str, Any]]:
+    """
+    Decodes a JSON object from a stream of byte chunks, such as `requests.Response.iter_content()`,
+    as the chunks arrive, and yields its (key, value) pairs.
+
+    The elements of the arrays of the keys in 'array_item_handlers' are passed to the handler one by one
+    as they are decoded, instead of being yielded as a whole.
+    """
+    handlers = array_item_handlers or {}
+    r = _Reader(chunks)
+    r.expect("{")
+    if r.peek() == "}":
+        return
+
+    while True:
+        key = r.value()
+        if not isinstance(key, str):
+            raise ValueError("Expecting a property name but got {}".format(key))
+        r.expect(":")
+
+        handler = handlers.get(key)
+        if handler is not None and r.peek() == "[":
+            r.array(handler)
+        else:
+            yield key, r.value()
+
+        if r.peek() == ",":
+            r.expect(",")
+        else:
+            r.expect("}")
+            return
@@ -1,20 +1,43 @@
 import os
-from typing import BinaryIO, Dict, Optional, Tuple, Union
+import threading
+from typing import TYPE_CHECKING, BinaryIO, Dict, List, Optional, Tuple, Union
 
 import click
-import requests
-from requests import HTTPError, Session, Timeout
 
 from launchable.utils.http_client import _HttpClient, _join_paths
 from launchable.utils.tracking import Tracking, TrackingClient  # type: ignore
 
 from ..app import Application
 from .authentication import get_org_workspace
+from .cache import read_cache, write_cache
+from .click import run_in_context
+from .compression import Codec
 from .env_keys import REPORT_ERROR_KEY
+from .rate_controller import RateController
+
+if TYPE_CHECKING:
+    from concurrent.futures import ThreadPoolExecutor
+
+    import requests
+    from requests import Session
+
+# The keys are configured per workspace and rarely change, so repeated CLI invocations can reuse them for a while
+SLACK_NOTIFICATION_KEYS_CACHE_TTL = 60 * 60
+SLACK_NOTIFICATION_KEYS_PATH = "slack/notification/key/list"
+
+# The state of the workspace can be changed any time, but a CI job can go with what it was a moment ago.
+# `record build` and `record session` fetch it afresh
+WORKSPACE_STATE_CACHE_TTL = 5 * 60
+# builds and test sessions don't change once created, so they are reused for as long as a CI job would take
+BUILD_CACHE_TTL = 24 * 60 * 60
+
+# sends the requests of prefetch() in the background. A command needs only a handful of them at startup
+_prefetch_executor: Optional['ThreadPoolExecutor'] = None
+_prefetch_lock = threading.Lock()
 
 
 class LaunchableClient:
-    def __init__(self, tracking_client: Optional[TrackingClient] = None, base_url: str = "", session: Optional[Session] = None,
+    def __init__(self, tracking_client: Optional[TrackingClient] = None, base_url: str = "", session: Optional['Session'] = None,
                  test_runner: Optional[str] = "", app: Optional[Application] = None):
         self.http_client = _HttpClient(
             base_url=base_url,
@@ -23,6 +46,7 @@ class LaunchableClient:
             app=app
         )
         self.tracking_client = tracking_client
+        self.app = app
         self.organization, self.workspace = get_org_workspace()
         if self.organization is None or self.workspace is None:
             raise ValueError(
@@ -31,17 +55,24 @@ class LaunchableClient:
                 "(or LAUNCHABLE_ORGANIZATION and LAUNCHABLE_WORKSPACE) environment variable(s)\n"
                 "See https://docs.launchableinc.com/getting-started#setting-your-api-key")
         self._workspace_state_cache: Optional[Dict[str, Union[str, bool]]] = None
+        self._slack_notification_keys_cache: Optional[List[str]] = None
 
     def request(
         self,
         method: str,
         sub_path: str,
-        payload: Optional[Union[Dict, BinaryIO]] = None,
+        payload: Optional[Union[Dict, BinaryIO, bytes]] = None,
         params: Optional[Dict] = None,
         timeout: Tuple[int, int] = (5, 60),
         compress: bool = False,
         additional_headers: Optional[Dict] = None,
-    ) -> requests.Response:
+        stream: bool = False,
+        codec: Optional[Codec] = None,
+        idempotency_key: Optional[str] = None,
+        bulk: bool = False,
+    ) -> 'requests.Response':
+        from requests import HTTPError, Timeout
+
         path = _join_paths(
             "/intake/organizations/{}/workspaces/{}".format(self.organization, self.workspace),
             sub_path
@@ -65,7 +96,11 @@ class LaunchableClient:
                 params=params,
                 timeout=timeout,
                 compress=compress,
-                additional_headers=additional_headers
+                additional_headers=additional_headers,
+                stream=stream,
+                codec=codec,
+                idempotency_key=idempotency_key,
+                bulk=bulk,
             )
             return response
         except ConnectionError as e:
@@ -80,6 +115,48 @@ class LaunchableClient:
         # should never come here, but needed to make type checker happy
         assert False
 
+    def prefetch(self, sub_path: str):
+        """
+        Starts GET of the path in the background, so that the requests a command needs before getting to work
+        are sent concurrently rather than one after another. The response is shared with get_shared() of the same
+        path in this invocation, including the ones of nested commands like `record session`.
+        """
+        if self.app is None:
+            return
+
+        global _prefetch_executor
+        with _prefetch_lock:
+            if sub_path in self.app.prefetched:
+                return
+            if _prefetch_executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                _prefetch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="launchable-prefetch")
+            # the User-Agent header tells the command, which is looked up from the click context of the thread
+            self.app.prefetched[sub_path] = _prefetch_executor.submit(
+                run_in_context, click.get_current_context(silent=True), self.request, "get", sub_path)
+
+    def get_shared(self, sub_path: str) -> 'requests.Response':
+        """
+        GET of the path, reusing the response of prefetch() or get_shared() of the same path in this invocation
+        """
+        if self.app is None:
+            return self.request("get", sub_path)
+
+        from concurrent.futures import Future
+
+        with _prefetch_lock:
+            future = self.app.prefetched.get(sub_path)
+            owner = future is None
+            if future is None:
+                future = self.app.prefetched[sub_path] = Future()
+
+        if owner:
+            try:
+                future.set_result(self.request("get", sub_path))
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
     def print_exception_and_recover(self, e: Exception, warning: Optional[str] = None, warning_color='yellow'):
         """
         Print the exception raised from the request method, then recover from it
@@ -91,6 +168,8 @@ class LaunchableClient:
         if os.getenv(REPORT_ERROR_KEY):
             raise e
 
+        from requests import HTTPError
+
         click.echo(e, err=True)
         if isinstance(e, HTTPError):
             # if the payload is present, report that as well to assist troubleshooting
@@ -101,9 +180,27 @@ class LaunchableClient:
         if warning:
             click.echo(click.style(warning, fg=warning_color), err=True)
 
+    def is_dry_run(self) -> bool:
+        """
+        Whether requests other than GET only pretend to be sent, and their responses are made up
+        """
+        return self.http_client.dry_run
+
     def base_url(self) -> str:
         return self.http_client.base_url
 
+    def codec(self) -> Codec:
+        """
+        Codec that compressed payloads are sent in
+        """
+        return self.http_client.codec
+
+    def rate_controller(self) -> RateController:
+        """
+        Rate controller of bulk requests, which counts how often the server throttled them
+        """
+        return self.http_client.rate_controller
+
     def is_fail_fast_mode(self) -> bool:
         state = self._get_workspace_state()
         return state.get('fail_fast_mode', False)
@@ -118,8 +215,12 @@ class LaunchableClient:
         """
         if self._workspace_state_cache is not None:
             return self._workspace_state_cache
+        state = read_cache(self.cache_key("state"))
+        if isinstance(state, dict):
+            self._workspace_state_cache = state
+            return state
         try:
-            res = self.request("get", "state")
+            res = self.get_shared("state")
             res.raise_for_status()
 
             state = res.json()
@@ -127,8 +228,84 @@ class LaunchableClient:
                 'fail_fast_mode': state.get('isFailFastMode', False),
                 'pts_v2': state.get('isPtsV2Enabled', False),
             }
+            write_cache(self.cache_key("state"), self._workspace_state_cache, WORKSPACE_STATE_CACHE_TTL)
             return self._workspace_state_cache
         except Exception as e:
             self.print_exception_and_recover(e, "Failed to get workspace state")
 
         return {}
+
+    def get_test_session_id(self, build_name: str, session_name: str) -> Optional[int]:
+        """
+        Looks up the ID of the test session of the build by its name
+        """
+        sub_path = "builds/{}/test_session_names/{}".format(build_name, session_name)
+        session_id = read_cache(self.cache_key(sub_path))
+        if session_id is not None:
+            return session_id
+
+        res = self.get_shared(sub_path)
+        res.raise_for_status()
+        session_id = res.json().get("id")
+        if session_id is not None:
+            write_cache(self.cache_key(sub_path), session_id, BUILD_CACHE_TTL)
+        return session_id
+
+    def cache_key(self, sub_path: str) -> str:
+        """
+        Key of what's cached of the path of this workspace across CLI invocations (see launchable.utils.cache).
+        The key is scoped by the server as well, so that switching LAUNCHABLE_BASE_URL never serves what another
+        server returned.
+        """
+        return "{}/{}/{}/{}".format(self.http_client.base_url.rstrip("/"), self.organization, self.workspace, sub_path)
+
+    def prefetch_unless_cached(self, sub_path: str):
+        """
+        Starts prefetch() of the path, unless what's needed of it is cached by an earlier invocation
+        """
+        if read_cache(self.cache_key(sub_path)) is None:
+            self.prefetch(sub_path)
+
+    def get_slack_notification_keys(self) -> List[str]:
+        """
+        Get the names of the environment variables that are sent along with test results for Slack notifications.
+        """
+        if self._slack_notification_keys_cache is not None:
+            return self._slack_notification_keys_cache
+
+        keys = read_cache(self._slack_notification_keys_cache_key())
+        if not isinstance(keys, list):
+            res = self.get_shared(SLACK_NOTIFICATION_KEYS_PATH)
+            if res.status_code != 200:
+                # not worth retrying for every chunk of test results
+                self._slack_notification_keys_cache = []
+                return self._slack_notification_keys_cache
+
+            keys = res.json().get("keys", [])
+            write_cache(self._slack_notification_keys_cache_key(), keys, SLACK_NOTIFICATION_KEYS_CACHE_TTL)
+
+        self._slack_notification_keys_cache = keys
+        return keys
+
+    def prefetch_slack_notification_keys(self):
+        """
+        Starts fetching the keys for get_slack_notification_keys(), unless they are cached
+        """
+        if not isinstance(read_cache(self._slack_notification_keys_cache_key()), list):
+            self.prefetch(SLACK_NOTIFICATION_KEYS_PATH)
+
+    def _slack_notification_keys_cache_key(self) -> str:
+        return self.cache_key("slack/notification/keys")
+
+
+def stop_prefetching():
+    """
+    Waits for the requests of prefetch() to finish, and stops the threads that sent them. Their responses are still
+    available to get_shared(), and prefetch() starts the threads again
+    """
+    global _prefetch_executor
+    with _prefetch_lock:
+        executor = _prefetch_executor
+        _prefetch_executor = None
+    if executor is not None:
+        executor.shutdown(wait=True)
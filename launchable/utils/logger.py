@@ -1,4 +1,12 @@
+import itertools
+import json
 import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from .env_keys import AUDIT_PAYLOAD_DIR_KEY
 
 LOG_LEVEL_DEFAULT = logging.WARNING
 LOG_LEVEL_DEFAULT_STR = "DEFAULT"
@@ -7,6 +15,10 @@ LOG_LEVEL_AUDIT_STR = "AUDIT"
 
 AUDIT_LOG_FORMAT = "{}send request method:{} path:{} headers:{} args:{}"
 
+# When $LAUNCHABLE_AUDIT_PAYLOAD_DIR is set, payloads larger than this many characters are written to a file
+# in that directory, and the audit log refers to the file instead
+AUDIT_PAYLOAD_FILE_THRESHOLD = 64 * 1024
+
 logging.addLevelName(LOG_LEVEL_AUDIT, "AUDIT")
 
 
@@ -29,6 +41,53 @@ def get_log_level(level=str) -> int:
         return LOG_LEVEL_DEFAULT
 
 
+class AuditRequestMessage:
+    """
+    Audit log message of an HTTP request. The message is rendered only when the log record is emitted, so
+    a request costs nothing extra while the AUDIT level is disabled. The fields are also available as is,
+    for handlers that want to process them in a structured form.
+    """
+    _file_counter = itertools.count()
+    _file_counter_lock = threading.Lock()
+
+    def __init__(self, dry_run: bool, method: str, url: str, headers: Dict[str, str], payload: Callable[[], Any]):
+        self.dry_run = dry_run
+        self.method = method
+        self.url = url
+        self.headers = headers
+        # evaluated lazily, as rendering the payload could be expensive
+        self.payload = payload
+        self._message: Optional[str] = None
+
+    def __str__(self) -> str:
+        # a record can be formatted once per handler. Make sure the payload is only rendered (and written) once
+        if self._message is None:
+            self._message = AUDIT_LOG_FORMAT.format(
+                "(DRY RUN) " if self.dry_run else "", self.method, self.url, self.headers, self._render_payload())
+        return self._message
+
+    def _render_payload(self) -> Any:
+        payload = self.payload()
+        d = os.getenv(AUDIT_PAYLOAD_DIR_KEY)
+        if not d or payload is None:
+            return payload
+
+        s = json.dumps(payload) if isinstance(payload, dict) else str(payload)
+        if len(s) <= AUDIT_PAYLOAD_FILE_THRESHOLD:
+            return payload
+
+        with self._file_counter_lock:
+            n = next(self._file_counter)
+        path = os.path.join(d, "audit-{}-{}-{}.json".format(int(time.time()), os.getpid(), n))
+        try:
+            os.makedirs(d, exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(s)
+        except OSError as e:
+            return "(failed to write {} characters to {}: {})".format(len(s), path, e)
+        return "(written to {})".format(path)
+
+
 class Logger(object):
     def __init__(self, name: str = "launchable"):
         logger = logging.getLogger(name)
@@ -37,6 +96,10 @@ class Logger(object):
     def audit(self, msg, *args, **kargs):
         self.logger.log(LOG_LEVEL_AUDIT, msg, *args, **kargs)
 
+    def audit_request(self, dry_run: bool, method: str, url: str, headers: Dict[str, str], payload: Callable[[], Any]):
+        if self.logger.isEnabledFor(LOG_LEVEL_AUDIT):
+            self.audit(AuditRequestMessage(dry_run, method, url, headers, payload))
+
     def debug(self, msg, *args, **kargs):
         self.logger.debug(msg, *args, **kargs)
 
@@ -0,0 +1,272 @@
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+import click
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None  # type: ignore
+
+if TYPE_CHECKING:
+    import cProfile
+
+T = TypeVar('T')
+
+# phases of a command, in the order they typically happen
+DISCOVERY = "discovery"  # finding test files and report files
+PARSE = "parse"  # parsing test reports and test lists
+SERIALIZE = "serialize"  # encoding request bodies into JSON
+COMPRESS = "compress"  # compressing request bodies
+NETWORK = "network"  # waiting for the server
+OUTPUT = "output"  # writing the results
+PHASES = [DISCOVERY, PARSE, SERIALIZE, COMPRESS, NETWORK, OUTPUT]
+
+# CPU time of the calling thread, so that phases running in different threads don't count each other's time.
+# time.thread_time() is new in Python 3.7
+_cpu_time = getattr(time, "thread_time", time.process_time)
+
+# phases end as often as every test case, so the memory is looked up at most this often (in seconds)
+RSS_SAMPLE_INTERVAL = 0.05
+
+
+def _max_rss() -> int:
+    """
+    Peak resident memory of the process so far, in bytes
+    """
+    # on Linux, getrusage() carries over the peak of the parent process when this process was started from a larger
+    # process, such as a build tool, with fork() and exec(). The high water mark in /proc is of this process alone
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+
+    if resource is None:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class PhaseStats:
+    def __init__(self):
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.count = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.requests = 0
+        # peak memory of the process when the phase last ended
+        self.max_rss = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "wallTime": self.wall_time,
+            "cpuTime": self.cpu_time,
+            "count": self.count,
+            "bytesOut": self.bytes_out,
+            "bytesIn": self.bytes_in,
+            "requests": self.requests,
+            "maxRss": self.max_rss,
+        }
+
+
+class Profiler:
+    """
+    Measures where a command spends its time, for `launchable --profile`.
+
+    Phases nest, like the generators that parse, serialize and compress test results inside each other. The time of
+    an inner phase is not counted in the outer phase, so each phase tells its own share. Phases are tracked per
+    thread, and the ones running in different threads at the same time add up to more than the wall time.
+
+    Does nothing until enabled, so that the instrumented code doesn't slow down otherwise.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.stats: Dict[str, PhaseStats] = {}
+        self.start_time = 0.0
+        self.end_time = 0.0
+        # CPU time of the whole process
+        self.start_cpu_time = 0.0
+        self.end_cpu_time = 0.0
+        self.cprofile: Optional['cProfile.Profile'] = None
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.rss = 0
+        self.rss_sampled_at = 0.0
+
+    def start(self, cprofile: bool = False):
+        """
+        Starts measuring from scratch. With 'cprofile', the calls of the main thread are profiled as well
+        """
+        self.enabled = True
+        self.stats = {p: PhaseStats() for p in PHASES}
+        self.start_time = time.perf_counter()
+        self.end_time = 0.0
+        self.start_cpu_time = time.process_time()
+        self.end_cpu_time = 0.0
+        self.local = threading.local()
+        self.rss = _max_rss()
+        self.rss_sampled_at = self.start_time
+        self.cprofile = None
+        if cprofile:
+            import cProfile
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self.end_time = time.perf_counter()
+        self.end_cpu_time = time.process_time()
+        if self.cprofile:
+            self.cprofile.disable()
+
+    @contextmanager
+    def phase(self, name: str):
+        if not self.enabled:
+            yield
+            return
+
+        self._enter(name)
+        try:
+            yield
+        finally:
+            self._exit()
+
+    def _enter(self, name: str):
+        stack: Optional[List[List[Any]]] = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        now, cpu = time.perf_counter(), _cpu_time()
+        if stack:
+            self._add(stack[-1], now, cpu)
+        # the phase, and when it was last entered or resumed
+        stack.append([name, now, cpu])
+
+    def _exit(self):
+        stack: List[List[Any]] = self.local.stack
+        now, cpu = time.perf_counter(), _cpu_time()
+        self._add(stack.pop(), now, cpu, ended=True)
+        if stack:
+            # resume the outer phase
+            stack[-1][1], stack[-1][2] = now, cpu
+
+    def _add(self, entry: List[Any], now: float, cpu: float, ended: bool = False):
+        with self.lock:
+            s = self.stats.get(entry[0])
+            if s is None:
+                s = self.stats[entry[0]] = PhaseStats()
+            s.wall_time += now - entry[1]
+            s.cpu_time += cpu - entry[2]
+            if ended:
+                s.count += 1
+                if now - self.rss_sampled_at >= RSS_SAMPLE_INTERVAL:
+                    self.rss_sampled_at = now
+                    self.rss = _max_rss()
+                s.max_rss = self.rss
+
+    def wrap(self, name: str, items: Iterable[T]) -> Iterator[T]:
+        """
+        Counts the time to produce each item of a lazy iterable, such as a generator, in the phase
+        """
+        if not self.enabled:
+            return iter(items)
+        return self._wrap(name, iter(items))
+
+    def _wrap(self, name: str, it: Iterator[T]) -> Iterator[T]:
+        # the same as phase(), without the overhead of a context manager for every item
+        while True:
+            self._enter(name)
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            finally:
+                self._exit()
+            yield item
+
+    def add_traffic(self, bytes_out: int = 0, bytes_in: int = 0, requests: int = 0, name: str = NETWORK):
+        if not self.enabled:
+            return
+        with self.lock:
+            s = self.stats.setdefault(name, PhaseStats())
+            s.bytes_out += bytes_out
+            s.bytes_in += bytes_in
+            s.requests += requests
+
+    def count_bytes_out(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Counts the bytes of a request body that is sent as a stream
+        """
+        if not self.enabled:
+            return iter(chunks)
+        return self._count_bytes(chunks, out=True)
+
+    def count_bytes_in(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Counts the bytes of a response body that is read as a stream
+        """
+        if not self.enabled:
+            return iter(chunks)
+        return self._count_bytes(chunks, out=False)
+
+    def _count_bytes(self, chunks: Iterable[bytes], out: bool) -> Iterator[bytes]:
+        for c in chunks:
+            if out:
+                self.add_traffic(bytes_out=len(c))
+            else:
+                self.add_traffic(bytes_in=len(c))
+            yield c
+
+    def total_time(self) -> float:
+        return (self.end_time or time.perf_counter()) - self.start_time
+
+    def total_cpu_time(self) -> float:
+        return (self.end_cpu_time or time.process_time()) - self.start_cpu_time
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "wallTime": self.total_time(),
+            "cpuTime": self.total_cpu_time(),
+            "maxRss": _max_rss(),
+            "phases": {name: s.to_dict() for name, s in self.stats.items()},
+        }
+
+    def report(self):
+        """
+        Prints the summary table to stderr, so that it doesn't mix with the output of commands like `subset`
+        """
+        rows = [[name, s.wall_time, s.cpu_time, s.count, s.requests, s.bytes_out / 1024, s.bytes_in / 1024,
+                 s.max_rss / 1024 / 1024 if s.count else None] for name, s in self.stats.items()]
+        rows.append(["total", self.total_time(), self.total_cpu_time(), None, None, None, None, _max_rss() / 1024 / 1024])
+        click.echo("", err=True)
+        from tabulate import tabulate
+        click.echo(tabulate(rows, ["Phase", "Wall time (s)", "CPU time (s)", "Count", "Requests", "Sent (KB)",
+                                   "Received (KB)", "Peak memory (MB)"],
+                            tablefmt="github", floatfmt=".3f", missingval="-"), err=True)
+
+    def write(self, path: str):
+        """
+        Writes the measurements as JSON to a .json file, or the cProfile stats to any other file
+        for tools like `python -m pstats` and snakeviz
+        """
+        if path.endswith(".json"):
+            with open(path, "w") as f:
+                json.dump(self.to_dict(), f, indent=2)
+        elif self.cprofile:
+            self.cprofile.dump_stats(path)
+
+
+# measures the current invocation of the CLI
+profiler = Profiler()
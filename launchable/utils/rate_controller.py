@@ -0,0 +1,109 @@
+import datetime
+import email.utils
+import threading
+from time import monotonic
+from typing import Optional
+
+# statuses that the server responds with when it's under pressure
+THROTTLE_STATUSES = [429, 503]
+
+# a Retry-After longer than this is cut short, so that a CI job doesn't end up waiting for ages
+MAX_RETRY_AFTER = 60
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parses the Retry-After header, which is either seconds or an HTTP date, into seconds from now
+    """
+    if not value:
+        return None
+    try:
+        return min(MAX_RETRY_AFTER, max(0.0, float(value)))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    return min(MAX_RETRY_AFTER, max(0.0, (when - datetime.datetime.now(datetime.timezone.utc)).total_seconds()))
+
+
+class RateController:
+    """
+    Limits the number of bulk requests in flight, shared by all the threads that send them, in the AIMD manner of
+    TCP congestion control: the limit grows by one for every limit's worth of successful responses, and halves
+    when the server throttles us. Once the server tells when to come back with Retry-After, no request is sent
+    until then.
+
+    This way, a few hundred CI jobs uploading at once back off together, instead of retrying into an overloaded
+    server at the same time.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1):
+        self.max_limit = max_limit
+        self.min_limit = min(min_limit, max_limit)
+        self.limit = max_limit
+        # successful responses since the limit last changed
+        self.successes = 0
+        self.in_flight = 0
+        # monotonic time until which no request is sent, set by Retry-After
+        self.not_before = 0.0
+        # monotonic time of the last decrease of the limit. Requests sent before that were under the old limit,
+        # so their throttled responses don't decrease the limit again
+        self.last_decrease = 0.0
+        self.cond = threading.Condition()
+
+        # number of responses that told us to slow down
+        self.throttled_count = 0
+        # number of requests that waited for the limit or Retry-After, and the total seconds they waited
+        self.delayed_count = 0
+        self.delayed_secs = 0.0
+
+    def acquire(self) -> float:
+        """
+        Waits until a request can be sent. Returns the time the request is sent at, to be passed to release()
+        """
+        with self.cond:
+            start = monotonic()
+            delayed = False
+            while True:
+                now = monotonic()
+                if now < self.not_before:
+                    delayed = True
+                    self.cond.wait(self.not_before - now)
+                elif self.in_flight >= self.limit:
+                    delayed = True
+                    self.cond.wait()
+                else:
+                    break
+
+            self.in_flight += 1
+            if delayed:
+                self.delayed_count += 1
+                self.delayed_secs += now - start
+            return now
+
+    def release(self, sent_at: float, status: Optional[int] = None, retry_after: Optional[float] = None):
+        """
+        Tells the response of a request sent at 'sent_at'. 'status' is None when the request failed without
+        a response, which says nothing about the pressure on the server.
+        """
+        with self.cond:
+            self.in_flight -= 1
+            now = monotonic()
+            if status in THROTTLE_STATUSES:
+                self.throttled_count += 1
+                if sent_at >= self.last_decrease:
+                    self.limit = max(self.min_limit, self.limit // 2)
+                    self.successes = 0
+                    self.last_decrease = now
+                if retry_after:
+                    self.not_before = max(self.not_before, now + retry_after)
+            elif status is not None:
+                self.successes += 1
+                if self.successes >= self.limit:
+                    self.limit = min(self.max_limit, self.limit + 1)
+                    self.successes = 0
+            self.cond.notify_all()
@@ -1,11 +1,15 @@
 import re
 import sys
-from typing import Callable, Dict, List, Optional
+from collections import deque
+from typing import BinaryIO, Callable, Deque, Dict, Generator, List, Optional, Tuple
+from xml.etree.ElementTree import Element as ETElement
+from xml.etree.ElementTree import TreeBuilder
 from xml.sax import make_parser
-from xml.sax.handler import ContentHandler
+from xml.sax.handler import ContentHandler, feature_external_ges
 from xml.sax.xmlreader import AttributesImpl
 
 import click
+from junitparser import JUnitXmlError, TestCase, TestSuite  # type: ignore
 
 
 class Element:
@@ -106,6 +110,89 @@ class SaxParser(ContentHandler):
         p.parse(body)
 
 
+class JUnitXmlSaxParser(SaxParser):
+    """
+    Parse JUnit XML report in a streaming manner. Each <testcase> element is built into a junitparser TestCase
+    one at a time, so that the memory usage stays constant no matter how large the report is.
+
+    To see test cases the same way as JUnitXml.fromfile() does, test cases are paired with the top-level
+    <testsuite>, even if they are in nested test suites. The TestSuite only carries attributes, not children.
+    """
+
+    def __init__(self):
+        super().__init__([], self._start_element)
+        # test cases that are parsed but not yet consumed
+        self.cases: Deque[Tuple[TestCase, TestSuite]] = deque()
+        # the top-level <testsuite> we are in
+        self.suite: Optional[TestSuite] = None
+        # builds the <testcase> element we are in
+        self.builder: Optional[TreeBuilder] = None
+        # depth of the current element within the <testcase> element
+        self.depth = 0
+
+    @staticmethod
+    def _is_top_level_suite(e: Element) -> bool:
+        return e.name == "testsuite" and (e.parent is None or (e.parent.name == "testsuites" and e.parent.parent is None))
+
+    def _is_in_suite(self, e: Optional[Element]) -> bool:
+        # JUnitXml only looks at test cases that are children of test suites, which might be nested
+        while e is not None and e.name == "testsuite":
+            if self._is_top_level_suite(e):
+                return True
+            e = e.parent
+        return False
+
+    def _start_element(self, e: Element):
+        if self.builder is not None:
+            self.builder.start(e.name, dict(e.attrs))
+            self.depth += 1
+        elif e.parent is None and e.name not in ("testsuites", "testsuite"):
+            # same as JUnitXml.fromroot()
+            raise JUnitXmlError("Invalid format.")
+        elif self._is_top_level_suite(e):
+            self.suite = TestSuite.fromelem(ETElement(e.name, dict(e.attrs)))
+        elif e.name == "testcase" and self._is_in_suite(e.parent):
+            self.builder = TreeBuilder()
+            self.builder.start(e.name, dict(e.attrs))
+            self.depth = 1
+
+    def endElement(self, tag):
+        if self.builder is not None:
+            self.builder.end(tag)
+            self.depth -= 1
+            if self.depth == 0:
+                self.cases.append((TestCase.fromelem(self.builder.close()), self.suite))
+                self.builder = None
+        elif self.context is not None and self._is_top_level_suite(self.context):
+            self.suite = None
+
+        super().endElement(tag)
+
+    def characters(self, content):
+        if self.builder is not None:
+            self.builder.data(content)
+
+    def iterparse(self, source: BinaryIO, chunk_size: int = 64 * 1024) -> Generator[Tuple[TestCase, TestSuite], None, None]:
+        """
+        Yields (TestCase, TestSuite) as soon as each test case is read from the source
+        """
+        p = make_parser()
+        p.setFeature(feature_external_ges, False)
+        p.setContentHandler(self)
+
+        while True:
+            data = source.read(chunk_size)
+            if not data:
+                break
+            p.feed(data)  # type: ignore
+            while self.cases:
+                yield self.cases.popleft()
+
+        p.close()  # type: ignore
+        while self.cases:
+            yield self.cases.popleft()
+
+
 # Scaffold JUnit parser
 # python -m launchable.utils.sax < result.xml
 if __name__ == "__main__":
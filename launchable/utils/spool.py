@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .session import _session_file_dir
+
+# Request bodies that couldn't be sent are kept here, so that retrying the same command sends only those
+# instead of everything. Like the cache, this sits next to the session file.
+
+CHUNK_FILE_SUFFIX = ".chunk"
+CHECKPOINT_FILE_NAME = "checkpoint.json"
+
+
+def _spool_root() -> Path:
+    return _session_file_dir() / ".launchable-spool"
+
+
+class ChunkSpool:
+    """
+    On-disk spool of compressed chunks, identified by a key that tells apart one upload from another.
+
+    Each chunk is stored in a file named after its index, and acking a chunk deletes its file.
+    The checkpoint is written once all the unsent chunks are in the spool, and records the Content-Encoding of
+    the chunks, since the next attempt might select a different compression, along with the summary of the whole
+    upload, since the next attempt only sees the unsent chunks. A spool without the checkpoint
+    (e.g. the process got killed while spooling) doesn't tell which chunks were sent, so it can't be resumed.
+    """
+
+    def __init__(self, key: str):
+        self.dir = _spool_root() / hashlib.sha1(key.encode()).hexdigest()
+
+    def exists(self) -> bool:
+        return self.dir.exists()
+
+    def is_complete(self) -> bool:
+        return (self.dir / CHECKPOINT_FILE_NAME).exists()
+
+    def write(self, index: int, data: bytes) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._write_atomically(self._chunk_path(index), data)
+
+    def complete(self, content_encoding: str, summary: Optional[Dict[str, Any]] = None) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        checkpoint = {"chunks": len(self.pending()), "contentEncoding": content_encoding, "summary": summary}
+        self._write_atomically(self.dir / CHECKPOINT_FILE_NAME, json.dumps(checkpoint).encode())
+
+    def content_encoding(self) -> str:
+        return self._checkpoint().get("contentEncoding", "gzip")
+
+    def summary(self) -> Optional[Dict[str, Any]]:
+        """
+        What complete() was told about the whole upload, including the chunks that were sent
+        """
+        summary = self._checkpoint().get("summary")
+        return summary if isinstance(summary, dict) else None
+
+    def pending(self) -> List[int]:
+        """
+        Indexes of the chunks that are not acked yet, in order
+        """
+        if not self.dir.exists():
+            return []
+        return sorted(int(f.name[:-len(CHUNK_FILE_SUFFIX)]) for f in self.dir.glob("*" + CHUNK_FILE_SUFFIX))
+
+    def read(self, index: int) -> bytes:
+        with open(str(self._chunk_path(index)), 'rb') as f:
+            return f.read()
+
+    def ack(self, index: int) -> None:
+        self._chunk_path(index).unlink()
+
+    def clear(self) -> None:
+        shutil.rmtree(str(self.dir), ignore_errors=True)
+
+    def _checkpoint(self) -> Dict[str, Any]:
+        with open(str(self.dir / CHECKPOINT_FILE_NAME)) as f:
+            return json.load(f)
+
+    def _chunk_path(self, index: int) -> Path:
+        return self.dir / "{:06d}{}".format(index, CHUNK_FILE_SUFFIX)
+
+    def _write_atomically(self, path: Path, data: bytes) -> None:
+        # write to a temporary file then rename it, so that a spool never has a partially written file
+        fd, tmp = tempfile.mkstemp(dir=str(self.dir), prefix=".tmp.")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, str(path))
+        except Exception:
+            os.unlink(tmp)
+            raise
@@ -1,7 +1,13 @@
+import atexit
+import os
+import queue
+import threading
+import time
 from enum import Enum
-from typing import Any, Dict, Optional, Union
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple, Union
 
-from requests import Session
+import click
+from click.globals import pop_context, push_context
 
 from launchable.app import Application
 from launchable.utils.authentication import get_org_workspace
@@ -9,6 +15,17 @@ from launchable.utils.http_client import _HttpClient, _join_paths
 from launchable.version import __version__
 
 from .commands import Command
+from .env_keys import TRACKING_FLUSH_TIMEOUT_KEY
+
+if TYPE_CHECKING:
+    from requests import Session
+
+# Tracking events are best effort. Rather than blocking the command, events are dropped
+# once this many events are waiting to be sent
+TRACKING_QUEUE_SIZE = 100
+
+# How long the CLI waits for queued tracking events to be sent, in seconds
+DEFAULT_FLUSH_TIMEOUT = 5
 
 
 class Tracking:
@@ -30,8 +47,105 @@ class Tracking:
         UNEXPECTED_HTTP_STATUS_ERROR = 'UNEXPECTED_HTTP_STATUS_ERROR'
 
 
+# the client to send the event with, the payload, and the click context of the command that queued the event,
+# for the User-Agent header to tell the command
+_QueuedEvent = Tuple[_HttpClient, Dict[str, Any], Optional[click.Context]]
+
+
+class _EventSender:
+    """
+    Sends tracking events from a background thread, so that they don't add round trips to what the commands do.
+    Events are sent in the order they are queued, over the connection shared with the other requests.
+    """
+
+    def __init__(self):
+        # None tells the thread to stop
+        self.queue = queue.Queue(maxsize=TRACKING_QUEUE_SIZE)  # type: queue.Queue[Optional[_QueuedEvent]]
+        self.thread: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+
+    def put(self, http_client: _HttpClient, payload: Dict[str, Any]):
+        with self.lock:
+            # after fork(), a thread of the parent process appears dead
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name="launchable-tracking", daemon=True)
+                self.thread.start()
+
+        try:
+            self.queue.put_nowait((http_client, payload, click.get_current_context(silent=True)))
+        except queue.Full:
+            pass
+
+    def _run(self):
+        path = _join_paths('/intake', 'cli_tracking')
+        while True:
+            event = self.queue.get()
+            if event is None:
+                self.queue.task_done()
+                return
+            http_client, payload, ctx = event
+            if ctx:
+                push_context(ctx)
+            try:
+                http_client.request('post', payload=payload, path=path)
+            except Exception:
+                pass
+            finally:
+                if ctx:
+                    pop_context()
+                self.queue.task_done()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until all the queued events are sent, up to the 'timeout' seconds.
+        Returns False if some events are still left.
+        """
+        if timeout is None:
+            timeout = float(os.getenv(TRACKING_FLUSH_TIMEOUT_KEY) or DEFAULT_FLUSH_TIMEOUT)
+
+        deadline = time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """
+        Send the queued events and stop the thread, up to the 'timeout' seconds, until the next event is queued.
+        Returns False if the thread is still running.
+        """
+        if timeout is None:
+            timeout = float(os.getenv(TRACKING_FLUSH_TIMEOUT_KEY) or DEFAULT_FLUSH_TIMEOUT)
+
+        with self.lock:
+            thread = self.thread
+            if thread is None or not thread.is_alive():
+                return True
+            try:
+                self.queue.put(None, timeout=timeout)
+            except queue.Full:
+                return False
+            thread.join(timeout)
+            return not thread.is_alive()
+
+
+_event_sender = _EventSender()
+atexit.register(_event_sender.flush)
+
+
+def flush_tracking_events(timeout: Optional[float] = None) -> bool:
+    return _event_sender.flush(timeout)
+
+
+def stop_tracking_thread(timeout: Optional[float] = None) -> bool:
+    return _event_sender.stop(timeout)
+
+
 class TrackingClient:
-    def __init__(self, command: Command, base_url: str = "", session: Optional[Session] = None,
+    def __init__(self, command: Command, base_url: str = "", session: Optional['Session'] = None,
                  test_runner: Optional[str] = "", app: Optional[Application] = None):
         self.http_client = _HttpClient(
             base_url=base_url,
@@ -41,6 +155,11 @@ class TrackingClient:
         )
         self.command = command
 
+        # send what's left by the end of the command, rather than the end of the process
+        ctx = click.get_current_context(silent=True)
+        if ctx:
+            ctx.call_on_close(flush_tracking_events)
+
     def send_event(
         self,
         event_name: Tracking.Event,
@@ -86,11 +205,4 @@ class TrackingClient:
             "cliVersion": __version__,
             "metadata": metadata,
         }
-        path = _join_paths(
-            '/intake',
-            'cli_tracking'
-        )
-        try:
-            self.http_client.request('post', payload=payload, path=path)
-        except Exception:
-            pass
+        _event_sender.put(self.http_client, payload)
@@ -1,4 +1,10 @@
-from importlib_metadata import PackageNotFoundError, version
+import sys
+
+if sys.version_info >= (3, 8):
+    # the standard library imports much faster than the backport
+    from importlib.metadata import PackageNotFoundError, version
+else:
+    from importlib_metadata import PackageNotFoundError, version
 
 try:
     __version__ = version("launchable")
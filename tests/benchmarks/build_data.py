@@ -0,0 +1,74 @@
+import gzip
+import json
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Tuple
+
+import click
+from tabulate import tabulate
+
+from launchable.utils.compression import GzipCodec
+from launchable.utils.http_client import _build_data
+
+
+def subset_payload(count: int) -> Dict[str, Any]:
+    """
+    Payload of the subset API with 'count' test paths
+    """
+    return {
+        "testPaths": [[{"type": "file", "name": "src/test/java/com/example/Test{}.java".format(i)},
+                       {"type": "class", "name": "com.example.Test{}".format(i)}] for i in range(count)],
+        "testRunner": "maven",
+        "session": {"id": "builds/1/test_sessions/1"},
+    }
+
+
+def _trace(f: Callable[[], bytes]) -> Tuple[bytes, int, float]:
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        data = f()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return data, peak, elapsed
+
+
+def measure(count: int) -> Dict[str, Any]:
+    """
+    Compares the peak memory and the latency of compressing a subset payload,
+    between encoding JSON in one go and encoding it incrementally
+    """
+    payload = subset_payload(count)
+    one_go, one_go_peak, one_go_elapsed = _trace(lambda: gzip.compress(json.dumps(payload).encode()))
+    streamed, streamed_peak, streamed_elapsed = _trace(lambda: _build_data(payload, GzipCodec()))
+    return {
+        "same": gzip.decompress(streamed) == gzip.decompress(one_go),
+        "oneGoPeak": one_go_peak,
+        "oneGoElapsed": one_go_elapsed,
+        "streamedPeak": streamed_peak,
+        "streamedElapsed": streamed_elapsed,
+    }
+
+
+@click.command()
+@click.option('--count', 'count', type=click.IntRange(min=1), default=100000, show_default=True,
+              help='Number of test paths in the payload')
+def main(count):
+    """
+    Benchmarks the peak memory and the latency of compressing a large subset payload.
+
+        python -m tests.benchmarks.build_data
+    """
+    r = measure(count)
+    if not r["same"]:
+        raise click.ClickException("The streamed payload is different from the one encoded in one go")
+    click.echo(tabulate([
+        ["In one go", r["oneGoPeak"] / 1024 / 1024, r["oneGoElapsed"]],
+        ["Streamed", r["streamedPeak"] / 1024 / 1024, r["streamedElapsed"]],
+    ], ["Encoding", "Peak memory (MB)", "Time (s)"], tablefmt="github", floatfmt=".2f"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import io
+import time
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+import click
+from tabulate import tabulate
+
+from launchable.utils import jsongen
+from launchable.utils.compression import Codec, GzipCodec, ZstdCodec
+from launchable.utils.http_client import _file_to_generator
+
+try:
+    import zstandard  # type: ignore  # noqa: F401
+    has_zstd = True
+except ImportError:
+    has_zstd = False
+
+
+def events_payload(count: int) -> Dict[str, Any]:
+    """
+    Payload of the events API that looks like what `record tests` sends
+    """
+    return {
+        "events": [{
+            "type": "case",
+            "testPath": [{"type": "file", "name": "tests/foo/test_bar{}.py".format(i % 100)},
+                         {"type": "class", "name": "BarTest{}".format(i % 100)},
+                         {"type": "testcase", "name": "test_baz{}".format(i)}],
+            "duration": i * 0.013,
+            "status": 1 if i % 10 else 0,
+            "stdout": "INFO running test_baz{}\n".format(i) * (i % 20),
+            "stderr": "" if i % 10 else "Traceback (most recent call last):\n  AssertionError: {}\n".format(i),
+            "created_at": "2026-10-18T12:34:56.{:06d}+00:00".format(i),
+            "data": None,
+        } for i in range(count)],
+        "testRunner": "pytest",
+        "group": "",
+        "metadata": {},
+        "noBuild": False,
+        "testSuite": "",
+        "flavors": {},
+    }
+
+
+def attachment(size: int) -> bytes:
+    """
+    Log file, which is what is typically attached to a test session
+    """
+    lines = []
+    n = 0
+    i = 0
+    while n < size:
+        line = "2026-10-18 12:34:{:02d}.{:03d} [worker-{}] INFO  com.example.Service - handled request {} in {}ms\n".format(
+            i % 60, i % 1000, i % 8, i, i % 97)
+        lines.append(line)
+        n += len(line)
+        i += 1
+    return "".join(lines).encode()
+
+
+def codecs() -> List[Codec]:
+    result: List[Codec] = [GzipCodec(1), GzipCodec(), GzipCodec(9), GzipCodec(threads=4)]
+    if has_zstd:
+        result += [ZstdCodec(1), ZstdCodec(), ZstdCodec(19), ZstdCodec(threads=4)]
+    return result
+
+
+def measure(events: int, attachment_size: int) -> List[Dict[str, Any]]:
+    """
+    Compresses representative events payloads and attachments with each codec, and returns the throughput
+    and the ratio of each
+    """
+    payload = events_payload(events)
+    log = attachment(attachment_size)
+    inputs: List[Tuple[str, Callable[[], Iterable[bytes]]]] = [
+        ("events", lambda: jsongen.encode(payload)),
+        ("attachment (4KB reads)", lambda: _file_to_generator(io.BytesIO(log), 4096)),
+        ("attachment", lambda: _file_to_generator(io.BytesIO(log))),
+    ]
+
+    results = []
+    for name, chunks in inputs:
+        original = sum(len(c) for c in chunks())
+        for codec in codecs():
+            start = time.perf_counter()
+            size = sum(len(c) for c in codec.compress(chunks()))
+            elapsed = time.perf_counter() - start
+            results.append({
+                "input": name,
+                "codec": "{}-{}".format(codec.name, codec.level),
+                "threads": codec.threads,
+                "originalSize": original,
+                "size": size,
+                "elapsed": elapsed,
+            })
+    return results
+
+
+@click.command()
+@click.option('--events', 'events', type=click.IntRange(min=1), default=20000, show_default=True,
+              help='Number of test cases in the events payload')
+@click.option('--attachment-size', 'attachment_size', type=click.IntRange(min=1), default=8 * 1024 * 1024,
+              show_default=True, help='Bytes of the attachment')
+def main(events, attachment_size):
+    """
+    Benchmarks the throughput and the ratio of each compression codec over representative events payloads
+    and attachments.
+
+        python -m tests.benchmarks.compression
+    """
+    rows = [[r["input"], r["codec"], r["threads"], r["originalSize"] / r["elapsed"] / 1024 / 1024,
+             r["size"] * 100 / r["originalSize"]] for r in measure(events, attachment_size)]
+    click.echo(tabulate(rows, ["Input", "Codec", "Threads", "Throughput (MB/s)", "Ratio (%)"],
+                        tablefmt="github", floatfmt=".1f"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import gzip
+import itertools
+import json
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from typing import Any, Dict, List, Optional, Tuple
+
+ORGANIZATION = "bench"
+WORKSPACE = "bench"
+TOKEN = "v1:{}/{}:bench-token".format(ORGANIZATION, WORKSPACE)
+BUILD_NAME = "bench-build"
+SESSION = "builds/{}/test_sessions/1".format(BUILD_NAME)
+
+_PREFIX = "/intake/organizations/{}/workspaces/{}/".format(ORGANIZATION, WORKSPACE)
+_SLICE = re.compile(r"^subset/(\d+)/slice$")
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class FakeIntakeAPI:
+    """
+    Stand-in for the intake API that answers what `record tests`, `subset` and `split-subset` ask for, after the
+    given latency, and counts the requests and the bytes they send.
+
+    With 'verify', compressed request bodies are decoded to count the test cases the server received. It's off by
+    default, as the server shares the CPU with the CLI being measured.
+    """
+
+    def __init__(self, latency: float = 0.0, verify: bool = False):
+        self.latency = latency
+        self.verify = verify
+        self.lock = threading.Lock()
+        self.subsets: Dict[int, List[Any]] = {}
+        self.subset_ids = itertools.count(1)
+        self.reset_stats()
+
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                api._handle(self, "GET")
+
+            def do_POST(self):
+                api._handle(self, "POST")
+
+            def do_PATCH(self):
+                api._handle(self, "PATCH")
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = _Server(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return "http://127.0.0.1:{}".format(self.server.server_address[1])
+
+    def __enter__(self) -> 'FakeIntakeAPI':
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def reset_stats(self):
+        with self.lock:
+            self.requests: Counter = Counter()
+            self.bytes_received = 0
+            self.events_received = 0
+
+    def add_subset(self, test_paths: List[Any]) -> int:
+        """
+        Registers the result of a subset, for `split-subset` to slice
+        """
+        with self.lock:
+            subset_id = next(self.subset_ids)
+            self.subsets[subset_id] = test_paths
+        return subset_id
+
+    def _handle(self, handler: BaseHTTPRequestHandler, method: str):
+        body = _read_body(handler)
+        path = handler.path.split("?")[0]
+        path = path[len(_PREFIX):] if path.startswith(_PREFIX) else path
+        kind, status, response = self._respond(method, path, handler.headers.get("Content-Encoding"), body)
+        with self.lock:
+            self.requests[kind] += 1
+            self.bytes_received += len(body)
+
+        if self.latency:
+            time.sleep(self.latency)
+        data = json.dumps(response).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _respond(self, method: str, path: str, encoding: Optional[str], body: bytes) -> Tuple[str, int, Any]:
+        """
+        Returns the kind of the request for the stats, the status and the response
+        """
+        parts = path.split("/")
+        if method == "GET" and path == "state":
+            return "state", 200, {"isFailFastMode": False, "isPtsV2Enabled": False}
+        if method == "GET" and path == "slack/notification/key/list":
+            return "slack", 200, {"keys": []}
+        if method == "GET" and len(parts) == 2 and parts[0] == "builds":
+            # old enough that no report file is skipped
+            return "build", 200, {"id": 1, "build": parts[1], "createdAt": "2000-01-01T00:00:00.000+00:00"}
+        if method == "GET" and len(parts) == 4 and parts[2] == "test_sessions":
+            return "session", 200, {"id": int(parts[3]), "isObservation": False}
+        if method == "POST" and len(parts) == 5 and parts[4] == "events":
+            if self.verify:
+                count = len(json.loads(_decode(body, encoding))["events"])
+                with self.lock:
+                    self.events_received += count
+            return "events", 200, {"testSession": {"id": int(parts[3]), "isObservation": False},
+                                   "build": {"build": parts[1]}}
+        if method == "POST" and path == "subset":
+            test_paths = json.loads(_decode(body, encoding))["testPaths"]
+            subset_id = self.add_subset(test_paths)
+            half = len(test_paths) // 2
+            return "subset", 200, {
+                "testPaths": test_paths[:half],
+                "rest": test_paths[half:],
+                "subsettingId": subset_id,
+                "summary": {
+                    "subset": {"candidates": half, "duration": half * 0.1, "rate": 50},
+                    "rest": {"candidates": len(test_paths) - half, "duration": (len(test_paths) - half) * 0.1,
+                             "rate": 50},
+                },
+                "isBrainless": False,
+                "isObservation": False,
+            }
+        m = _SLICE.match(path)
+        if method == "POST" and m:
+            payload = json.loads(_decode(body, encoding)) if body else {}
+            test_paths = self.subsets.get(int(m.group(1)), [])
+            count = payload.get("sliceCount", 1)
+            index = payload.get("sliceIndex", 0)
+            return "slice", 200, {"testPaths": test_paths[index::count], "rest": [], "isObservation": False}
+        # tracking events and the like
+        return "other", 200, {}
+
+
+def _read_body(handler: BaseHTTPRequestHandler) -> bytes:
+    if handler.headers.get("Transfer-Encoding", "").lower() == "chunked":
+        chunks: List[bytes] = []
+        while True:
+            size = int(handler.rfile.readline().strip(), 16)
+            chunk = handler.rfile.read(size + 2)[:size]
+            if size == 0:
+                return b"".join(chunks)
+            chunks.append(chunk)
+    return handler.rfile.read(int(handler.headers.get("Content-Length") or 0))
+
+
+def _decode(body: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "zstd":
+        import zstandard  # type: ignore
+        return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+    return body
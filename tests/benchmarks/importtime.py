@@ -0,0 +1,163 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+import click
+from tabulate import tabulate
+
+from .runner import DEFAULT_BASELINE, ROOT
+
+# commands that start without any work to do, so that the time is of the start-up alone
+COMMANDS = [
+    ["--help"],
+    ["verify", "--help"],
+    ["record", "build", "--help"],
+    ["record", "session", "--help"],
+    ["record", "tests", "--help"],
+    ["subset", "--help"],
+    ["split-subset", "--help"],
+]
+
+# dependencies that take long to import, and modules that only some commands need
+HEAVY_MODULES = ["junitparser", "dateutil", "tabulate", "requests", "more_itertools", "concurrent.futures", "unittest",
+                 "launchable.test_runners.maven"]
+
+# seconds from importing the CLI to the end of a command that does nothing, with room for slow CI machines.
+# It took 0.1s on a single CPU with Python 3.6, and took twice as long before heavy modules were imported lazily
+STARTUP_BUDGET = 0.5
+
+_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from launchable.__main__ import main
+try:
+    main(sys.argv[2:], prog_name="launchable")
+except SystemExit:
+    pass
+with open(sys.argv[1], "w") as f:
+    json.dump({"time": time.perf_counter() - start, "modules": sorted(sys.modules.keys())}, f)
+"""
+
+
+def _parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Parses the output of `python -X importtime` into the self and cumulative microseconds of each module
+    """
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # the header
+            continue
+        times[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+    return times
+
+
+def measure(args: List[str]) -> Dict[str, Any]:
+    """
+    Starts the CLI with the arguments in a new interpreter, and returns how long the imports and the command took,
+    and which modules it imported.
+
+    The time each module took is from `-X importtime`, which is new in Python 3.7, and empty on older versions.
+    """
+    with tempfile.TemporaryDirectory() as dir:
+        output = os.path.join(dir, "imports.json")
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join([str(ROOT)] + ([env["PYTHONPATH"]] if env.get("PYTHONPATH") else []))
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _SCRIPT, output] + args,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env, cwd=dir)
+        elapsed = time.perf_counter() - start
+        if proc.returncode != 0 or not os.path.exists(output):
+            raise click.ClickException("{} failed:\n{}".format(" ".join(args), proc.stderr.decode(errors="replace")))
+        with open(output) as f:
+            result = json.load(f)
+
+    modules = result["modules"]
+    return {
+        "time": result["time"],
+        # including the start-up of the interpreter
+        "processTime": elapsed,
+        "modules": modules,
+        "importTimes": _parse_importtime(proc.stderr.decode(errors="replace")),
+        "heavyModules": [m for m in HEAVY_MODULES if m in modules],
+    }
+
+
+def baseline_key(args: List[str]) -> str:
+    return "import/{}".format(" ".join(args))
+
+
+@click.command()
+@click.option('--repeat', 'repeat', type=click.IntRange(min=1), default=5, show_default=True,
+              help='Times to start each command. The fastest one counts')
+@click.option('--baseline', 'baseline_path', type=click.Path(dir_okay=False), default=DEFAULT_BASELINE,
+              show_default=True, help='Baselines to compare with')
+@click.option('--save-baseline', 'save_baseline', is_flag=True, help='Save the results as the new baselines')
+@click.option('--tolerance', 'tolerance', type=float, default=0.25, show_default=True,
+              help='How much slower than the baselines is taken as a regression')
+@click.option('--top', 'top', type=click.IntRange(min=0), default=0,
+              help='Show the modules that took the longest to import for each command (Python 3.7+)')
+def main(repeat, baseline_path, save_baseline, tolerance, top):
+    """
+    Benchmarks how long the CLI takes to start for commands that don't need all the modules,
+    and which heavy modules they import.
+
+        python -m tests.benchmarks.importtime --top 10
+    """
+    baselines: Dict[str, Any] = {}
+    if os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            baselines = json.load(f)
+
+    results = {}
+    rows = []
+    failures = []
+    for args in COMMANDS:
+        key = baseline_key(args)
+        r = min((measure(args) for _ in range(repeat)), key=lambda x: x["time"])
+        results[key] = r
+
+        baseline = baselines.get(key)
+        regressions = []
+        if baseline:
+            if r["time"] > baseline["time"] * (1 + tolerance):
+                regressions.append("{:.0f}ms > {:.0f}ms".format(r["time"] * 1000, baseline["time"] * 1000))
+            added = sorted(set(r["heavyModules"]) - set(baseline["heavyModules"]))
+            if added:
+                regressions.append("imports {}".format(", ".join(added)))
+        failures.extend("{}: {}".format(key, x) for x in regressions)
+
+        rows.append([" ".join(args), r["time"] * 1000, baseline["time"] * 1000 if baseline else None,
+                     r["processTime"] * 1000, len(r["modules"]), ", ".join(r["heavyModules"]),
+                     "regressed" if regressions else "ok"])
+
+        if top and r["importTimes"]:
+            slowest = sorted(r["importTimes"].items(), key=lambda x: x[1][0], reverse=True)[:top]
+            click.echo(tabulate([[m, t[0] / 1000, t[1] / 1000] for m, t in slowest],
+                                ["Module ({})".format(" ".join(args)), "Self (ms)", "Cumulative (ms)"],
+                                tablefmt="github", floatfmt=".1f"))
+            click.echo()
+
+    click.echo(tabulate(rows, ["Command", "Time (ms)", "Baseline (ms)", "Process time (ms)", "Modules",
+                               "Heavy modules", "Status"], tablefmt="github", floatfmt=".0f", missingval="-"))
+
+    if save_baseline:
+        baselines.update({k: {"time": r["time"], "heavyModules": r["heavyModules"]} for k, r in results.items()})
+        with open(baseline_path, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        return
+
+    if failures:
+        raise click.ClickException("\n".join(failures))
+
+
+if __name__ == "__main__":
+    main()
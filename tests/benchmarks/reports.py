@@ -0,0 +1,194 @@
+import json
+import os
+from typing import IO, Iterator, List, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+# number of test cases in each report file, which is typical of a test class or a test module
+CASES_PER_FILE = 1000
+
+_LOG_LINES = [
+    "2026-10-18 12:34:{:02d}.{:03d} INFO  [worker-{}] com.example.bench.Service - handled request {} in {}ms\n".format(
+        i % 60, i * 7 % 1000, i % 8, i, i * 13 % 97) for i in range(256)
+] + [
+    "2026-10-18 12:35:{:02d}.{:03d} DEBUG [worker-{}] com.example.bench.Repository - SELECT * FROM items WHERE id = {}\n".format(
+        i % 60, i * 11 % 1000, i % 8, i) for i in range(256)
+]
+_LOG = "".join(_LOG_LINES)
+
+
+def log(size: int, seed: int) -> str:
+    """
+    Log of about 'size' characters that looks like what tests print, and compresses about as well
+    """
+    if size <= 0:
+        return ""
+    start = seed * 97 % len(_LOG)
+    text = _LOG[start:start + size]
+    while len(text) < size:
+        text += _LOG[:size - len(text)]
+    return text
+
+
+def stack_trace(seed: int) -> str:
+    return "java.lang.AssertionError: expected:<{}> but was:<{}>\n".format(seed, seed + 1) + "".join(
+        "\tat com.example.bench.Suite{}.testCase{}(Suite{}.java:{})\n".format(seed % 100, seed, seed % 100, 10 + i)
+        for i in range(8))
+
+
+def status(i: int) -> str:
+    """
+    Most tests pass, some fail and a few are skipped
+    """
+    if i % 20 == 0:
+        return "failed"
+    if i % 50 == 1:
+        return "skipped"
+    return "passed"
+
+
+def _files(cases: int) -> Iterator[Tuple[int, range]]:
+    for f, start in enumerate(range(0, cases, CASES_PER_FILE)):
+        yield f, range(start, min(cases, start + CASES_PER_FILE))
+
+
+def write_junit(dir: str, cases: int, log_size: int) -> List[str]:
+    """
+    JUnit XML reports, as Maven Surefire writes them
+    """
+    os.makedirs(dir, exist_ok=True)
+    paths = []
+    for f, r in _files(cases):
+        path = os.path.join(dir, "TEST-com.example.bench.Suite{}.xml".format(f))
+        classname = "com.example.bench.Suite{}".format(f)
+        with open(path, "w", encoding="utf-8") as out:
+            out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            out.write('<testsuite name={} tests="{}" time="{:.3f}">\n'.format(
+                quoteattr(classname), len(r), len(r) * 0.05))
+            for i in r:
+                s = status(i)
+                out.write('  <testcase name="testCase{}" classname={} time="{:.3f}">\n'.format(
+                    i, quoteattr(classname), i % 100 * 0.001))
+                if s == "failed":
+                    out.write('    <failure message="expected:&lt;{}&gt; but was:&lt;{}&gt;" type="java.lang.AssertionError">'
+                              '{}</failure>\n'.format(i, i + 1, escape(stack_trace(i))))
+                elif s == "skipped":
+                    out.write('    <skipped/>\n')
+                out.write('    <system-out>{}</system-out>\n'.format(escape(log(log_size, i))))
+                out.write('  </testcase>\n')
+            out.write('</testsuite>\n')
+        paths.append(path)
+    return paths
+
+
+def write_pytest_reportlog(dir: str, cases: int, log_size: int) -> List[str]:
+    """
+    JSON lines reports of pytest-reportlog, with the setup, call and teardown of each test
+    """
+    os.makedirs(dir, exist_ok=True)
+    paths = []
+    for f, r in _files(cases):
+        path = os.path.join(dir, "report{}.json".format(f))
+        nodefile = "tests/bench/test_module{}.py".format(f)
+        with open(path, "w", encoding="utf-8") as out:
+            _json_line(out, {"pytest_version": "8.3.3", "$report_type": "SessionStart"})
+            for i in r:
+                s = status(i)
+                nodeid = "{}::TestClass{}::test_func{}".format(nodefile, i % 10, i)
+                base = {"nodeid": nodeid, "location": [nodefile, i, "TestClass{}.test_func{}".format(i % 10, i)],
+                        "keywords": {"test_func{}".format(i): 1, "bench": 1}, "user_properties": [],
+                        "$report_type": "TestReport"}
+                _json_line(out, dict(base, when="setup", duration=0.0001, sections=[],
+                                     outcome="skipped" if s == "skipped" else "passed",
+                                     longrepr=[nodefile, i, "Skipped: not this time"] if s == "skipped" else None))
+                if s == "skipped":
+                    continue
+                _json_line(out, dict(base, when="call", duration=i % 100 * 0.001, outcome=s,
+                                     longrepr=stack_trace(i) if s == "failed" else None,
+                                     sections=[["Captured stdout call", log(log_size, i)]]))
+                _json_line(out, dict(base, when="teardown", duration=0.0001, outcome="passed", longrepr=None,
+                                     sections=[]))
+            _json_line(out, {"exitstatus": 1, "$report_type": "SessionFinish"})
+        paths.append(path)
+    return paths
+
+
+def _json_line(out: IO, d: dict):
+    out.write(json.dumps(d))
+    out.write("\n")
+
+
+def write_cucumber_json(dir: str, cases: int, log_size: int) -> List[str]:
+    """
+    Cucumber JSON reports, where each scenario is a test case
+    """
+    os.makedirs(dir, exist_ok=True)
+    paths = []
+    for f, r in _files(cases):
+        path = os.path.join(dir, "cucumber{}.json".format(f))
+        features = []
+        # 10 scenarios per feature
+        for start in range(r.start, r.stop, 10):
+            elements = []
+            for i in range(start, min(r.stop, start + 10)):
+                s = status(i)
+                steps = []
+                for n, keyword in enumerate(["Given ", "When ", "Then "]):
+                    result = {"status": s if n == 2 else "passed", "duration": (i % 100 + n) * 1000000}
+                    if s == "failed" and n == 2:
+                        result["error_message"] = stack_trace(i) + log(log_size, i)
+                    steps.append({"keyword": keyword, "name": "step {} of scenario {}".format(n, i), "line": n + 3,
+                                  "match": {"location": "features/step_definitions/steps.rb:{}".format(n)},
+                                  "result": result})
+                elements.append({"id": "feature-{};scenario-{}".format(start, i), "keyword": "Scenario",
+                                 "name": "scenario {}".format(i), "line": i - start + 2, "type": "scenario",
+                                 "steps": steps})
+            features.append({"uri": "features/bench/feature{}.feature".format(start), "id": "feature-{}".format(start),
+                             "keyword": "Feature", "name": "Feature {}".format(start), "line": 1,
+                             "elements": elements})
+        with open(path, "w", encoding="utf-8") as out:
+            json.dump(features, out)
+        paths.append(path)
+    return paths
+
+
+def write_nunit(dir: str, cases: int, log_size: int) -> List[str]:
+    """
+    NUnit 3 XML reports of nunit3-console
+    """
+    os.makedirs(dir, exist_ok=True)
+    paths = []
+    results = {"passed": "Passed", "failed": "Failed", "skipped": "Skipped"}
+    for f, r in _files(cases):
+        path = os.path.join(dir, "TestResult{}.xml".format(f))
+        with open(path, "w", encoding="utf-8") as out:
+            out.write('<?xml version="1.0" encoding="utf-8" standalone="no"?>\n')
+            out.write('<test-run id="0" testcasecount="{}" start-time="2026-10-18 12:34:56Z">\n'.format(len(r)))
+            out.write('<test-suite type="Assembly" name="Bench{}.dll" fullname="/src/bin/Bench{}.dll">\n'.format(f, f))
+            out.write('<test-suite type="TestSuite" name="Bench" fullname="Bench">\n')
+            # 50 tests per fixture
+            for start in range(r.start, r.stop, 50):
+                fixture = "Fixture{}".format(start)
+                out.write('<test-suite type="TestFixture" name="{}" fullname="Bench.{}" classname="Bench.{}">\n'.format(
+                    fixture, fixture, fixture))
+                for i in range(start, min(r.stop, start + 50)):
+                    s = status(i)
+                    out.write('<test-case name="Test{}" fullname="Bench.{}.Test{}" methodname="Test{}" '
+                              'classname="Bench.{}" result="{}" start-time="2026-10-18T12:34:56.0000000Z" '
+                              'duration="{:.6f}">\n'.format(i, fixture, i, i, fixture, results[s], i % 100 * 0.001))
+                    if s == "failed":
+                        out.write('<failure><message><![CDATA[expected {} but was {}]]></message>'
+                                  '<stack-trace><![CDATA[{}]]></stack-trace></failure>\n'.format(i, i + 1, stack_trace(i)))
+                    out.write('<output><![CDATA[{}]]></output>\n'.format(log(log_size, i)))
+                    out.write('</test-case>\n')
+                out.write('</test-suite>\n')
+            out.write('</test-suite>\n</test-suite>\n</test-run>\n')
+        paths.append(path)
+    return paths
+
+
+def subset_candidates(cases: int) -> List[str]:
+    """
+    Test file names to subset
+    """
+    return ["src/test/java/com/example/bench/module{}/Suite{}Test.java".format(i // CASES_PER_FILE, i)
+            for i in range(cases)]
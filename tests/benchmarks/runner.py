@@ -0,0 +1,179 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import click
+from tabulate import tabulate
+
+from . import reports
+from .fake_api import SESSION, TOKEN, FakeIntakeAPI
+
+ROOT = Path(__file__).parent.parent.parent.resolve()
+DEFAULT_BASELINE = str(Path(__file__).parent.joinpath("baselines.json"))
+
+# A scenario writes its input files for the given number of test cases and log size,
+# then returns the arguments of the command and what's fed to its stdin
+Prepare = Callable[[str, int, int, FakeIntakeAPI], Tuple[List[str], Optional[bytes]]]
+
+
+def _record(runner: List[str], write: Callable[[str, int, int], List[str]], pass_files: bool) -> Prepare:
+    def prepare(dir: str, cases: int, log_size: int, api: FakeIntakeAPI):
+        paths = write(os.path.join(dir, "reports"), cases, log_size)
+        return ["record", "tests", "--session", SESSION] + runner + (paths if pass_files else [os.path.dirname(paths[0])]), None
+    return prepare
+
+
+def _subset(dir: str, cases: int, log_size: int, api: FakeIntakeAPI):
+    stdin = "".join(t + "\n" for t in reports.subset_candidates(cases)).encode()
+    return ["subset", "--session", SESSION, "--target", "50%", "file"], stdin
+
+
+def _split_subset(dir: str, cases: int, log_size: int, api: FakeIntakeAPI):
+    subset_id = api.add_subset([[{"type": "file", "name": t}] for t in reports.subset_candidates(cases)])
+    return ["split-subset", "--subset-id", "subset/{}".format(subset_id), "--bin", "1/2", "file"], None
+
+
+SCENARIOS: Dict[str, Prepare] = {
+    "record-junit": _record(["maven"], reports.write_junit, pass_files=False),
+    "record-pytest": _record(["pytest", "--json"], reports.write_pytest_reportlog, pass_files=False),
+    "record-cucumber": _record(["cucumber", "--json"], reports.write_cucumber_json, pass_files=True),
+    "record-nunit": _record(["nunit"], reports.write_nunit, pass_files=True),
+    "subset": _subset,
+    "split-subset": _split_subset,
+}
+
+
+def run_scenario(name: str, cases: int, log_size: int, api: FakeIntakeAPI) -> Dict[str, Any]:
+    """
+    Runs the CLI for the scenario in its own process, so that the peak memory is of the scenario alone
+    """
+    with tempfile.TemporaryDirectory() as dir:
+        args, stdin = SCENARIOS[name](dir, cases, log_size, api)
+        profile_path = os.path.join(dir, "profile.json")
+        env = dict(os.environ)
+        env.update({
+            "LAUNCHABLE_TOKEN": TOKEN,
+            "LAUNCHABLE_BASE_URL": api.base_url,
+            "LAUNCHABLE_SESSION_DIR": dir,
+            "PYTHONPATH": os.pathsep.join([str(ROOT)] + ([env["PYTHONPATH"]] if env.get("PYTHONPATH") else [])),
+        })
+
+        api.reset_stats()
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-m", "launchable", "--profile-output", profile_path] + args,
+                              input=stdin or b"", stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env, cwd=dir)
+        elapsed = time.perf_counter() - start
+        if proc.returncode != 0:
+            raise click.ClickException("{} failed:\n{}".format(name, proc.stderr.decode(errors="replace")))
+        with open(profile_path) as f:
+            profile = json.load(f)
+
+    wall_time = profile["wallTime"]
+    return {
+        "cases": cases,
+        "wallTime": wall_time,
+        # including the start-up of the interpreter and the imports
+        "processTime": elapsed,
+        "throughput": cases / wall_time if wall_time > 0 else 0,
+        "maxRss": profile["maxRss"],
+        "requests": dict(api.requests),
+        "bytesSent": api.bytes_received,
+        "eventsReceived": api.events_received,
+        "phases": profile["phases"],
+    }
+
+
+def baseline_key(name: str, cases: int, log_size: int) -> str:
+    return "{}/{}/{}".format(name, cases, log_size)
+
+
+def compare(result: Dict[str, Any], baseline: Optional[Dict[str, Any]], tolerance: float) -> List[str]:
+    """
+    Returns what got worse than the baseline by more than the tolerance
+    """
+    if baseline is None:
+        return []
+    regressions = []
+    if result["throughput"] < baseline["throughput"] * (1 - tolerance):
+        regressions.append("throughput {:.0f}/s < {:.0f}/s".format(result["throughput"], baseline["throughput"]))
+    if result["maxRss"] > baseline["maxRss"] * (1 + tolerance):
+        regressions.append("peak memory {:.1f}MB > {:.1f}MB".format(
+            result["maxRss"] / 1024 / 1024, baseline["maxRss"] / 1024 / 1024))
+    if sum(result["requests"].values()) > sum(baseline["requests"].values()) * (1 + tolerance):
+        regressions.append("{} requests > {}".format(sum(result["requests"].values()), sum(baseline["requests"].values())))
+    return regressions
+
+
+@click.command()
+@click.option('--scenario', 'scenarios', multiple=True, type=click.Choice(list(SCENARIOS.keys())),
+              help='Scenarios to run. Defaults to all of them')
+@click.option('--scale', 'scales', multiple=True, type=click.IntRange(min=1), default=[1000, 10000, 100000],
+              show_default=True, help='Number of test cases (10^3 to 10^6)')
+@click.option('--log-size', 'log_size', type=click.IntRange(min=0), default=256, show_default=True,
+              help='Characters of the log each test case prints')
+@click.option('--latency', 'latency', type=float, default=0.05, show_default=True,
+              help='Seconds the fake API takes to respond to each request')
+@click.option('--baseline', 'baseline_path', type=click.Path(dir_okay=False), default=DEFAULT_BASELINE,
+              show_default=True, help='Baselines to compare with')
+@click.option('--save-baseline', 'save_baseline', is_flag=True, help='Save the results as the new baselines')
+@click.option('--tolerance', 'tolerance', type=float, default=0.25, show_default=True,
+              help='How much worse than the baselines is taken as a regression')
+@click.option('--verify', 'verify', is_flag=True, help='Check that the fake API received every test case')
+@click.option('--output', 'output', type=click.Path(dir_okay=False), help='Write the results to a JSON file')
+def main(scenarios, scales, log_size, latency, baseline_path, save_baseline, tolerance, verify, output):
+    """
+    Benchmarks `record tests`, `subset` and `split-subset` end to end with synthetic reports,
+    against a fake intake API in this process.
+
+        python -m tests.benchmarks --scale 10000 --scenario record-junit
+    """
+    baselines: Dict[str, Any] = {}
+    if os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            baselines = json.load(f)
+
+    results: Dict[str, Any] = {}
+    rows = []
+    failures = []
+    with FakeIntakeAPI(latency=latency, verify=verify) as api:
+        for name in scenarios or SCENARIOS.keys():
+            for cases in scales:
+                key = baseline_key(name, cases, log_size)
+                r = run_scenario(name, cases, log_size, api)
+                results[key] = r
+
+                if verify and name.startswith("record-") and r["eventsReceived"] != cases:
+                    failures.append("{}: the server received {} test cases".format(key, r["eventsReceived"]))
+                regressions = compare(r, baselines.get(key), tolerance)
+                failures.extend("{}: {}".format(key, x) for x in regressions)
+
+                baseline = baselines.get(key)
+                rows.append([name, cases, r["wallTime"], r["throughput"],
+                             r["throughput"] / baseline["throughput"] * 100 if baseline else None,
+                             r["maxRss"] / 1024 / 1024, sum(r["requests"].values()), r["bytesSent"] / 1024 / 1024,
+                             "regressed" if regressions else "ok"])
+                click.echo("{}: {:.2f}s".format(key, r["wallTime"]), err=True)
+
+    click.echo(tabulate(rows, ["Scenario", "Cases", "Time (s)", "Throughput (cases/s)", "vs baseline (%)",
+                               "Peak memory (MB)", "Requests", "Sent (MB)", "Status"],
+                        tablefmt="github", floatfmt=".1f", missingval="-"))
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if save_baseline:
+        baselines.update({k: {"throughput": r["throughput"], "maxRss": r["maxRss"], "requests": r["requests"]}
+                          for k, r in results.items()})
+        with open(baseline_path, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        return
+
+    if failures:
+        raise click.ClickException("\n".join(failures))
@@ -0,0 +1,83 @@
+import os
+from unittest import TestCase, skipUnless
+
+from . import build_data, compression
+from .fake_api import FakeIntakeAPI
+from .importtime import STARTUP_BUDGET, _parse_importtime, measure
+from .runner import SCENARIOS, compare, run_scenario
+
+# timings depend on the machine and on what else runs on it, so they are checked only when asked for
+BENCHMARK_KEY = "LAUNCHABLE_BENCHMARK"
+
+
+class BenchmarkTest(TestCase):
+    """
+    Runs each scenario at a small scale, so that the benchmarks keep working as the CLI changes
+    """
+
+    def test_scenarios(self):
+        with FakeIntakeAPI(verify=True) as api:
+            for name in SCENARIOS:
+                with self.subTest(scenario=name):
+                    r = run_scenario(name, 30, 64, api)
+                    self.assertGreater(sum(r["requests"].values()), 0)
+                    self.assertGreater(r["maxRss"], 0)
+                    if name.startswith("record-"):
+                        self.assertEqual(r["eventsReceived"], 30)
+                    self.assertEqual(compare(r, dict(r), 0.25), [])
+
+    def test_compare(self):
+        baseline = {"throughput": 1000, "maxRss": 100, "requests": {"events": 2}}
+        result = {"throughput": 700, "maxRss": 130, "requests": {"events": 2, "other": 1}}
+        self.assertEqual(len(compare(result, baseline, 0.25)), 3)
+        self.assertEqual(compare(result, baseline, 0.6), [])
+        self.assertEqual(compare(result, None, 0.25), [])
+
+
+class ImportTimeTest(TestCase):
+    def test_commands_import_what_they_run(self):
+        for args in [["verify", "--help"], ["record", "build", "--help"], ["record", "session", "--help"]]:
+            with self.subTest(args=args):
+                modules = measure(args)["modules"]
+                unneeded = [m for m in modules if m.startswith("launchable.test_runners.")]
+                unneeded += [m for m in ("launchable.commands.record.tests", "launchable.commands.subset") if m in modules]
+                self.assertEqual(unneeded, [])
+
+        # lists every test runner
+        self.assertIn("launchable.test_runners.maven", measure(["record", "tests", "--help"])["modules"])
+
+    def test_no_heavy_modules_at_startup(self):
+        for args in [["--help"], ["record", "build", "--help"], ["record", "session", "--help"]]:
+            with self.subTest(args=args):
+                self.assertEqual(measure(args)["heavyModules"], [])
+
+    @skipUnless(os.getenv(BENCHMARK_KEY), "set {} to check the timing budgets".format(BENCHMARK_KEY))
+    def test_startup_time_budget(self):
+        # with --help, so that the time is of the start-up alone, without the work of the commands
+        for args in [["--help"], ["record", "build", "--help"], ["record", "session", "--help"]]:
+            with self.subTest(args=args):
+                self.assertLess(min(measure(args)["time"] for _ in range(3)), STARTUP_BUDGET)
+
+    def test_parse_importtime(self):
+        self.assertEqual(_parse_importtime(
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   click._compat\n"
+            "import time:      3000 |       3120 | click\n"
+            "something else\n"), {"click._compat": (120, 120), "click": (3000, 3120)})
+
+
+class CompressionBenchmarkTest(TestCase):
+    def test_measure(self):
+        results = compression.measure(100, 64 * 1024)
+        self.assertEqual(len(results), 3 * len(compression.codecs()))
+        for r in results:
+            with self.subTest(input=r["input"], codec=r["codec"]):
+                self.assertLess(r["size"], r["originalSize"])
+
+
+class BuildDataBenchmarkTest(TestCase):
+    def test_measure(self):
+        r = build_data.measure(1000)
+        self.assertTrue(r["same"])
+        # too small a payload to tell the difference in memory, which the compressor's buffers outweigh
+        self.assertGreater(r["streamedPeak"], 0)
@@ -1,5 +1,6 @@
 import gzip
 import os
+import shutil
 import tempfile
 from unittest import mock
 
@@ -44,3 +45,123 @@ class AttachmentTest(CliTestCase):
         self.assertEqual(TEST_CONTENT, body)
 
         os.unlink(attachment.name)
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"LAUNCHABLE_TOKEN": CliTestCase.launchable_token})
+    def test_compressed_attachment(self):
+        TEST_CONTENT = gzip.compress(b"Hello world")
+
+        write_session(self.build_name, self.session_id)
+
+        attachment = tempfile.NamedTemporaryFile(suffix=".gz", delete=False)
+        attachment.write(TEST_CONTENT)
+        attachment.close()
+
+        body = None
+        encoding = None
+
+        def verify_body(request):
+            nonlocal body, encoding
+            # sent as is, rather than compressed again
+            body = request.body.read()
+            encoding = request.headers.get("Content-Encoding")
+            return (200, [], None)
+
+        responses.add_callback(
+            responses.POST,
+            "{}/intake/organizations/{}/workspaces/{}/builds/{}/test_sessions/{}/attachment".format(
+                get_base_url(), self.organization, self.workspace, self.build_name, self.session_id),
+            callback=verify_body)
+
+        result = self.cli("record", "attachment", "--session", self.session, attachment.name)
+
+        self.assert_success(result)
+        self.assertEqual(TEST_CONTENT, body)
+        self.assertIsNone(encoding)
+
+        os.unlink(attachment.name)
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"LAUNCHABLE_TOKEN": CliTestCase.launchable_token})
+    def test_skip_sent_attachments(self):
+        write_session(self.build_name, self.session_id)
+
+        d = tempfile.mkdtemp()
+        paths = []
+        for name, content in [("a.log", b"foo"), ("b.log", b"bar"), ("copy_of_a.log", b"foo")]:
+            path = os.path.join(d, name)
+            with open(path, "wb") as f:
+                f.write(content)
+            paths.append(path)
+
+        bodies = []
+
+        def verify_body(request):
+            bodies.append(gzip.decompress(b''.join(list(request.body))))
+            return (200, [], None)
+
+        responses.add_callback(
+            responses.POST,
+            "{}/intake/organizations/{}/workspaces/{}/builds/{}/test_sessions/{}/attachment".format(
+                get_base_url(), self.organization, self.workspace, self.build_name, self.session_id),
+            callback=verify_body)
+
+        result = self.cli("record", "attachment", "--session", self.session, "--concurrency", "2", *paths, paths[0])
+        self.assert_success(result)
+        # the copy has the same content but another name, which the server keeps apart
+        self.assertCountEqual(bodies, [b"foo", b"bar", b"foo"])
+        self.assertIn("Skipping {} as it's already sent".format(paths[0]), result.output)
+        self.assertRegex(result.output, r"\| {} +\| +0\.00 \| +[0-9.]+ \| +[0-9.-]+ \| sent +\|".format(paths[2]))
+        self.assertRegex(result.output, r"\| {} +\| +0\.00 \| +- +\| +- +\| skipped +\|".format(paths[0]))
+
+        # the ones sent in the previous invocation are skipped
+        new = os.path.join(d, "c.log")
+        with open(new, "wb") as f:
+            f.write(b"baz")
+        bodies.clear()
+        result = self.cli("record", "attachment", "--session", self.session, paths[1], new)
+        self.assert_success(result)
+        self.assertEqual(bodies, [b"baz"])
+        self.assertIn("Skipping {} as it's already sent".format(paths[1]), result.output)
+
+        # a file of the same name is sent again once its content changes
+        with open(paths[1], "wb") as f:
+            f.write(b"bar2")
+        bodies.clear()
+        result = self.cli("record", "attachment", "--session", self.session, paths[1])
+        self.assert_success(result)
+        self.assertEqual(bodies, [b"bar2"])
+
+        shutil.rmtree(d)
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"LAUNCHABLE_TOKEN": CliTestCase.launchable_token})
+    def test_unreadable_attachment(self):
+        write_session(self.build_name, self.session_id)
+
+        d = tempfile.mkdtemp()
+        path = os.path.join(d, "a.log")
+        with open(path, "wb") as f:
+            f.write(b"foo")
+        missing = os.path.join(d, "missing.log")
+
+        bodies = []
+
+        def verify_body(request):
+            bodies.append(gzip.decompress(b''.join(list(request.body))))
+            return (200, [], None)
+
+        responses.add_callback(
+            responses.POST,
+            "{}/intake/organizations/{}/workspaces/{}/builds/{}/test_sessions/{}/attachment".format(
+                get_base_url(), self.organization, self.workspace, self.build_name, self.session_id),
+            callback=verify_body)
+
+        # the rest are sent all the same
+        result = self.cli("record", "attachment", "--session", self.session, missing, path)
+        self.assert_success(result)
+        self.assertEqual(bodies, [b"foo"])
+        self.assertIn("Can't read {}".format(missing), result.output)
+        self.assertRegex(result.output, r"\| {} +\| +- +\| +- +\| +- +\| failed +\|".format(missing))
+
+        shutil.rmtree(d)
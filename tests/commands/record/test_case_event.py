@@ -2,7 +2,7 @@ import unittest
 from io import StringIO
 from unittest import mock
 
-from launchable.commands.record.case_event import CaseEvent
+from launchable.commands.record.case_event import CaseEvent, LogTruncation
 
 UNKNOWN_TIMEZONE_WARNING = "UnknownTimezoneWarning"
 
@@ -35,3 +35,33 @@ class TestCaseEventTimestamp(unittest.TestCase):
             # encounters an unknown timezone abbreviation (e.g., 'XYZ'), resulting in
             # a timestamp like '2024-06-23T12:34:56.789000+09:00'.
             self.assertTrue(result["createdAt"].startswith("2024-06-23T12:34:56.789"))
+
+
+class TestCaseEventTruncateLog(unittest.TestCase):
+    def test_truncate_log(self):
+        self.assertEqual(CaseEvent.truncate_log("abcdef", 0), ("abcdef", False))
+        self.assertEqual(CaseEvent.truncate_log("abcdef", 6), ("abcdef", False))
+        self.assertEqual(CaseEvent.truncate_log("abcdefg", 4), ("ab\n...(truncated 3 bytes)...\nfg", True))
+        # a multi-byte character split at the cut is dropped
+        self.assertEqual(CaseEvent.truncate_log("\u3042\u3044\u3046\u3048", 8),
+                         ("\u3042\n...(truncated 4 bytes)...\n\u3048", True))
+
+    def test_log_truncation(self):
+        truncation = LogTruncation(max_stdout_size=4, max_stderr_size=0)
+        result = truncation.apply(CaseEvent.create(
+            test_path=[], duration_secs=1.0, status=CaseEvent.TEST_FAILED, stdout="abcdefg", stderr="abcdefg"))
+        self.assertEqual(result["stdout"], "ab\n...(truncated 3 bytes)...\nfg")
+        self.assertEqual(result["stderr"], "abcdefg")
+        self.assertEqual(truncation.truncated_stdout_count, 1)
+        self.assertEqual(truncation.truncated_stderr_count, 0)
+
+        # the counts are of each invocation, and the events created elsewhere are left as they are
+        self.assertEqual(LogTruncation().truncated_stdout_count, 0)
+        self.assertEqual(CaseEvent.create(test_path=[], duration_secs=1.0, status=CaseEvent.TEST_FAILED,
+                                          stdout="abcdefg")["stdout"], "abcdefg")
+
+        other = LogTruncation(max_stdout_size=4, max_stderr_size=4)
+        other.apply(CaseEvent.create(test_path=[], duration_secs=1.0, status=CaseEvent.TEST_FAILED,
+                                     stdout="abcdefg", stderr="abcdefg"))
+        truncation.add_counts(other)
+        self.assertEqual((truncation.truncated_stdout_count, truncation.truncated_stderr_count), (2, 1))
@@ -14,6 +14,16 @@ class SessionTest(CliTestCase):
     Otherwise GithubActions will export $GITHUB_* variables at runs.
     """
 
+    def setUp(self):
+        super().setUp()
+        # `clear=True` removes $LAUNCHABLE_SESSION_DIR as well, so the session and cache files go to the working directory
+        self.cwd = os.getcwd()
+        os.chdir(self.dir)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        super().tearDown()
+
     @responses.activate
     @mock.patch.dict(os.environ, {
         "LAUNCHABLE_TOKEN": CliTestCase.launchable_token,
@@ -1,16 +1,24 @@
 import gzip
+import hashlib
 import json
+import multiprocessing
 import os
+import platform
 import sys
+import tempfile
+import threading
+import time
 from pathlib import Path
 from unittest import mock
 
 import responses  # type: ignore
 
-from launchable.commands.record.tests import INVALID_TIMESTAMP, parse_launchable_timeformat
-from launchable.utils.http_client import get_base_url
+from launchable.commands.record.tests import INVALID_TIMESTAMP, ChunkSizer, idempotency_key, parse_launchable_timeformat
+from launchable.utils.http_client import MAX_RETRIES, get_base_url
 from launchable.utils.no_build import NO_BUILD_BUILD_NAME, NO_BUILD_TEST_SESSION_ID
+from launchable.utils.sax import JUnitXmlSaxParser
 from launchable.utils.session import write_build, write_session
+from launchable.version import __version__
 from tests.cli_test_case import CliTestCase
 
 
@@ -32,6 +40,20 @@ class TestsTest(CliTestCase):
         request = json.loads(gzip.decompress(self.find_request('/events').request.body).decode())
         self.assertCountEqual(request.get("group", []), "hoge")
 
+    @responses.activate
+    @mock.patch.dict(os.environ, {"LAUNCHABLE_TOKEN": CliTestCase.launchable_token})
+    def test_user_agent(self):
+        write_session(self.build_name, self.session_id)
+
+        result = self.cli('record', 'tests', '--session', self.session, 'maven', str(self.report_files_dir) + "**/reports/")
+        self.assert_success(result)
+
+        # events are sent from worker threads, which tell the command all the same: the chain of the contexts
+        # from the innermost one, where the root command is named after the function in tests
+        self.assertEqual(self.find_request('/events').request.headers["User-Agent"],
+                         "Launchable/{} (Python {}, {}) TestRunner/maven Command/maven>tests>record>main({})".format(
+                             __version__, platform.python_version(), platform.platform(), os.getpid()))
+
     @responses.activate
     @mock.patch.dict(os.environ, {"LAUNCHABLE_TOKEN": CliTestCase.launchable_token})
     def test_filename_in_error_message(self):
@@ -107,3 +129,399 @@ class TestsTest(CliTestCase):
 
         self.assert_success(result)
         self.assertIn("Total test duration is 0.", result.output)
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"LAUNCHABLE_TOKEN": CliTestCase.launchable_token})
+    def test_truncated_report(self):
+        write_build(self.build_name)
+
+        with tempfile.TemporaryDirectory() as d:
+            report = os.path.join(d, "truncated.xml")
+            with open(report, "w") as f:
+                f.write("""<?xml version="1.0" encoding="UTF-8"?>
+<testsuite name="UserTest" tests="2">
+  <testcase time="1.5" file="test/models/user_test.rb" name="test_complete"></testcase>
+  <testcase time="0.5" file="test/models/user_test.rb" name="test_cut""")
+            result = self.cli('record', 'tests', '--build', self.build_name, 'file', report)
+
+        self.assert_success(result)
+        self.assertIn("Warning: error parsing JUnitXml file", result.output)
+        self.assertIn("The test cases before the error are recorded.", result.output)
+        # the test cases parsed before the error are sent, unlike when the whole tree is built in memory
+        events = json.loads(gzip.decompress(self.find_request('/events').request.body).decode())['events']
+        self.assertEqual([e['testPath'][-1]['name'] for e in events], ["test_complete"])
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"LAUNCHABLE_TOKEN": CliTestCase.launchable_token})
+    def test_parallel(self):
+        write_session(self.build_name, self.session_id)
+
+        normal_xml = str(Path(__file__).parent.joinpath('../../data/broken_xml/normal.xml').resolve())
+        broken_xml = str(Path(__file__).parent.joinpath('../../data/broken_xml/broken.xml').resolve())
+
+        def recorded_events(*args):
+            responses.calls.reset()
+            result = self.cli('record', 'tests', '--session', self.session, *args,
+                              'maven', str(self.report_files_dir) + "**/reports/", normal_xml, broken_xml)
+            self.assert_success(result)
+
+            events = json.loads(gzip.decompress(self.find_request('/events').request.body).decode())['events']
+            for e in events:
+                del e['createdAt']
+            return events
+
+        # parsing reports in parallel produces the same events in the same order
+        self.assertEqual(recorded_events(), recorded_events('--parallel', '3'))
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"LAUNCHABLE_TOKEN": CliTestCase.launchable_token})
+    def test_parallel_forks_without_background_threads(self):
+        write_session(self.build_name, self.session_id)
+        threads_at_fork = []
+        get_context = multiprocessing.get_context
+
+        def get_context_after_checking_threads(method=None):
+            threads_at_fork.append([t.name for t in threading.enumerate() if t.name.startswith("launchable-")])
+            return get_context(method)
+
+        with mock.patch("multiprocessing.get_context", side_effect=get_context_after_checking_threads):
+            result = self.cli('record', 'tests', '--session', self.session, '--parallel', '2',
+                              'maven', str(self.report_files_dir) + "**/reports/")
+        self.assert_success(result)
+        # the threads that sent the requests at startup are gone, rather than possibly holding a lock
+        self.assertEqual(threads_at_fork, [[]])
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"LAUNCHABLE_TOKEN": CliTestCase.launchable_token})
+    def test_parse_reports_only_once(self):
+        write_session(self.build_name, self.session_id)
+
+        with mock.patch.object(JUnitXmlSaxParser, 'iterparse', autospec=True,
+                               side_effect=JUnitXmlSaxParser.iterparse) as iterparse:
+            result = self.cli('record', 'tests', '--session', self.session, 'maven', str(self.report_files_dir) + "**/reports/")
+            self.assert_success(result)
+
+            # the summary is tallied while uploading, instead of parsing reports once again
+            reports = [c[0][1].name for c in iterparse.call_args_list]
+            self.assertEqual(len(reports), 4)
+            self.assertCountEqual(reports, set(reports))
+
+        self.assertIn("|             4 |             4 |              4 |              0 |", result.output)
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"LAUNCHABLE_TOKEN": CliTestCase.launchable_token})
+    def test_max_log_size(self):
+        write_session(self.build_name, self.session_id)
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            reports = []
+            for i in range(2):
+                report = os.path.join(tempdir, "report{}.xml".format(i))
+                with open(report, 'w') as f:
+                    f.write(
+                        '<testsuite name="suite" tests="2">'
+                        '<testcase file="foo.py" name="big{i}"><system-out>{head}{out}{tail}</system-out>'
+                        '<failure message="failed">{err}</failure></testcase>'
+                        '<testcase file="foo.py" name="small{i}"><system-out>small</system-out></testcase>'
+                        '</testsuite>'.format(i=i, head="h" * 50, out="o" * 10000, tail="t" * 50, err="e" * 10000))
+                reports.append(report)
+
+            for parallel in ["1", "2"]:
+                responses.calls.reset()
+                result = self.cli('record', 'tests', '--session', self.session, '--parallel', parallel,
+                                  '--max-stdout-size', '100', '--max-stderr-size', '200', 'file', *reports)
+                self.assert_success(result)
+
+                events = json.loads(gzip.decompress(self.find_request('/events').request.body).decode())['events']
+                big = [e for e in events if e['testPath'][-1]['name'].startswith('big')]
+                self.assertEqual(len(big), 2)
+                for e in big:
+                    self.assertEqual(e['stdout'], "h" * 50 + "\n...(truncated 10000 bytes)...\n" + "t" * 50)
+                    self.assertEqual(e['stderr'], "e" * 100 + "\n...(truncated 9800 bytes)...\n" + "e" * 100)
+                small = [e for e in events if e['testPath'][-1]['name'].startswith('small')]
+                self.assertEqual([e['stdout'] for e in small], ["small", "small"])
+
+                self.assertIn("stdout of 2 test(s), stderr of 2 test(s)", result.output)
+
+            # the limits are of the invocation, rather than carried over to the next one in the same process
+            responses.calls.reset()
+            result = self.cli('record', 'tests', '--session', self.session, 'file', *reports)
+            self.assert_success(result)
+            events = json.loads(gzip.decompress(self.find_request('/events').request.body).decode())['events']
+            self.assertEqual(sorted(len(e['stdout']) for e in events), [5, 5, 10100, 10100])
+            self.assertNotIn("Truncated logs", result.output)
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"LAUNCHABLE_TOKEN": CliTestCase.launchable_token})
+    def test_post_chunk_bytes(self):
+        write_session(self.build_name, self.session_id)
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            report = os.path.join(tempdir, "report.xml")
+            with open(report, 'w') as f:
+                f.write('<testsuite name="suite" tests="300">')
+                for i in range(300):
+                    # random logs that don't compress well
+                    f.write('<testcase file="foo.py" name="test{}"><system-out>{}</system-out></testcase>'.format(
+                        i, os.urandom(1000).hex()))
+                f.write('</testsuite>')
+
+            result = self.cli('record', 'tests', '--session', self.session, '--post-chunk', '100',
+                              '--post-chunk-bytes', '20000', 'file', report)
+            self.assert_success(result)
+
+        sizes = []
+        counts = []
+        for call in responses.calls:
+            if call.request.url.endswith('/events'):
+                sizes.append(len(call.request.body))
+                counts.append(len(json.loads(gzip.decompress(call.request.body).decode())['events']))
+
+        self.assertEqual(sum(counts), 300)
+        # the first chunk follows --post-chunk, then the rest is sized to fit the budget
+        self.assertEqual(counts[0], 100)
+        self.assertGreater(sizes[0], 20000 * 2)
+        for size in sizes[1:]:
+            self.assertLessEqual(size, 20000 * 1.2)
+
+    def test_chunk_sizer(self):
+        sizer = ChunkSizer(1000)
+        sizer.update(1000, 100 * 1024 * 1024)
+        # no byte budget, no adjustment
+        self.assertEqual(sizer.size, 1000)
+
+        sizer = ChunkSizer(1000, 1024 * 1024)
+        sizer.update(1000, 4 * 1024 * 1024)
+        self.assertEqual(sizer.size, 250)
+        # grows gradually
+        sizer.update(250, 1024)
+        self.assertEqual(sizer.size, 500)
+        # within the bounds
+        sizer.update(500, 1024 * 1024 * 1024)
+        self.assertEqual(sizer.size, ChunkSizer.MIN_SIZE)
+        for _ in range(20):
+            sizer.update(sizer.size, 1)
+        self.assertEqual(sizer.size, ChunkSizer.MAX_SIZE)
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"LAUNCHABLE_TOKEN": CliTestCase.launchable_token})
+    def test_post_concurrency(self):
+        write_session(self.build_name, self.session_id)
+
+        result = self.cli('record', 'tests', '--session', self.session, '--post-chunk', '1', '--post-concurrency', '3',
+                          'maven', str(self.report_files_dir) + "**/reports/")
+        self.assert_success(result)
+
+        events = []
+        for call in responses.calls:
+            if call.request.url.endswith('/events'):
+                events.extend(json.loads(gzip.decompress(call.request.body).decode())['events'])
+        self.assertEqual(len(events), 4)
+        self.assertIn("|             4 |             4 |              4 |              0 |", result.output)
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"LAUNCHABLE_TOKEN": CliTestCase.launchable_token})
+    @mock.patch("launchable.utils.http_client.POST_RETRY_BACKOFF_FACTOR", 0)
+    def test_post_concurrency_error(self):
+        write_session(self.build_name, self.session_id)
+        responses.replace(
+            responses.POST,
+            "{}/intake/organizations/{}/workspaces/{}/{}/events".format(
+                get_base_url(), self.organization, self.workspace, self.session),
+            json={"reason": "Welp"},
+            status=500)
+
+        result = self.cli('record', 'tests', '--session', self.session, '--post-chunk', '1', '--post-concurrency', '3',
+                          'maven', str(self.report_files_dir) + "**/reports/")
+        # the failure is reported, but doesn't fail the CI pipeline
+        self.assert_success(result)
+        self.assertIn("500 Server Error", result.output)
+        self.assertNotIn("Launchable recorded tests", result.output)
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"LAUNCHABLE_TOKEN": CliTestCase.launchable_token})
+    @mock.patch("launchable.utils.http_client.POST_RETRY_BACKOFF_FACTOR", 0)
+    def test_resume_unsent_chunks(self):
+        write_session(self.build_name, self.session_id)
+        events_url = "{}/intake/organizations/{}/workspaces/{}/{}/events".format(
+            get_base_url(), self.organization, self.workspace, self.session)
+
+        sent = []
+
+        def callback(request):
+            if len(sent) == 1:
+                return (500, {}, json.dumps({"reason": "Welp"}))
+            sent.extend(e['testPath'] for e in json.loads(gzip.decompress(request.body).decode())['events'])
+            return (200, {}, json.dumps({}))
+
+        responses.remove(responses.POST, events_url)
+        responses.add_callback(responses.POST, events_url, callback=callback)
+
+        args = ['record', 'tests', '--session', self.session, '--post-chunk', '1',
+                'maven', str(self.report_files_dir) + "**/reports/"]
+
+        # the 2nd chunk (and the 3rd one sent while waiting for the response) fails even after retries,
+        # then the rest is spooled without being sent
+        result = self.cli(*args)
+        self.assert_success(result)
+        self.assertIn("500 Server Error", result.output)
+        self.assertIn("3 of 4 chunk(s) of test results couldn't be sent", result.output)
+        self.assertEqual(len(sent), 1)
+        self.assertEqual(len([c for c in responses.calls if c.request.url == events_url]), 1 + 2 * (MAX_RETRIES + 1))
+
+        # retrying sends only the unsent chunks
+        sent.append(None)  # no more failures
+        responses.calls.reset()
+        result = self.cli(*args)
+        self.assert_success(result)
+        self.assertIn("Resuming 3 chunk(s)", result.output)
+        # the summary counts the chunk sent by the first attempt as well
+        self.assertIn("|             4 |             4 |              4 |              0 |", result.output)
+        self.assertEqual(len([c for c in responses.calls if c.request.url == events_url]), 3)
+        sent.remove(None)
+        self.assertEqual(len(sent), 4)
+        self.assertCountEqual([json.dumps(p) for p in sent], set(json.dumps(p) for p in sent))
+
+        # the spool is gone once everything is sent, so running the command once again sends everything again
+        responses.calls.reset()
+        result = self.cli(*args)
+        self.assert_success(result)
+        self.assertNotIn("Resuming", result.output)
+        self.assertEqual(len([c for c in responses.calls if c.request.url == events_url]), 4)
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"LAUNCHABLE_TOKEN": CliTestCase.launchable_token})
+    @mock.patch("launchable.utils.http_client.POST_RETRY_BACKOFF_FACTOR", 0)
+    def test_retry_with_idempotency_key(self):
+        write_session(self.build_name, self.session_id)
+        events_url = "{}/intake/organizations/{}/workspaces/{}/{}/events".format(
+            get_base_url(), self.organization, self.workspace, self.session)
+
+        keys = []
+        bodies = {}
+
+        def callback(request):
+            keys.append(request.headers["Idempotency-Key"])
+            bodies[keys[-1]] = gzip.decompress(request.body)
+            # every chunk fails once
+            if keys.count(keys[-1]) == 1:
+                return (502, {}, "")
+            return (200, {}, json.dumps({}))
+
+        responses.remove(responses.POST, events_url)
+        responses.add_callback(responses.POST, events_url, callback=callback)
+
+        args = ['record', 'tests', '--session', self.session, '--post-chunk', '1',
+                'maven', str(self.report_files_dir) + "**/reports/"]
+        result = self.cli(*args)
+        self.assert_success(result)
+        self.assertIn("|             4 |             4 |              4 |              0 |", result.output)
+        # each chunk is retried with the same key, which is unique to the chunk
+        self.assertEqual(keys, [k for k in bodies.keys() for _ in range(2)])
+        self.assertEqual(list(bodies.keys()), [
+            idempotency_key(self.session, i, hashlib.sha256(body).hexdigest()) for i, body in enumerate(bodies.values())])
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"LAUNCHABLE_TOKEN": CliTestCase.launchable_token})
+    def test_startup_requests_are_concurrent(self):
+        # a session is created by the nested `record session`, which needs the workspace state as well
+        write_build(self.build_name)
+
+        delay = 0.2
+        lock = threading.Lock()
+        in_flight = [0]
+        max_in_flight = [0]
+
+        def delayed(body):
+            def callback(request):
+                with lock:
+                    in_flight[0] += 1
+                    max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+                time.sleep(delay)
+                with lock:
+                    in_flight[0] -= 1
+                return (200, {}, json.dumps(body))
+            return callback
+
+        base = "{}/intake/organizations/{}/workspaces/{}".format(get_base_url(), self.organization, self.workspace)
+        startup = {
+            "state": {'isFailFastMode': False, 'isPtsV2Enabled': False},
+            "builds/{}".format(self.build_name): {'createdAt': "2020-01-02T03:45:56.123+00:00", 'id': 123},
+            "slack/notification/key/list": {'keys': []},
+        }
+        for path, body in startup.items():
+            responses.remove(responses.GET, "{}/{}".format(base, path))
+            responses.add_callback(responses.GET, "{}/{}".format(base, path), callback=delayed(body))
+
+        result = self.cli('record', 'tests', '--build', self.build_name, 'maven', str(self.report_files_dir) + "**/reports/")
+        self.assert_success(result)
+
+        # each is sent once, even though both `record tests` and `record session` need the state
+        for path in startup:
+            self.assertEqual(len([c for c in responses.calls if c.request.url == "{}/{}".format(base, path)]), 1, path)
+        # and all of them are in flight at the same time, rather than one after another
+        self.assertEqual(max_in_flight[0], len(startup))
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"LAUNCHABLE_TOKEN": CliTestCase.launchable_token})
+    def test_slack_notification_keys_are_fetched_once(self):
+        write_session(self.build_name, self.session_id)
+
+        def key_list_requests():
+            return [c for c in responses.calls if c.request.url.endswith('/slack/notification/key/list')]
+
+        with mock.patch.dict(os.environ, {"GITHUB_ACTOR": "launchable", "BRANCH_NAME": "main"}):
+            result = self.cli('record', 'tests', '--session', self.session, '--post-chunk', '1',
+                              'maven', str(self.report_files_dir) + "**/reports/")
+        self.assert_success(result)
+        self.assertEqual(len(key_list_requests()), 1)
+
+        payload = json.loads(gzip.decompress(self.find_request('/events', n=3).request.body).decode())
+        self.assertEqual(payload['metadata'], {"GITHUB_ACTOR": "launchable", "BRANCH_NAME": "main"})
+
+        # the next invocation reuses the keys persisted by the previous one
+        result = self.cli('record', 'tests', '--session', self.session, 'maven', str(self.report_files_dir) + "**/reports/")
+        self.assert_success(result)
+        self.assertEqual(len(key_list_requests()), 1)
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"LAUNCHABLE_TOKEN": CliTestCase.launchable_token})
+    def test_startup_requests_are_cached(self):
+        base = "{}/intake/organizations/{}/workspaces/{}".format(get_base_url(), self.organization, self.workspace)
+
+        def requests_of(path):
+            url = "{}/{}".format(base, path)
+            return len([c for c in responses.calls if c.request.method == "GET" and c.request.url == url])
+
+        build = "builds/{}".format(self.build_name)
+        session_name = "builds/{}/test_session_names/{}".format(self.build_name, self.session_name)
+        for _ in range(2):
+            result = self.cli('record', 'tests', '--build', self.build_name, '--session-name', self.session_name,
+                              'maven', str(self.report_files_dir) + "**/reports/")
+            self.assert_success(result)
+        # the second invocation goes with what the first one fetched
+        self.assertEqual(requests_of("state"), 1)
+        self.assertEqual(requests_of(build), 1)
+        self.assertEqual(requests_of(session_name), 1)
+
+        # a new session fetches the state afresh
+        result = self.cli('record', 'session', '--build', self.build_name)
+        self.assert_success(result)
+        self.assertEqual(requests_of("state"), 2)
+        result = self.cli('record', 'tests', '--session', self.session, 'maven', str(self.report_files_dir) + "**/reports/")
+        self.assert_success(result)
+        self.assertEqual(requests_of("state"), 2)
+        self.assertEqual(requests_of(build), 1)
+
+        # and so does a new build, which tells its own timestamp
+        responses.replace(responses.POST, "{}/builds".format(base),
+                          json={'id': 124, 'build': self.build_name, 'createdAt': "2020-01-03T03:45:56.123+00:00"})
+        with mock.patch('launchable.utils.subprocess.check_output', return_value=b''):
+            result = self.cli('record', 'build', '--no-commit-collection', '--no-submodules', '--name', self.build_name,
+                              '--commit', 'repo=c50f5de0f06fe16afa4fd1dd615e4903e40b42a2')
+        self.assert_success(result)
+        self.assertEqual(requests_of("state"), 3)
+        result = self.cli('record', 'tests', '--session', self.session, 'maven', str(self.report_files_dir) + "**/reports/")
+        self.assert_success(result)
+        self.assertEqual(requests_of("state"), 3)
+        self.assertEqual(requests_of(build), 1)
@@ -6,6 +6,7 @@ from unittest import mock
 
 import responses  # type: ignore
 
+from launchable.commands.subset import SubsetResult
 from launchable.utils.http_client import get_base_url
 from tests.cli_test_case import CliTestCase
 
@@ -83,6 +84,53 @@ class SubsetTest(CliTestCase):
         rest.close()
         os.unlink(rest.name)
 
+    @responses.activate
+    @mock.patch.dict(os.environ, {"LAUNCHABLE_TOKEN": CliTestCase.launchable_token})
+    def test_subset_with_broken_response(self):
+        pipe = "test_1.py\ntest_2.py\ntest_3.py\ntest_4.py"
+        # cut off in the middle of the subset, which is printed as it arrives
+        responses.replace(responses.POST, "{}/intake/organizations/{}/workspaces/{}/subset".format(
+            get_base_url(),
+            self.organization,
+            self.workspace),
+            body='{"testPaths": [[{"type": "file", "name": "test_3.py"}], [{"type": "file", "na',
+            status=200)
+
+        result = self.cli("subset", "--target", "30%", "--session", self.session, "file", mix_stderr=False, input=pipe)
+        self.assert_success(result)
+        # falls back to all tests, after the part of the subset printed already
+        self.assertEqual(result.stdout, "test_3.py\ntest_1.py\ntest_2.py\ntest_3.py\ntest_4.py\n")
+        self.assertIn("Falling back to running all tests", result.stderr)
+
+        # cut off before any of the subset
+        responses.replace(responses.POST, "{}/intake/organizations/{}/workspaces/{}/subset".format(
+            get_base_url(),
+            self.organization,
+            self.workspace),
+            body='{"subsettingId": 123, "testPa',
+            status=200)
+
+        result = self.cli("subset", "--target", "30%", "--session", self.session, "file", mix_stderr=False, input=pipe)
+        self.assert_success(result)
+        self.assertEqual(result.stdout, "test_1.py\ntest_2.py\ntest_3.py\ntest_4.py\n")
+
+    def test_subset_result_from_stream(self):
+        subset_seen = []
+
+        def chunks():
+            yield b'{"testPaths": [[{"type": "file", "name": "test_1.py"}], '
+            yield b'[{"type": "file", "name": "test_2.py"}]], '
+            # the subset is handed over before the rest of the response arrives
+            self.assertEqual(subset_seen, [[{"type": "file", "name": "test_1.py"}], [{"type": "file", "name": "test_2.py"}]])
+            yield b'"rest": [[{"type": "file", "name": "test_3.py"}]], "subsettingId": 123, "isObservation": true}'
+
+        result = SubsetResult.from_stream(chunks(), subset_seen.append)
+        self.assertEqual(result.subset, [])
+        self.assertEqual(result.subset_count, 2)
+        self.assertEqual(result.rest, [[{"type": "file", "name": "test_3.py"}]])
+        self.assertEqual(result.subset_id, 123)
+        self.assertTrue(result.is_observation)
+
     @responses.activate
     @mock.patch.dict(os.environ, {"LAUNCHABLE_TOKEN": CliTestCase.launchable_token})
     def test_subset_with_observation_mode(self):
@@ -0,0 +1,28 @@
+import importlib
+from pathlib import Path
+from unittest import TestCase
+
+import launchable.test_runners
+from launchable.commands.record.tests import tests as record_tests_cmd
+from launchable.commands.split_subset import split_subset as split_subset_cmd
+from launchable.commands.subset import subset as subset_cmd
+from launchable.test_runners import RECORD_TESTS, SPLIT_SUBSET, SUBSET
+
+
+class RegistryTest(TestCase):
+    def test_all_test_runners_are_declared(self):
+        """
+        Test runners are imported only by the subcommands declared in launchable.test_runners,
+        so a test runner that isn't declared can't be run
+        """
+        for f in Path(launchable.test_runners.__file__).parent.glob("*.py"):
+            if f.stem not in ("__init__", "launchable"):
+                importlib.import_module("launchable.test_runners.{}".format(f.stem))
+
+        for group, declared in [(record_tests_cmd, RECORD_TESTS), (subset_cmd, SUBSET), (split_subset_cmd, SPLIT_SUBSET)]:
+            # leaving out the ones that tests load as plugins
+            registered = {name for name, cmd in group.commands.items()
+                          if cmd.callback.__module__.startswith("launchable.test_runners.")}
+            self.assertEqual(registered, set(declared.keys()), group.name)
+            for module in declared.values():
+                importlib.import_module(module)
@@ -0,0 +1,124 @@
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from unittest import TestCase, mock
+
+import click
+
+from launchable.utils import agent
+from launchable.utils.agent import ForwardingGroup, forward, ping, serve, stop
+from launchable.utils.env_keys import AGENT_SOCKET_KEY
+
+
+@click.group(cls=ForwardingGroup)
+def cli():
+    pass
+
+
+@cli.command()
+def upper():
+    # reads stdin, like `subset` does
+    click.echo(sys.stdin.read().upper(), nl=False)
+    click.echo("done", err=True)
+
+
+@cli.command()
+def env():
+    click.echo(json.dumps({"value": os.environ.get("AGENT_TEST"), "cwd": os.getcwd(), "serving": agent.is_serving()}))
+
+
+@cli.command()
+@click.argument('code', type=int)
+def fail(code):
+    sys.exit(code)
+
+
+@cli.command()
+def boom():
+    raise Exception("boom")
+
+
+class AgentTest(TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.dir.name, "agent.sock")
+        self.thread = threading.Thread(target=serve, args=(self.socket_path, cli, 0), daemon=True)
+        self.thread.start()
+        deadline = time.monotonic() + 10
+        while not ping(self.socket_path):
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def tearDown(self):
+        stop(self.socket_path)
+        self.thread.join(10)
+        self.assertFalse(self.thread.is_alive())
+        self.assertFalse(os.path.exists(self.socket_path))
+        self.dir.cleanup()
+
+    def run_in_agent(self, args, stdin=b""):
+        stdout, stderr = io.BytesIO(), io.BytesIO()
+        with mock.patch.dict(os.environ, {AGENT_SOCKET_KEY: self.socket_path}):
+            code = forward(args, stdin=io.BytesIO(stdin), stdout=stdout, stderr=stderr)
+        return code, stdout.getvalue().decode(), stderr.getvalue().decode()
+
+    def test_forward(self):
+        code, stdout, stderr = self.run_in_agent(["upper"], "hello\nworld\n".encode() * 10000)
+        self.assertEqual(code, 0)
+        self.assertEqual(stdout, "HELLO\nWORLD\n" * 10000)
+        self.assertEqual(stderr, "done\n")
+
+    def test_environment(self):
+        cwd = os.getcwd()
+        with mock.patch.dict(os.environ, {"AGENT_TEST": "forwarded"}):
+            os.chdir(self.dir.name)
+            try:
+                code, stdout, _ = self.run_in_agent(["env"])
+            finally:
+                os.chdir(cwd)
+        self.assertEqual(code, 0)
+        self.assertEqual(json.loads(stdout), {"value": "forwarded", "cwd": os.path.realpath(self.dir.name),
+                                              "serving": True})
+        # and it's restored afterwards
+        self.assertEqual(os.getcwd(), cwd)
+
+    def test_exit_code(self):
+        self.assertEqual(self.run_in_agent(["fail", "3"])[0], 3)
+
+        code, _, stderr = self.run_in_agent(["boom"])
+        self.assertEqual(code, 1)
+        self.assertIn("Exception: boom", stderr)
+
+        code, _, stderr = self.run_in_agent(["no-such-command"])
+        self.assertEqual(code, 2)
+        self.assertIn("No such command", stderr)
+
+        # the agent carries on
+        self.assertEqual(self.run_in_agent(["fail", "0"])[0], 0)
+
+    def test_other_version(self):
+        # of a client that may have different commands, which it runs on its own
+        conn = agent._connect(self.socket_path)
+        with conn.sock:
+            conn.send_json(agent._REQUEST, {"op": "run", "version": "other", "args": ["fail", "3"]})
+            self.assertEqual(conn.recv(), (agent._FALLBACK, b""))
+
+    def test_ping(self):
+        self.assertEqual(ping(self.socket_path)["pid"], os.getpid())
+
+
+class ForwardTest(TestCase):
+    def test_no_agent(self):
+        with tempfile.TemporaryDirectory() as dir:
+            with mock.patch.dict(os.environ, {AGENT_SOCKET_KEY: os.path.join(dir, "agent.sock")}):
+                self.assertIsNone(forward(["upper"]))
+            self.assertIsNone(ping(os.path.join(dir, "agent.sock")))
+            self.assertFalse(stop(os.path.join(dir, "agent.sock")))
+
+    def test_not_configured(self):
+        with mock.patch.dict(os.environ, {}, clear=True):
+            self.assertIsNone(forward(["upper"]))
@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase, mock
+
+from launchable.utils.cache import clear_cache, invalidate_cache, read_cache, write_cache
+from launchable.utils.session import SESSION_DIR_KEY
+
+
+class CacheTest(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        os.environ[SESSION_DIR_KEY] = self.dir
+
+    def tearDown(self):
+        del os.environ[SESSION_DIR_KEY]
+        shutil.rmtree(self.dir)
+
+    def test_read_write(self):
+        self.assertIsNone(read_cache("foo"))
+
+        write_cache("foo", ["a", "b"], ttl=60)
+        write_cache("bar", {"c": True}, ttl=60)
+        self.assertEqual(read_cache("foo"), ["a", "b"])
+        self.assertEqual(read_cache("bar"), {"c": True})
+
+        clear_cache()
+        self.assertIsNone(read_cache("foo"))
+
+    def test_invalidate(self):
+        write_cache("builds/1", "a", ttl=60)
+        write_cache("builds/1/names/x", "b", ttl=60)
+        write_cache("builds/10", "c", ttl=60)
+
+        invalidate_cache("builds/1")
+        self.assertIsNone(read_cache("builds/1"))
+        self.assertIsNone(read_cache("builds/1/names/x"))
+        self.assertEqual(read_cache("builds/10"), "c")
+
+    def test_expiration(self):
+        with mock.patch("time.time", return_value=1000):
+            write_cache("foo", "value", ttl=60)
+            write_cache("bar", "value", ttl=10)
+
+        with mock.patch("time.time", return_value=1030):
+            self.assertEqual(read_cache("foo"), "value")
+            self.assertIsNone(read_cache("bar"))
+
+        with mock.patch("time.time", return_value=1061):
+            self.assertIsNone(read_cache("foo"))
+
+    def test_broken_file(self):
+        with open(os.path.join(self.dir, ".launchable-cache"), "w") as f:
+            f.write("{broken")
+
+        self.assertIsNone(read_cache("foo"))
+        write_cache("foo", "value", ttl=60)
+        self.assertEqual(read_cache("foo"), "value")
+
+    @mock.patch.dict(os.environ, {"LAUNCHABLE_DISABLE_CACHE": "1"})
+    def test_disabled(self):
+        write_cache("foo", "value", ttl=60)
+        self.assertIsNone(read_cache("foo"))
+        invalidate_cache("foo")
+        self.assertEqual(os.listdir(self.dir), [])
+
+        # the cache of the invocations that didn't disable it is left as is
+        with mock.patch.dict(os.environ, {"LAUNCHABLE_DISABLE_CACHE": ""}):
+            write_cache("foo", "value", ttl=60)
+        invalidate_cache("foo")
+        with mock.patch.dict(os.environ, {"LAUNCHABLE_DISABLE_CACHE": ""}):
+            self.assertEqual(read_cache("foo"), "value")
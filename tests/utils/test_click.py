@@ -8,7 +8,7 @@ import click
 from click.testing import CliRunner
 from dateutil.tz import tzlocal
 
-from launchable.utils.click import DATETIME_WITH_TZ, KEY_VALUE, PercentageType, convert_to_seconds
+from launchable.utils.click import DATETIME_WITH_TZ, KEY_VALUE, LazyGroup, PercentageType, convert_to_seconds, run_in_context
 
 
 class PercentageTypeTest(TestCase):
@@ -115,3 +115,40 @@ class TimestampTypeTest(TestCase):
         scenario(datetime.datetime(2023, 10, 1, 12, 0, 0, tzinfo=tzlocal()), '-t', '2023-10-01 12:00:00')
         scenario(datetime.datetime(2023, 10, 1, 20, 0, 0, tzinfo=timezone.utc), '-t', '2023-10-01 20:00:00+00:00')
         scenario(datetime.datetime(2023, 10, 1, 20, 0, 0, tzinfo=timezone.utc), '-t', '2023-10-01T20:00:00Z')
+
+
+@click.command(help="Says hello")
+def hello():
+    click.echo("hello")
+
+
+class LazyGroupTest(TestCase):
+    def test_lazy_commands(self):
+        @click.group(cls=LazyGroup, lazy_commands={'hello': 'tests.utils.test_click:hello'})
+        def group():
+            pass
+
+        group.add_alias('hi', 'hello')  # type: ignore
+        self.assertNotIn('hello', group.commands)
+
+        result = CliRunner().invoke(group, ['--help'])
+        self.assertEqual(0, result.exit_code, result.stdout)
+        self.assertIn("hello  Says hello", result.stdout)
+
+        for name in ['hello', 'hi']:
+            result = CliRunner().invoke(group, [name])
+            self.assertEqual(0, result.exit_code, result.stdout)
+            self.assertEqual("hello\n", result.stdout)
+
+        result = CliRunner().invoke(group, ['bye'])
+        self.assertNotEqual(0, result.exit_code)
+
+
+class RunInContextTest(TestCase):
+    def test_run_in_context(self):
+        ctx = click.Context(click.Command("foo"))
+        self.assertIsNone(click.get_current_context(silent=True))
+        self.assertEqual(run_in_context(ctx, lambda x: (x, click.get_current_context()), 1), (1, ctx))
+        # the context is popped afterwards
+        self.assertIsNone(click.get_current_context(silent=True))
+        self.assertEqual(run_in_context(None, lambda: click.get_current_context(silent=True)), None)
@@ -0,0 +1,98 @@
+import io
+import os
+import sys
+import zlib
+from unittest import TestCase, mock, skipUnless
+
+from launchable.app import Application
+from launchable.utils.compression import Codec, GzipCodec, configured_codec, get_codec, is_compressed
+from launchable.utils.http_client import _HttpClient, _is_compressed_file
+
+try:
+    import zstandard  # type: ignore  # noqa: F401
+    has_zstd = True
+except ImportError:
+    has_zstd = False
+
+
+class CompressionTest(TestCase):
+    def test_gzip(self):
+        for level in [None, 1, 9]:
+            codec = GzipCodec(level)
+            data = [b"Hello", b" ", b"world"] * 1000
+            self.assertEqual(codec.decompress(b"".join(codec.compress(data))), b"".join(data))
+
+    @skipUnless(has_zstd, "zstandard is not installed")
+    def test_zstd(self):
+        codec = get_codec("zstd", 10)
+        data = [b"Hello", b" ", b"world"] * 1000
+        self.assertEqual(codec.decompress(b"".join(codec.compress(data))), b"".join(data))
+
+    def test_threads(self):
+        codec = GzipCodec(threads=4)
+        data = [b"Hello", b" ", b"world"] * 100000
+        compressed = b"".join(codec.compress(data))
+        self.assertEqual(codec.decompress(compressed), b"".join(data))
+        # the blocks compressed on each thread make up a single gzip stream, whose CRC and size zlib checks
+        d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self.assertEqual(d.decompress(compressed), b"".join(data))
+        self.assertTrue(d.eof)
+        self.assertEqual(d.unused_data, b"")
+        self.assertEqual(GzipCodec(threads=0).threads, os.cpu_count())
+
+        configured_codec.cache_clear()
+        try:
+            client = _HttpClient(app=Application(compression_threads=4))
+            self.assertEqual(client.codec.name, "gzip")
+            self.assertEqual(client.codec.threads, 4)
+        finally:
+            configured_codec.cache_clear()
+
+    def test_incomplete_codec(self):
+        class NoDecompressCodec(Codec):
+            name = "none"
+
+            def compress(self, chunks):
+                return iter(chunks)
+
+        # fails up front, rather than in the middle of an upload
+        with self.assertRaises(TypeError):
+            NoDecompressCodec()
+
+    def test_get_codec(self):
+        self.assertEqual(get_codec().name, "gzip")
+        self.assertEqual(get_codec().level, 6)
+        self.assertEqual(get_codec("gzip", 1).level, 1)
+        with self.assertRaises(ValueError):
+            get_codec("brotli")
+        with self.assertRaises(ValueError):
+            get_codec("gzip", 10)
+
+    def test_configured_codec_fallback(self):
+        configured_codec.cache_clear()
+        try:
+            # a None entry makes the import fail, as if the package weren't installed
+            with mock.patch.dict(sys.modules, {"zstandard": None}):
+                with self.assertRaises(ImportError):
+                    get_codec("zstd")
+                codec = configured_codec("zstd", 19)
+            self.assertEqual(codec.name, "gzip")
+            self.assertEqual(codec.level, GzipCodec.default_level)
+        finally:
+            configured_codec.cache_clear()
+
+    def test_is_compressed(self):
+        self.assertTrue(is_compressed(b"".join(GzipCodec().compress([b"foo"]))))
+        self.assertTrue(is_compressed(b"PK\x03\x04foo"))
+        self.assertFalse(is_compressed(b"<?xml version"))
+        self.assertFalse(is_compressed(b""))
+
+        f = io.BytesIO(b"\x1f\x8b\x08rest of the file")
+        f.read(1)
+        self.assertFalse(_is_compressed_file(f))
+        f.seek(0)
+        self.assertTrue(_is_compressed_file(f))
+        # the position is left as is
+        self.assertEqual(f.tell(), 0)
+        self.assertFalse(_is_compressed_file(io.BytesIO(b"Hello world")))
+        self.assertFalse(_is_compressed_file({"events": []}))
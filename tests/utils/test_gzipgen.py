@@ -1,7 +1,8 @@
 import gzip
+import os
 from unittest import TestCase
 
-from launchable.utils.gzipgen import compress
+from launchable.utils.gzipgen import compress, compress_parallel
 
 
 class GzippenTest(TestCase):
@@ -11,3 +12,19 @@ class GzippenTest(TestCase):
         msg = gzip.decompress(encoded)
         print(msg)
         self.assertEqual(msg, b'Hello world')
+
+    def test_compress_parallel(self):
+        for data in [b'', b'Hello world', b'Hello world ' * 100000, os.urandom(300000)]:
+            # blocks spanning multiple input chunks, and multiple blocks in an input chunk
+            for chunks in [[data], [data[i:i + 777] for i in range(0, len(data), 777)]]:
+                for block_size in [1000, 128 * 1024]:
+                    encoded = b''.join(compress_parallel(chunks, threads=4, block_size=block_size))
+                    # gzip.decompress() verifies the CRC and the size in the footer
+                    self.assertEqual(gzip.decompress(encoded), data)
+
+    def test_compress_parallel_ratio(self):
+        data = b''.join(b'line %d of a log file\n' % i for i in range(100000))
+        single = b''.join(compress([data]))
+        parallel = b''.join(compress_parallel([data], threads=4, block_size=64 * 1024))
+        # the tail of the previous block is the dictionary of the next one, so the ratio barely gets worse
+        self.assertLess(len(parallel), len(single) * 1.05)
@@ -1,13 +1,68 @@
+import gzip
 import os
 import platform
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from typing import Callable, Dict, Iterator, Optional, Tuple
 from unittest import TestCase, mock
 
-from requests import Session
+from requests import ConnectionError, Session
 
-from launchable.utils.http_client import _HttpClient
+from launchable.utils.compression import GzipCodec
+from launchable.utils.http_client import MAX_RETRIES, _build_data, _connection_stats, _HttpClient, _payload_for_audit
+from launchable.utils.rate_controller import RateController
 from launchable.version import __version__
 
 
+@contextmanager
+def _local_server(respond: Callable[[BaseHTTPRequestHandler], Optional[Tuple[int, Dict[str, str]]]]) -> Iterator[str]:
+    """
+    Runs an HTTP server on localhost while in the context, and gives its URL. 'respond' is called with each request,
+    and returns the status and the headers to respond with, or None to drop the connection
+    """
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            response = respond(self)
+            if response is None:
+                self.close_connection = True
+                return
+            status, headers = response
+            self.send_response(status)
+            for k, v in headers.items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        do_POST = do_GET
+
+        def log_message(self, format, *args):
+            pass
+
+    class Server(ThreadingMixIn, HTTPServer):
+        # so that connections kept alive by the client don't block the shutdown
+        daemon_threads = True
+
+    server = Server(("localhost", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        yield "http://localhost:{}".format(server.server_address[1])
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def _read_body(request: BaseHTTPRequestHandler) -> bytes:
+    return request.rfile.read(int(request.headers["Content-Length"]))
+
+
 class HttpClientTest(TestCase):
     @mock.patch.dict(
         os.environ,
@@ -16,7 +71,7 @@ class HttpClientTest(TestCase):
     )
     def test_header(self):
         cli = _HttpClient("/test")
-        self.assertEqual(cli._headers(True), {
+        self.assertEqual(cli._headers(GzipCodec()), {
             'Content-Encoding': 'gzip',
             'Content-Type': 'application/json',
             "User-Agent": "Launchable/{} (Python {}, {})".format(
@@ -26,7 +81,7 @@ class HttpClientTest(TestCase):
             ),
         })
 
-        self.assertEqual(cli._headers(False), {
+        self.assertEqual(cli._headers(None), {
             'Content-Type': 'application/json',
             "User-Agent": "Launchable/{} (Python {}, {})".format(
                 __version__,
@@ -36,7 +91,7 @@ class HttpClientTest(TestCase):
         })
 
         cli = _HttpClient("/test", test_runner="dummy")
-        self.assertEqual(cli._headers(False), {
+        self.assertEqual(cli._headers(None), {
             'Content-Type': 'application/json',
             "User-Agent": "Launchable/{} (Python {}, {}) TestRunner/{}".format(
                 __version__,
@@ -61,3 +116,84 @@ class HttpClientTest(TestCase):
             self.fail("should have raised")
         except Exception as e:
             self.assertIn("Welp", str(e))
+
+    def test_pre_encoded_payload(self):
+        data = gzip.compress(b'{"events": []}')
+        # sent as is
+        self.assertIs(_build_data(data, GzipCodec()), data)
+        self.assertEqual(_payload_for_audit(data, GzipCodec()), '{"events": []}')
+
+    def test_shared_session(self):
+        with _local_server(lambda request: (200, {})) as base_url:
+            # e.g. LaunchableClient and TrackingClient
+            cli1 = _HttpClient(base_url)
+            cli2 = _HttpClient(base_url)
+            self.assertIs(cli1.session, cli2.session)
+            self.assertIsNot(cli1.session, _HttpClient("http://localhost:1").session)
+
+            for cli in [cli1, cli2, cli1]:
+                self.assertEqual(cli.request("GET", "/").status_code, 200)
+            self.assertEqual(_connection_stats(cli1.session, base_url),
+                             "connection pool localhost: 3 request(s) over 1 connection(s)")
+
+    @mock.patch("launchable.utils.http_client.POST_RETRY_BACKOFF_FACTOR", 0.01)
+    def test_retry_idempotent_post(self):
+        # what the stand-in server does for each request: a status to respond with, or None to drop the connection
+        plan = []
+        received = []
+
+        def respond(request: BaseHTTPRequestHandler):
+            received.append((request.headers.get("Idempotency-Key"), _read_body(request)))
+            status = plan.pop(0) if plan else 200
+            return None if status is None else (status, {})
+
+        with _local_server(respond) as base_url:
+            cli = _HttpClient(base_url, session=Session())
+            payload = gzip.compress(b'{"events": []}')
+
+            plan.extend([502, None, 503])
+            res = cli.request("POST", "events", payload=payload, compress=True, idempotency_key="key1")
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(received, [("key1", payload)] * 4)
+
+            # gives up after MAX_RETRIES retries
+            received.clear()
+            plan.extend([500] * (MAX_RETRIES + 1))
+            res = cli.request("POST", "events", payload=payload, compress=True, idempotency_key="key2")
+            self.assertEqual(res.status_code, 500)
+            self.assertEqual(len(received), MAX_RETRIES + 1)
+
+            received.clear()
+            plan.extend([None] * (MAX_RETRIES + 1))
+            with self.assertRaises(ConnectionError):
+                cli.request("POST", "events", payload=payload, compress=True, idempotency_key="key3")
+            self.assertEqual(len(received), MAX_RETRIES + 1)
+
+            # POSTs without a key aren't retried, as they might have been processed
+            received.clear()
+            plan.extend([502])
+            res = cli.request("POST", "events", payload=payload, compress=True)
+            self.assertEqual(res.status_code, 502)
+            self.assertEqual(received, [(None, payload)])
+
+    @mock.patch("launchable.utils.http_client.POST_RETRY_BACKOFF_FACTOR", 0.01)
+    def test_bulk_request_honors_retry_after(self):
+        statuses = [429, 503]
+
+        def respond(request: BaseHTTPRequestHandler):
+            _read_body(request)
+            return statuses.pop(0) if statuses else 200, {"Retry-After": "0.3"}
+
+        with _local_server(respond) as base_url:
+            cli = _HttpClient(base_url, session=Session())
+            cli.rate_controller = RateController(4)
+
+            start = time.monotonic()
+            res = cli.request("POST", "events", payload=b"{}", idempotency_key="key", bulk=True)
+            self.assertEqual(res.status_code, 200)
+            # waited for Retry-After twice
+            self.assertGreaterEqual(time.monotonic() - start, 0.5)
+            self.assertEqual(cli.rate_controller.throttled_count, 2)
+            self.assertEqual(cli.rate_controller.delayed_count, 2)
+            # halved twice, then grew by one with the success
+            self.assertEqual(cli.rate_controller.limit, 2)
@@ -0,0 +1,40 @@
+import gzip
+import json
+from unittest import TestCase
+
+from launchable.utils import jsongen
+from launchable.utils.compression import GzipCodec
+from launchable.utils.http_client import _build_data
+
+
+class JsonGenTest(TestCase):
+    def test_encode(self):
+        for o in [
+            {},
+            [],
+            {"a": 1, "b": [1, 2.5, None, True], "c": {"d": {"e": [{"f": "あ\n\""}]}}},
+            {"testPaths": [[{"type": "file", "name": "a.py"}], [{"type": "file", "name": "b.py"}]], "session": "x"},
+            {1: "non-str keys are left to json.dumps", "nested": {None: 1, False: 2}},
+            ("tuple", ["of", ("tuples",)]),
+            "string",
+            None,
+        ]:
+            self.assertEqual(b"".join(jsongen.encode(o)), json.dumps(o).encode())
+
+    def test_chunk_size(self):
+        o = {"testPaths": [[{"type": "file", "name": "test_{}.py".format(i)}] for i in range(20000)]}
+        chunks = list(jsongen.encode(o, chunk_size=64 * 1024))
+        self.assertGreater(len(chunks), 10)
+        # a chunk can exceed chunk_size by up to a slice of a list
+        self.assertTrue(all(len(c) < 128 * 1024 for c in chunks))
+        self.assertEqual(b"".join(chunks), json.dumps(o).encode())
+
+    def test_build_data(self):
+        payload = {
+            "testPaths": [[{"type": "file", "name": "src/test/java/com/example/Test{}.java".format(i)},
+                           {"type": "class", "name": "com.example.Test{}".format(i)}] for i in range(20000)],
+            "testRunner": "maven",
+            "session": {"id": "builds/1/test_sessions/1"},
+        }
+        # encoded and compressed incrementally, into the same JSON document as json.dumps()
+        self.assertEqual(gzip.decompress(_build_data(payload, GzipCodec())), json.dumps(payload).encode())
@@ -0,0 +1,51 @@
+import json
+from unittest import TestCase
+
+from launchable.utils.jsonstream import iter_object
+
+
+def _split(b: bytes, size: int):
+    return [b[i:i + size] for i in range(0, len(b), size)]
+
+
+class JsonStreamTest(TestCase):
+    doc = {
+        "testPaths": [[{"type": "file", "name": "test_{}.py".format(i)}] for i in range(300)],
+        "rest": [1, 23456, -7.5e3, "あいう", None, True, [], {}],
+        "subsettingId": 123,
+        "summary": {"subset": {"duration": 15.5, "candidates": 300}},
+        "isObservation": False,
+    }
+
+    def test_iter_object(self):
+        for indent in [None, 2]:
+            b = json.dumps(self.doc, indent=indent, ensure_ascii=False).encode()
+            # chunk boundaries fall in the middle of numbers, strings and multi-byte characters
+            for size in [1, 3, 7, 100, 64 * 1024]:
+                test_paths = []
+                rest = []
+                others = dict(iter_object(_split(b, size), {"testPaths": test_paths.append, "rest": rest.append}))
+
+                self.assertEqual(test_paths, self.doc["testPaths"], (indent, size))
+                self.assertEqual(rest, self.doc["rest"], (indent, size))
+                self.assertEqual(others, {
+                    "subsettingId": 123,
+                    "summary": {"subset": {"duration": 15.5, "candidates": 300}},
+                    "isObservation": False,
+                })
+
+    def test_without_handlers(self):
+        b = json.dumps(self.doc).encode()
+        self.assertEqual(dict(iter_object(_split(b, 10))), self.doc)
+        self.assertEqual(dict(iter_object([b"{}"])), {})
+        self.assertEqual(dict(iter_object([b' { "a" : [ ] } '], {"a": self.fail})), {})
+
+    def test_handler_for_non_array(self):
+        rest = []
+        self.assertEqual(dict(iter_object([b'{"rest": null}'], {"rest": rest.append})), {"rest": None})
+        self.assertEqual(rest, [])
+
+    def test_malformed(self):
+        for b in [b"", b"[]", b'{"a": 1', b'{"a": [1, 2', b'{"a": [1 2]}', b'{"a" 1}', b'{1: 2}', b'{"a": tru}']:
+            with self.assertRaises(ValueError, msg=b):
+                dict(iter_object(_split(b, 2), {"a": lambda x: None}))
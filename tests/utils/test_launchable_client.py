@@ -0,0 +1,32 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase, mock
+
+from launchable.utils.cache import read_cache, write_cache
+from launchable.utils.launchable_client import LaunchableClient
+from launchable.utils.session import SESSION_DIR_KEY
+
+
+class LaunchableClientTest(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        os.environ[SESSION_DIR_KEY] = self.dir
+
+    def tearDown(self):
+        del os.environ[SESSION_DIR_KEY]
+        shutil.rmtree(self.dir)
+
+    @mock.patch.dict(os.environ, {"LAUNCHABLE_TOKEN": "v1:launchableinc/mothership:token"})
+    def test_cache_key(self):
+        client = LaunchableClient(base_url="https://api.example.com")
+        write_cache(client.cache_key("state"), {"pts_v2": True}, ttl=60)
+        self.assertEqual(read_cache(LaunchableClient(base_url="https://api.example.com/").cache_key("state")),
+                         {"pts_v2": True})
+
+        # what one server returned is never served for another one
+        self.assertIsNone(read_cache(LaunchableClient(base_url="http://localhost:8080").cache_key("state")))
+
+        # nor for another workspace
+        with mock.patch.dict(os.environ, {"LAUNCHABLE_TOKEN": "v1:launchableinc/other:token"}):
+            self.assertIsNone(read_cache(LaunchableClient(base_url="https://api.example.com").cache_key("state")))
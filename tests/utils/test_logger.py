@@ -1,10 +1,13 @@
 import copy
 import logging
+import os
+import tempfile
 from io import StringIO
 from unittest import TestCase
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 import launchable.utils.logger as logger
+from launchable.utils.env_keys import AUDIT_PAYLOAD_DIR_KEY
 from launchable.utils.logger import Logger
 
 
@@ -43,3 +46,38 @@ class LoggerTest(TestCase):
         l.debug("debug")
         self.assertEqual(mock_err.getvalue(
         ), "AUDIT:launchable:audit\nCRITICAL:launchable:critical\nERROR:launchable:error\nWARNING:launchable:warn\n")
+
+    @patch("sys.stderr", new_callable=StringIO)
+    def test_audit_request_is_lazy(self, mock_err):
+        logging.basicConfig(level=logger.LOG_LEVEL_DEFAULT)
+        payload = MagicMock(return_value={"a": 1})
+        Logger().audit_request(False, "post", "https://example.com/", {}, payload)
+        self.assertEqual(mock_err.getvalue(), "")
+        payload.assert_not_called()
+
+    @patch("sys.stderr", new_callable=StringIO)
+    def test_audit_request(self, mock_err):
+        logging.basicConfig(level=logger.LOG_LEVEL_AUDIT)
+        Logger().audit_request(True, "post", "https://example.com/", {"h": "v"}, lambda: {"a": 1})
+        self.assertEqual(
+            mock_err.getvalue(),
+            "AUDIT:launchable:(DRY RUN) send request method:post path:https://example.com/ headers:{'h': 'v'} args:{'a': 1}\n")
+
+    @patch("sys.stderr", new_callable=StringIO)
+    def test_audit_request_payload_to_file(self, mock_err):
+        logging.basicConfig(level=logger.LOG_LEVEL_AUDIT)
+        small = {"a": 1}
+        large = {"a": "x" * logger.AUDIT_PAYLOAD_FILE_THRESHOLD}
+        with tempfile.TemporaryDirectory() as d:
+            with patch.dict(os.environ, {AUDIT_PAYLOAD_DIR_KEY: d}):
+                Logger().audit_request(False, "post", "https://example.com/", {}, lambda: small)
+                Logger().audit_request(False, "post", "https://example.com/", {}, lambda: large)
+
+            files = os.listdir(d)
+            self.assertEqual(len(files), 1)
+            with open(os.path.join(d, files[0])) as f:
+                self.assertEqual(f.read(), '{"a": "' + "x" * logger.AUDIT_PAYLOAD_FILE_THRESHOLD + '"}')
+
+        lines = mock_err.getvalue().splitlines()
+        self.assertTrue(lines[0].endswith("args:{'a': 1}"))
+        self.assertTrue(lines[1].endswith("args:(written to {})".format(os.path.join(d, files[0]))))
@@ -0,0 +1,99 @@
+import json
+import os
+import pstats
+import time
+from pathlib import Path
+from unittest import TestCase, mock
+
+import responses  # type: ignore
+
+from launchable.utils.profiler import COMPRESS, NETWORK, PARSE, PHASES, SERIALIZE, Profiler
+from tests.cli_test_case import CliTestCase
+
+
+class ProfilerTest(TestCase):
+    def test_disabled(self):
+        p = Profiler()
+        with p.phase(PARSE):
+            pass
+        items = [1, 2, 3]
+        self.assertEqual(list(p.wrap(PARSE, items)), items)
+        p.add_traffic(bytes_out=100, requests=1)
+        self.assertEqual(p.stats, {})
+
+    def test_nested_phases(self):
+        # a clock that moves only as the phases "take time", so that the times are exact
+        clock = [0.0]
+
+        def take(seconds):
+            clock[0] += seconds
+
+        fake_time = mock.Mock(perf_counter=lambda: clock[0], process_time=time.process_time)
+        with mock.patch("launchable.utils.profiler.time", fake_time):
+            p = Profiler()
+            p.start()
+
+            def parse():
+                for i in range(3):
+                    take(0.02)
+                    yield i
+
+            def serialize(items):
+                for i in items:
+                    take(0.01)
+                    yield str(i).encode()
+
+            # the time of an inner phase isn't counted in the outer one
+            data = b"".join(p.wrap(SERIALIZE, serialize(p.wrap(PARSE, parse()))))
+            p.add_traffic(bytes_out=len(data), requests=1)
+            p.stop()
+
+        self.assertEqual(data, b"012")
+        self.assertEqual(list(p.stats.keys()), PHASES)
+        self.assertAlmostEqual(p.stats[PARSE].wall_time, 0.06)
+        self.assertAlmostEqual(p.stats[SERIALIZE].wall_time, 0.03)
+        # one for each item, and one for the end
+        self.assertEqual(p.stats[PARSE].count, 4)
+        self.assertEqual(p.stats[NETWORK].bytes_out, 3)
+        self.assertEqual(p.stats[NETWORK].requests, 1)
+        self.assertAlmostEqual(p.total_time(), 0.09)
+
+        d = p.to_dict()
+        self.assertEqual(d["phases"][NETWORK]["bytesOut"], 3)
+        self.assertEqual(d["phases"][COMPRESS]["count"], 0)
+
+
+class ProfileOptionTest(CliTestCase):
+    report_files_dir = Path(__file__).parent.joinpath('../data/maven/').resolve()
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"LAUNCHABLE_TOKEN": CliTestCase.launchable_token})
+    def test_profile(self):
+        output = os.path.join(self.dir, "profile.json")
+        result = self.cli('--profile-output', output, 'record', 'tests', '--session', self.session,
+                          'maven', str(self.report_files_dir) + "**/reports/")
+        self.assert_success(result)
+        self.assertIn("| Phase", result.output)
+
+        with open(output) as f:
+            profile = json.load(f)
+        phases = profile["phases"]
+        self.assertGreater(phases["discovery"]["count"], 0)
+        self.assertGreater(phases["parse"]["wallTime"], 0)
+        self.assertGreater(phases["serialize"]["count"], 0)
+        self.assertGreater(phases["compress"]["count"], 0)
+        self.assertGreater(phases["network"]["requests"], 0)
+        self.assertGreaterEqual(phases["network"]["bytesOut"], len(self.find_request('/events').request.body))
+        self.assertGreater(phases["network"]["bytesIn"], 0)
+        self.assertGreater(phases["output"]["count"], 0)
+
+        # cProfile stats for any other file name
+        output = os.path.join(self.dir, "profile.prof")
+        result = self.cli('--profile-output', output, 'record', 'tests', '--session', self.session,
+                          'maven', str(self.report_files_dir) + "**/reports/")
+        self.assert_success(result)
+        self.assertGreater(pstats.Stats(output).total_calls, 0)
+
+        result = self.cli('record', 'tests', '--session', self.session, 'maven', str(self.report_files_dir) + "**/reports/")
+        self.assert_success(result)
+        self.assertNotIn("| Phase", result.output)
@@ -0,0 +1,77 @@
+import threading
+import time
+from email.utils import formatdate
+from unittest import TestCase
+
+from launchable.utils.rate_controller import MAX_RETRY_AFTER, RateController, parse_retry_after
+
+
+class RateControllerTest(TestCase):
+    def test_aimd(self):
+        c = RateController(8)
+        self.assertEqual(c.limit, 8)
+
+        # requests sent under the same limit halve it only once
+        sent = [c.acquire() for _ in range(4)]
+        for s in sent:
+            c.release(s, 429)
+        self.assertEqual(c.limit, 4)
+        self.assertEqual(c.throttled_count, 4)
+
+        c.release(c.acquire(), 503)
+        c.release(c.acquire(), 429)
+        c.release(c.acquire(), 429)
+        c.release(c.acquire(), 429)
+        self.assertEqual(c.limit, 1)
+
+        # grows by one for every limit's worth of successes
+        c.release(c.acquire(), 200)
+        self.assertEqual(c.limit, 2)
+        c.release(c.acquire(), 200)
+        c.release(c.acquire(), 201)
+        self.assertEqual(c.limit, 3)
+        for _ in range(100):
+            c.release(c.acquire(), 200)
+        self.assertEqual(c.limit, 8)
+
+        # no response says nothing about the pressure
+        c.release(c.acquire())
+        self.assertEqual(c.limit, 8)
+        self.assertEqual(c.delayed_count, 0)
+
+    def test_limit_in_flight(self):
+        c = RateController(1)
+        sent = c.acquire()
+        acquired = threading.Event()
+
+        def acquire():
+            c.release(c.acquire(), 200)
+            acquired.set()
+
+        t = threading.Thread(target=acquire)
+        t.start()
+        self.assertFalse(acquired.wait(0.1))
+        c.release(sent, 200)
+        self.assertTrue(acquired.wait(5))
+        t.join()
+        self.assertEqual(c.delayed_count, 1)
+        self.assertGreater(c.delayed_secs, 0)
+
+    def test_retry_after(self):
+        c = RateController(4)
+        c.release(c.acquire(), 429, 0.2)
+        start = time.monotonic()
+        c.release(c.acquire(), 200)
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+        self.assertEqual(c.delayed_count, 1)
+        self.assertEqual(c.throttled_count, 1)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("3"), 3)
+        self.assertEqual(parse_retry_after("0.5"), 0.5)
+        self.assertEqual(parse_retry_after("-1"), 0)
+        self.assertEqual(parse_retry_after("86400"), MAX_RETRY_AFTER)
+        self.assertAlmostEqual(parse_retry_after(formatdate(time.time() + 10, usegmt=True)), 10, delta=2)
+        self.assertEqual(parse_retry_after(formatdate(time.time() - 10, usegmt=True)), 0)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertIsNone(parse_retry_after(None))
@@ -0,0 +1,101 @@
+import io
+from pathlib import Path
+from unittest import TestCase
+
+from junitparser import JUnitXml, JUnitXmlError  # type: ignore
+
+from launchable.commands.record.case_event import CaseEvent
+from launchable.testpath import FilePathNormalizer
+from launchable.utils.sax import Element, JUnitXmlSaxParser, SaxParser, TagMatcher
+
+
+class SaxParserTest(TestCase):
+    def test_tag_matcher(self):
+        cases = []
+
+        def receiver(e: Element):
+            if e.name == "testcase":
+                cases.append(e.tags)
+
+        SaxParser([
+            TagMatcher.parse("testcase/@name={testcaseName}"),
+            TagMatcher.parse("testsuite/@timestamp={timestamp}"),
+        ], receiver).parse(io.BytesIO(
+            b'<testsuite timestamp="2021-01-01T00:00:00"><testcase name="a"/><testcase name="b"/></testsuite>'))
+
+        self.assertEqual(cases, [
+            {"timestamp": "2021-01-01T00:00:00", "testcaseName": "a"},
+            {"timestamp": "2021-01-01T00:00:00", "testcaseName": "b"},
+        ])
+
+
+class JUnitXmlSaxParserTest(TestCase):
+    def parse(self, xml: bytes):
+        return list(JUnitXmlSaxParser().iterparse(io.BytesIO(xml), chunk_size=16))
+
+    def test_iterparse(self):
+        cases = self.parse(b"""<?xml version="1.0" encoding="UTF-8"?>
+<testsuites>
+  <testsuite name="suite1" timestamp="2021-01-01T00:00:00">
+    <properties><property name="p" value="v"/></properties>
+    <testcase classname="Foo" name="passed" time="0.1"/>
+    <testcase classname="Foo" name="failed" time="0.2">
+      <failure message="boom">stack trace</failure>
+      <system-out><![CDATA[hello <world>]]></system-out>
+    </testcase>
+    <testsuite name="nested">
+      <testcase classname="Bar" name="skipped"><skipped/></testcase>
+    </testsuite>
+  </testsuite>
+  <testcase name="not in a suite"/>
+  <testsuite name="suite2">
+    <wrapper><testcase name="not in a suite either"/></wrapper>
+  </testsuite>
+</testsuites>""")
+
+        self.assertEqual([(c.name, s.name) for c, s in cases], [
+            ("passed", "suite1"),
+            ("failed", "suite1"),
+            # test cases in a nested suite are paired with the top-level suite
+            ("skipped", "suite1"),
+        ])
+
+        failed = cases[1][0]
+        self.assertEqual(failed.time, 0.2)
+        self.assertEqual(failed.result[0].message, "boom")
+        self.assertEqual(failed.result[0].text, "stack trace")
+        self.assertEqual(failed.system_out, "hello <world>")
+        self.assertEqual(cases[1][1].timestamp, "2021-01-01T00:00:00")
+
+    def test_root_testsuite(self):
+        cases = self.parse(b'<testsuite name="suite"><testcase name="a"/></testsuite>')
+        self.assertEqual([(c.name, s.name) for c, s in cases], [("a", "suite")])
+
+    def test_invalid_format(self):
+        with self.assertRaises(JUnitXmlError):
+            self.parse(b'<foo><testsuite><testcase name="a"/></testsuite></foo>')
+
+    def test_same_as_junitparser(self):
+        """The streaming parser sees the same test cases as JUnitXml.fromfile() in all the test reports we have"""
+        path_builder = CaseEvent.default_path_builder(FilePathNormalizer())
+        data_builder = CaseEvent.default_data_builder()
+
+        def events(pairs, report):
+            es = [CaseEvent.from_case_and_suite(path_builder, case, suite, report, data_builder) for case, suite in pairs]
+            for e in es:
+                del e['createdAt']
+            return sorted(es, key=str)
+
+        count = 0
+        for report in sorted(Path(__file__).parent.joinpath('../data').resolve().glob('**/*.xml')):
+            try:
+                xml = JUnitXml.fromfile(str(report))
+            except Exception:
+                continue
+
+            with open(str(report), 'rb') as source:
+                streamed = events(JUnitXmlSaxParser().iterparse(source), str(report))
+            self.assertEqual(events([(case, suite) for suite in xml for case in suite], str(report)), streamed, report)
+            count += 1
+
+        self.assertGreater(count, 10)
@@ -0,0 +1,42 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from launchable.utils.session import SESSION_DIR_KEY
+from launchable.utils.spool import ChunkSpool
+
+
+class ChunkSpoolTest(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        os.environ[SESSION_DIR_KEY] = self.dir
+
+    def tearDown(self):
+        del os.environ[SESSION_DIR_KEY]
+        shutil.rmtree(self.dir)
+
+    def test_spool(self):
+        spool = ChunkSpool("foo")
+        self.assertFalse(spool.exists())
+        self.assertEqual(spool.pending(), [])
+
+        spool.write(12, b"chunk12")
+        spool.write(3, b"chunk3")
+        self.assertTrue(spool.exists())
+        # not resumable until all the chunks are spooled
+        self.assertFalse(spool.is_complete())
+
+        spool.complete("zstd", {"testCount": 10})
+        self.assertTrue(ChunkSpool("foo").is_complete())
+        self.assertEqual(ChunkSpool("foo").content_encoding(), "zstd")
+        self.assertEqual(ChunkSpool("foo").summary(), {"testCount": 10})
+        self.assertFalse(ChunkSpool("bar").exists())
+
+        self.assertEqual(spool.pending(), [3, 12])
+        self.assertEqual(spool.read(3), b"chunk3")
+        spool.ack(3)
+        self.assertEqual(spool.pending(), [12])
+
+        spool.clear()
+        self.assertFalse(spool.exists())
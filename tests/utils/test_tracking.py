@@ -0,0 +1,83 @@
+import json
+import os
+import threading
+from pathlib import Path
+from unittest import mock
+
+import responses  # type: ignore
+
+from launchable.utils.commands import Command
+from launchable.utils.http_client import get_base_url
+from launchable.utils.session import write_session
+from launchable.utils.tracking import Tracking, TrackingClient, flush_tracking_events, stop_tracking_thread
+from tests.cli_test_case import CliTestCase
+
+
+class TrackingClientTest(CliTestCase):
+    @responses.activate
+    @mock.patch.dict(os.environ, {"LAUNCHABLE_TOKEN": CliTestCase.launchable_token})
+    def test_send_event_in_background(self):
+        url = "{}/intake/cli_tracking".format(get_base_url())
+        sending = threading.Event()
+        sent = threading.Event()
+
+        def callback(request):
+            sending.set()
+            sent.wait(10)
+            return (200, {}, "{}")
+
+        responses.add_callback(responses.POST, url, callback=callback)
+
+        tracking_client = TrackingClient(Command.RECORD_TESTS)
+        # doesn't wait for the response
+        tracking_client.send_event(event_name=Tracking.Event.PERFORMANCE, metadata={"elapsedTime": 1})
+        tracking_client.send_error_event(event_name=Tracking.ErrorEvent.NETWORK_ERROR, stack_trace="error")
+        self.assertTrue(sending.wait(10))
+
+        # gives up once the deadline passes
+        self.assertFalse(flush_tracking_events(timeout=0.1))
+
+        sent.set()
+        self.assertTrue(flush_tracking_events(timeout=10))
+
+        calls = [c for c in responses.calls if c.request.url == url]
+        self.assertEqual([json.loads(c.request.body)["eventName"] for c in calls], ["PERFORMANCE", "NETWORK_ERROR"])
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"LAUNCHABLE_TOKEN": CliTestCase.launchable_token})
+    def test_stop_thread(self):
+        url = "{}/intake/cli_tracking".format(get_base_url())
+        responses.add(responses.POST, url, json={}, status=200)
+
+        def tracking_threads():
+            return [t for t in threading.enumerate() if t.name == "launchable-tracking"]
+
+        tracking_client = TrackingClient(Command.RECORD_TESTS)
+        tracking_client.send_event(event_name=Tracking.Event.PERFORMANCE, metadata={"elapsedTime": 1})
+        self.assertTrue(stop_tracking_thread(timeout=10))
+        # the queued event is sent before stopping
+        self.assertEqual(len([c for c in responses.calls if c.request.url == url]), 1)
+        self.assertEqual(tracking_threads(), [])
+
+        # and the thread starts again for the next event
+        tracking_client.send_event(event_name=Tracking.Event.PERFORMANCE, metadata={"elapsedTime": 2})
+        self.assertTrue(flush_tracking_events(timeout=10))
+        self.assertEqual(len([c for c in responses.calls if c.request.url == url]), 2)
+        self.assertEqual(len(tracking_threads()), 1)
+
+    @responses.activate
+    @mock.patch.dict(os.environ, {"LAUNCHABLE_TOKEN": CliTestCase.launchable_token})
+    def test_flush_at_the_end_of_command(self):
+        responses.add(responses.POST, "{}/intake/cli_tracking".format(get_base_url()), json={}, status=200)
+        write_session(self.build_name, self.session_id)
+
+        result = self.cli('record', 'tests', '--session', self.session,
+                          'maven', str(Path(__file__).parent.joinpath('../data/maven/').resolve()) + "**/reports/")
+        self.assert_success(result)
+
+        # sent by the time the command returns, from the background thread on behalf of the command
+        calls = [c for c in responses.calls if c.request.url.endswith('/intake/cli_tracking')]
+        self.assertTrue(calls)
+        for c in calls:
+            self.assertTrue(c.request.headers["User-Agent"].endswith(
+                ") Command/maven>tests>record>main({})".format(os.getpid())), c.request.headers["User-Agent"])